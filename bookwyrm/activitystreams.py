@@ -1,6 +1,10 @@
 """access the activity streams stored in redis"""
 
+from dataclasses import dataclass
 from datetime import timedelta
+import math
+from typing import Any, Callable, Optional
+
 from django.dispatch import receiver
 from django.db import transaction
 from django.db.models import signals, Q
@@ -10,6 +14,8 @@ from opentelemetry import trace
 from bookwyrm import models
 from bookwyrm.models.base_model import BookWyrmModel
 from bookwyrm.redis_store import RedisStore, r
+from bookwyrm.settings import PAGE_LENGTH
+from bookwyrm.social_graph import social_graph
 from bookwyrm.tasks import app, STREAMS, IMPORT_TRIGGERED
 from bookwyrm.telemetry import open_telemetry
 
@@ -17,6 +23,58 @@ from bookwyrm.telemetry import open_telemetry
 tracer = open_telemetry.tracer()
 
 
+@dataclass
+class StreamPage:
+    """a page of statuses from a stream, and the cursor for the next one"""
+
+    object_list: list[models.Status]
+    cursor: Optional[str] = None
+    next_cursor: Optional[str] = None
+
+    @property
+    def is_first_page(self) -> bool:
+        """the newest statuses in the stream"""
+        return self.cursor is None
+
+    @property
+    def has_next(self) -> bool:
+        """there may be older statuses"""
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[tuple[float, int]]:
+    """the rank and id a page starts after, or None for the first page"""
+    try:
+        rank, status_id = cursor.split("_")  # type: ignore[union-attr]
+        if math.isfinite(float(rank)):
+            return float(rank), int(status_id)
+    except (AttributeError, ValueError):
+        pass
+    return None
+
+
+def get_statuses_for_display(status_ids):
+    """statuses, with what they need to be rendered in a feed"""
+    return (
+        models.Status.objects.select_subclasses()
+        .filter(id__in=status_ids)
+        .select_related(
+            "user",
+            "reply_parent",
+            "comment__book",
+            "review__book",
+            "quotation__book",
+        )
+        .prefetch_related("mention_books", "mention_users")
+    )
+
+
 class ActivityStream(RedisStore):
     """a category of activity stream (like home, local, books)"""
 
@@ -38,12 +96,25 @@ class ActivityStream(RedisStore):
         """statuses are sorted by date published"""
         return obj.published_date.timestamp()
 
-    def add_status(self, status: models.Status, increment_unread=False):
+    def add_status(
+        self,
+        status: models.Status,
+        increment_unread=False,
+        audience: list[int] | None = None,
+        pipeline=None,
+    ):
         """add a status to users' feeds"""
-        audience = self.get_audience(status)
+        if audience is None:
+            audience = self.get_audience(status)
+        # a pipeline that's passed in is shared with other streams, and whoever
+        # created it is responsible for executing it
+        execute = pipeline is None
         # the pipeline contains all the add-to-stream activities
         pipeline = self.add_object_to_stores(
-            status, self.get_stores_for_users(audience), execute=False
+            status,
+            self.get_stores_for_users(audience),
+            execute=False,
+            pipeline=pipeline,
         )
 
         if increment_unread:
@@ -56,7 +127,8 @@ class ActivityStream(RedisStore):
                 )
 
         # and go!
-        pipeline.execute()
+        if execute:
+            pipeline.execute()
 
     def add_user_statuses(self, viewer: models.User, user: models.User):
         """add a user's statuses to another user's feed"""
@@ -77,18 +149,52 @@ class ActivityStream(RedisStore):
         r.delete(self.unread_by_status_type_id(user.id))
 
         statuses = self.get_store(self.stream_id(user.id))
-        return (
-            models.Status.objects.select_subclasses()
-            .filter(id__in=statuses)
-            .select_related(
-                "user",
-                "reply_parent",
-                "comment__book",
-                "review__book",
-                "quotation__book",
-            )
-            .prefetch_related("mention_books", "mention_users")
-            .order_by("-published_date")
+        return get_statuses_for_display(statuses).order_by("-published_date")
+
+    def get_activity_page(
+        self,
+        user: models.User,
+        before: Optional[str] = None,
+        status_filter: Optional[Callable[[Any], Any]] = None,
+        page_length: int = PAGE_LENGTH,
+    ) -> "StreamPage":
+        """load one page of statuses, starting after a cursor from a previous
+        page. Only the ids for that page are read from redis, and the filter is
+        applied to each batch of statuses as it's loaded"""
+        # clear unreads for this feed
+        r.set(self.unread_id(user.id), 0)
+        r.delete(self.unread_by_status_type_id(user.id))
+
+        store = self.stream_id(user.id)
+        cursor = parse_cursor(before)
+        position = cursor
+        statuses: list[tuple[models.Status, float]] = []
+        while len(statuses) < page_length:
+            entries = self.get_store_page(store, page_length, before=position)
+            if not entries:
+                position = None
+                break
+            queryset = get_statuses_for_display([obj_id for (obj_id, _) in entries])
+            if status_filter:
+                queryset = status_filter(queryset)
+            loaded = {status.id: status for status in queryset}
+            statuses += [
+                (loaded[obj_id], rank) for (obj_id, rank) in entries if obj_id in loaded
+            ]
+            position = (entries[-1][1], entries[-1][0])
+            if len(entries) < page_length:
+                # that's everything in the stream
+                position = None
+                break
+
+        next_cursor = None
+        if len(statuses) > page_length or (statuses and position):
+            status, rank = statuses[:page_length][-1]
+            next_cursor = f"{rank!r}_{status.id}"
+        return StreamPage(
+            object_list=[status for (status, _) in statuses[:page_length]],
+            cursor=before if cursor else None,
+            next_cursor=next_cursor,
         )
 
     def get_unread_count(self, user: models.User):
@@ -108,8 +214,9 @@ class ActivityStream(RedisStore):
         self.populate_store(self.stream_id(user.id))
 
     @tracer.start_as_current_span("ActivityStream._get_audience")
-    def _get_audience(self, status: models.Status, exclude_self=False):
-        """given a status, what users should see it, excluding the author"""
+    def _get_audience(self, status: models.Status) -> set[int]:
+        """given a status, what users should see it, before any stream narrows
+        it down (this includes the author, unless they're inactive or blocked)"""
         trace.get_current_span().set_attribute("status_type", status.status_type)
         trace.get_current_span().set_attribute("status_privacy", status.privacy)
         trace.get_current_span().set_attribute(
@@ -118,19 +225,14 @@ class ActivityStream(RedisStore):
         )
         # direct messages don't appear in feeds, direct comments/reviews/etc do
         if status.privacy == "direct" and status.status_type == "Note":
-            return models.User.objects.none()
+            return set()
 
-        # everybody who could plausibly see this status
-        audience = models.User.objects.filter(
-            local=True,  # we only create feeds for users of this instance
-            is_active=True,
-        ).exclude(
-            Q(id__in=status.user.blocks.all()) | Q(blocks=status.user)  # not blocked
+        # everybody who could plausibly see this status: we only create feeds for
+        # users of this instance, and not for anyone in a block with the author
+        audience = social_graph.get_local_users() - social_graph.get_blocks(
+            status.user.id
         )
 
-        if exclude_self:
-            audience = audience.exclude(id=status.user.id)
-
         thread_books = models.Status.objects.filter(
             # load all the statuses in this thread with an associated book
             Q(id=status.id) | Q(thread_id=status.thread_id)
@@ -143,50 +245,47 @@ class ActivityStream(RedisStore):
         # flatten the list of sets into a single set of only non-None values
         thread_book_ids = set(j for i in thread_books for j in i if j)
         if thread_book_ids:
-            # collect a list of all users that block any of these books
-            users_blocking = list(
-                models.User.objects.filter(
-                    blocked_books__in=thread_book_ids
-                ).values_list("id", flat=True)
-            )
-
-            audience = audience.exclude(id__in=users_blocking)
+            # remove all users that block any of these books
+            audience -= social_graph.get_work_blocks(thread_book_ids)
 
         # only visible to the poster and mentioned users
         if status.privacy == "direct":
-            audience = audience.filter(
-                Q(id__in=status.mention_users.all())  # if the user is mentioned
-            )
+            audience &= set(status.mention_users.values_list("id", flat=True))
 
         # don't show replies to statuses the user can't see
         elif status.reply_parent and status.reply_parent.privacy == "followers":
-            audience = audience.filter(
-                Q(id=status.reply_parent.user.id)  # if the user is the OG author
-                | (
-                    Q(following=status.user) & Q(following=status.reply_parent.user)
-                )  # if the user is following both authors
+            parent_author = status.reply_parent.user
+            audience &= {parent_author.id} | (  # if the user is the OG author
+                # if the user is following both authors
+                social_graph.get_followers(status.user.id)
+                & social_graph.get_followers(parent_author.id)
             )
 
         # only visible to the poster's followers and tagged users
         elif status.privacy == "followers":
-            audience = audience.filter(
-                Q(following=status.user)  # if the user is following the author
-            )
-        return audience.distinct("id")
+            audience &= social_graph.get_followers(status.user.id)
+        return audience
 
     @tracer.start_as_current_span("ActivityStream.get_audience")
-    def get_audience(self, status: models.Status, exclude_self=False) -> list[str]:
+    def get_audience(self, status: models.Status, exclude_self=False) -> list[int]:
         """given a status, what users should see it"""
         trace.get_current_span().set_attribute("stream_id", self.key)
-        audience = self._get_audience(status, exclude_self=exclude_self).values_list(
-            "id", flat=True
-        )
-        status_author = models.User.objects.filter(
-            local=True, is_active=True, id=status.user.id
-        ).values_list("id", flat=True)
+        if not self.accepts_status(status):
+            return []
+        audience = self.select_audience(status, self._get_audience(status))
         if exclude_self:
-            return list(set(audience))
-        return list(set(audience) | set(status_author))
+            audience.discard(status.user.id)
+        return list(audience)
+
+    def accepts_status(self, status: models.Status) -> bool:
+        """whether this stream carries a status at all, whoever is looking"""
+        return True
+
+    def select_audience(self, status: models.Status, candidates: set[int]) -> set[int]:
+        """this stream's audience, chosen from everyone who could see the status"""
+        if status.user.local and status.user.is_active:
+            return candidates | {status.user.id}
+        return set(candidates)
 
     def get_stores_for_users(self, user_ids: list[str]) -> list[str]:
         """convert a list of user ids into redis store ids"""
@@ -271,17 +370,11 @@ class HomeStream(ActivityStream):
 
     key = "home"
 
-    @tracer.start_as_current_span("HomeStream.get_audience")
-    def get_audience(self, status: models.Status) -> list[str]:
-        trace.get_current_span().set_attribute("stream_id", self.key)
-        audience = super()._get_audience(status)
-        # if the user is following the author
-        audience = audience.filter(following=status.user).values_list("id", flat=True)
-        # if the user is the post's author
-        status_author = models.User.objects.filter(
-            local=True, is_active=True, id=status.user.id
-        ).values_list("id", flat=True)
-        return list(set(audience) | set(status_author))
+    def select_audience(self, status: models.Status, candidates: set[int]) -> set[int]:
+        # if the user is following the author, or is the post's author
+        return super().select_audience(
+            status, candidates & social_graph.get_followers(status.user.id)
+        )
 
     def get_statuses_for_user(self, user: models.User):
         return models.Status.privacy_filter(
@@ -338,11 +431,12 @@ class LocalStream(ActivityStream):
 
     key = "local"
 
-    def get_audience(self, status: models.Status, exclude_self=True):
+    def accepts_status(self, status: models.Status) -> bool:
         # this stream wants no part in non-public statuses
-        if status.privacy != "public" or not status.user.local:
-            return []
-        return super().get_audience(status, exclude_self=exclude_self)
+        return status.privacy == "public" and status.user.local
+
+    def select_audience(self, status: models.Status, candidates: set[int]) -> set[int]:
+        return candidates - {status.user.id}
 
     def get_statuses_for_user(self, user: models.User):
         # all public statuses by a local user
@@ -361,26 +455,28 @@ class BooksStream(ActivityStream):
 
     key = "books"
 
-    def _get_audience(self, status: models.Status, exclude_self=True):
-        """anyone with the mentioned book on their shelves except the poster"""
-        work = (
+    @staticmethod
+    def get_work(status: models.Status):
+        """the work a status is about"""
+        return (
             status.book.parent_work
             if hasattr(status, "book")
             else status.mention_books.first().parent_work
         )
 
-        audience = super()._get_audience(status, exclude_self=exclude_self)
-        return audience.filter(shelfbook__book__parent_work=work)
-
-    def get_audience(self, status: models.Status, exclude_self=True) -> list[str]:
+    def accepts_status(self, status: models.Status) -> bool:
         # only show public statuses on the books feed,
         # and only statuses that mention books
-        if status.privacy != "public" or not (
-            status.mention_books.exists() or hasattr(status, "book")
-        ):
-            return []
+        return status.privacy == "public" and (
+            hasattr(status, "book") or status.mention_books.exists()
+        )
 
-        return super().get_audience(status, exclude_self=exclude_self)
+    def select_audience(self, status: models.Status, candidates: set[int]) -> set[int]:
+        """anyone with the mentioned book on their shelves except the poster"""
+        shelvers = models.ShelfBook.objects.filter(
+            user__local=True, book__parent_work=self.get_work(status)
+        ).values_list("user_id", flat=True)
+        return (candidates & set(shelvers)) - {status.user.id}
 
     def get_statuses_for_user(self, user: models.User):
         """any public status that mentions the user's books"""
@@ -411,6 +507,55 @@ streams: dict[str, ActivityStream] = {
 }
 
 
+@tracer.start_as_current_span("get_stream_audiences")
+def get_stream_audiences(
+    status: models.Status, stream_list: list[str] | None = None
+) -> dict[str, list[int]]:
+    """the audience of every stream for a status: each stream's audience is a
+    subset of the status's own audience, so work that out once and narrow it"""
+    stream_list = stream_list or list(streams)
+    accepting = {
+        key: streams[key] for key in stream_list if streams[key].accepts_status(status)
+    }
+    candidates = (
+        next(iter(accepting.values()))._get_audience(status) if accepting else set()
+    )
+    trace.get_current_span().set_attribute("audience_size", len(candidates))
+    return {
+        key: list(accepting[key].select_audience(status, candidates))
+        if key in accepting
+        else []
+        for key in stream_list
+    }
+
+
+def bulk_populate_streams(stream_list: list[str] | None = None, resume=False):
+    """fill streams for every user from a single pass over the statuses, rather
+    than a query per user. Statuses go where add_status_task would put them."""
+    stream_list = stream_list or list(streams)
+    statuses = (
+        models.Status.objects.select_subclasses()
+        .filter(
+            deleted=False,
+            user__is_active=True,
+            privacy__in=["public", "unlisted", "followers"],
+        )
+        .select_related("user", "reply_parent__user")
+    )
+
+    def get_stores(status):
+        for key, audience in get_stream_audiences(status, stream_list).items():
+            yield from streams[key].get_stores_for_users(audience)
+
+    return streams[stream_list[0]].bulk_populate_stores(
+        statuses,
+        get_stores,
+        order_field="published_date",
+        cursor_key=f"bulk-populate-{'-'.join(sorted(stream_list))}-cursor",
+        resume=resume,
+    )
+
+
 @receiver(signals.post_save)
 def add_status_on_create(
     sender: type, instance: BookWyrmModel, created: bool, *args, **kwargs
@@ -664,8 +809,17 @@ def add_status_task(status_id: int, increment_unread=False):
     # to check than just to see if the states is more than a few days old
     if status.created_date < timezone.now() - timedelta(days=2):
         increment_unread = False
-    for stream in streams.values():
-        stream.add_status(status, increment_unread=increment_unread)
+    audiences = get_stream_audiences(status)
+    # one round trip to redis for all the streams
+    pipeline = r.pipeline()
+    for key, stream in streams.items():
+        stream.add_status(
+            status,
+            increment_unread=increment_unread,
+            audience=audiences[key],
+            pipeline=pipeline,
+        )
+    pipeline.execute()
 
 
 @app.task(queue=STREAMS)
@@ -6,8 +6,13 @@ from functools import reduce
 import operator
 from typing import Optional, Union, Any, Literal, overload
 
-from django.contrib.postgres.search import SearchRank, SearchQuery
-from django.db.models import F, Q
+from django.contrib.postgres.search import (
+    SearchRank,
+    SearchQuery,
+    TrigramWordSimilarity,
+)
+from django.db.models import F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Coalesce, Greatest, RowNumber
 from django.db.models.query import QuerySet
 
 from bookwyrm import models
@@ -110,36 +115,42 @@ def search_identifiers(
     commonly unique data identifiers like isbn or specific library ids.
     """
     books = books or models.Edition.objects
+    # every identifier is in one indexed field, so this is a single lookup
+    results = books.filter(*filters, identifiers__overlap=get_identifiers(query))
+    if return_first:
+        return results.first()
+    return results
+
+
+def search_identifiers_in_bulk(queries: list[str]) -> dict[str, models.Edition]:
+    """the first Edition matching each of a batch of identifiers, in one query"""
+    identifiers = {query: set(get_identifiers(query)) for query in queries}
+    matches: dict[str, models.Edition] = {}
+    if not identifiers:
+        return matches
+    editions = models.Edition.objects.filter(
+        identifiers__overlap=list(set().union(*identifiers.values()))
+    ).order_by("id")
+    for edition in editions:
+        for query, query_identifiers in identifiers.items():
+            if query not in matches and query_identifiers & set(edition.identifiers):
+                matches[query] = edition
+    return matches
+
+
+def get_identifiers(query: str) -> list[str]:
+    """what an identifier could be, in the form they're indexed in"""
     if connectors.maybe_isbn(query):
         # Oh did you think the 'S' in ISBN stood for 'standard'?
         normalized_isbn = query.strip().upper().rjust(10, "0")
         query = normalized_isbn
 
-    edition_deduplication_fields = [
-        {f.name: query}
+    return [
+        models.Book.format_identifier(f.name, query)
         for f in models.Edition._meta.get_fields()
         if hasattr(f, "deduplication_field") and f.deduplication_field
     ]
 
-    results = None
-    # We assume that identifier hits only one field and we care only first hit
-    #  searching each field seprately makes overall search littlebit slower in case all fields needs to be checked, but each
-    #  query is really small for db load.
-    # we iterate reverse order so Edition specific fields are first
-    #  like isbn10, isbn13 and oclc number
-    for f in edition_deduplication_fields[::-1]:
-        field_results = books.filter(*filters, Q(**f))
-        if field_results.exists() is False:
-            continue
-        if return_first:
-            return field_results.first()
-        if results is None:
-            results = field_results
-        else:
-            results |= field_results
-
-    return results
-
 
 def search_title_author(
     query,
@@ -148,32 +159,59 @@ def search_title_author(
     return_first=False,
     books=None,
 ) -> QuerySet[models.Edition]:
-    """searches for title and author"""
+    """searches for title and author, allowing for typos"""
     books = books or models.Edition.objects
-    query = SearchQuery(query, config="simple") | SearchQuery(query, config="english")
+    search_query = SearchQuery(query, config="simple") | SearchQuery(
+        query, config="english"
+    )
+    # misspelled titles and author names won't be in the search vector, but will
+    # still have most of their trigrams in common with the query
+    author_similarity = (
+        models.Book.authors.through.objects.filter(book=OuterRef("pk"))
+        .annotate(similarity=TrigramWordSimilarity(query, "author__name"))
+        .order_by("-similarity")
+        .values("similarity")[:1]
+    )
+    similar_authors = models.Book.authors.through.objects.filter(
+        Q(author__name__trigram_similar=query)
+        | Q(author__name__trigram_word_similar=query)
+    ).values("book")
     results = (
-        books.filter(*filters, search_vector=query)
-        .annotate(rank=SearchRank(F("search_vector"), query, normalization=32))
+        books.filter(*filters)
+        .filter(
+            Q(search_vector=search_query)
+            | Q(title__trigram_similar=query)
+            | Q(title__trigram_word_similar=query)
+            | Q(id__in=similar_authors)
+        )
+        .annotate(
+            rank=SearchRank(F("search_vector"), search_query, normalization=32)
+            + Greatest(
+                TrigramWordSimilarity(query, "title"),
+                Coalesce(Subquery(author_similarity), 0.0),
+            )
+        )
         .filter(rank__gt=min_confidence)
         .order_by("-rank")
     )
 
-    # when there are multiple editions of the same work, pick the closest
-    editions_of_work = results.values_list("parent_work__id", flat=True).distinct()
-
-    # filter out multiple editions of the same work
-    list_results = []
-    for work_id in editions_of_work[:30]:
-        result = (
-            results.filter(parent_work=work_id)
-            .order_by("-rank", "-edition_rank")
-            .first()
+    # when there are multiple editions of the same work, pick the closest, all
+    # in one query rather than one per work
+    results = (
+        results.annotate(
+            work_rank=Window(
+                RowNumber(),
+                partition_by=F("parent_work"),
+                order_by=[F("rank").desc(), F("edition_rank").desc()],
+            )
         )
+        .filter(work_rank=1)
+        .order_by("-rank", "-edition_rank")
+    )
 
-        if return_first:
-            return result
-        list_results.append(result)
-    return list_results
+    if return_first:
+        return results.first()
+    return list(results[:30])
 
 
 @dataclass
@@ -194,7 +232,7 @@ class SearchResult:
             self.key, self.title, self.author, self.confidence
         )
 
-    def json(self):
+    def json(self) -> dict[str, Any]:
         """serialize a connector for json response"""
         serialized = asdict(self)
         del serialized["connector"]
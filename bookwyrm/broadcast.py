@@ -0,0 +1,191 @@
+"""deliver activities to remote inboxes"""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+from urllib.parse import urlparse
+
+import aiohttp
+from django.utils.http import http_date
+
+from bookwyrm.settings import (
+    USER_AGENT,
+    BROADCAST_TIMEOUT,
+    BROADCAST_MAX_CONNECTIONS,
+    BROADCAST_MAX_CONNECTIONS_PER_HOST,
+    BROADCAST_MAX_RETRIES,
+    BROADCAST_RETRY_QUEUE_SIZE,
+)
+from bookwyrm.signatures import make_signature, make_digest
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# the remote server may well accept the activity if we try again later
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+# the remote server didn't like the signature, which for older versions of
+# bookwyrm means it's expecting the legacy keyId
+SIGNATURE_STATUSES = {401, 403}
+
+
+class Broadcaster:
+    """one event loop and http session per worker process, shared by every
+    broadcast it sends, so that connections and dns lookups are reused"""
+
+    def __init__(self) -> None:
+        self.pid: Optional[int] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """run a coroutine on the worker's event loop and wait for the result"""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.get_loop())
+        return future.result()
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        """the loop runs in its own thread, which doesn't survive a fork"""
+        with self.lock:
+            if self.loop is None or self.pid != os.getpid():
+                self.loop = asyncio.new_event_loop()
+                self.session = None
+                self.pid = os.getpid()
+                threading.Thread(
+                    target=self.loop.run_forever, name="broadcast", daemon=True
+                ).start()
+            return self.loop
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """the http session, which has to be created from within the loop"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=BROADCAST_TIMEOUT),
+                connector=aiohttp.TCPConnector(
+                    limit=BROADCAST_MAX_CONNECTIONS,
+                    limit_per_host=BROADCAST_MAX_CONNECTIONS_PER_HOST,
+                    ttl_dns_cache=300,
+                ),
+            )
+        return self.session
+
+    def close(self) -> None:
+        """shut down the session when the worker exits"""
+        if self.pid != os.getpid() or not self.loop:
+            return
+        if self.session and not self.session.closed:
+            asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result(
+                timeout=5
+            )
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+broadcaster = Broadcaster()
+
+
+class SignedActivity:
+    """an activity on its way to many inboxes. The digest is the same for all of
+    them, and a signature can be reused for as long as the date stays the same"""
+
+    def __init__(self, sender: Any, data: str) -> None:
+        if not sender.key_pair.private_key:
+            # this shouldn't happen. it would be bad if it happened.
+            raise ValueError("No private key found for sender")
+        self.sender = sender
+        self.data = data
+        self.digest = make_digest(data)
+        self.signatures: dict[tuple[str, str, bool], tuple[str, str]] = {}
+
+    def get_headers(
+        self, destination: str, use_legacy_key: bool = False
+    ) -> dict[str, str]:
+        """the signed headers for posting to an inbox"""
+        now = http_date()
+        # the signature covers the host and path, but nothing else about the url
+        inbox_parts = urlparse(destination)
+        key = (inbox_parts.netloc, inbox_parts.path, use_legacy_key)
+        date, signature = self.signatures.get(key, (None, None))
+        if date != now or signature is None:
+            signature = make_signature(
+                "post",
+                self.sender,
+                destination,
+                now,
+                digest=self.digest,
+                use_legacy_key=use_legacy_key,
+            )
+            self.signatures[key] = (now, signature)
+
+        return {
+            "Date": now,
+            "Digest": self.digest,
+            "Signature": signature,
+            "Content-Type": "application/activity+json; charset=utf-8",
+            "User-Agent": USER_AGENT,
+        }
+
+
+async def deliver(recipients: list[str], sender: Any, data: str) -> None:
+    """send an activity to all its recipients at once, then retry the ones
+    that failed in a way that might work next time"""
+    session = broadcaster.get_session()
+    activity = SignedActivity(sender, data)
+
+    pending = [(recipient, False) for recipient in recipients]
+    for attempt in range(BROADCAST_MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(2 ** (attempt - 1))
+        results = await asyncio.gather(
+            *(
+                sign_and_send(session, activity, destination, use_legacy_key)
+                for (destination, use_legacy_key) in pending
+            )
+        )
+
+        retries = []
+        for (destination, use_legacy_key), status in zip(pending, results):
+            if status in SIGNATURE_STATUSES and not use_legacy_key:
+                logger.info("Trying %s again with legacy keyId", destination)
+                retries.append((destination, True))
+            elif status is None or status in RETRY_STATUSES:
+                retries.append((destination, use_legacy_key))
+
+        if len(retries) > BROADCAST_RETRY_QUEUE_SIZE:
+            logger.warning(
+                "Not retrying broadcast to %d inboxes",
+                len(retries) - BROADCAST_RETRY_QUEUE_SIZE,
+            )
+        pending = retries[:BROADCAST_RETRY_QUEUE_SIZE]
+        if not pending:
+            return
+
+    logger.info("Gave up on broadcast to %d inboxes", len(pending))
+
+
+async def sign_and_send(
+    session: aiohttp.ClientSession,
+    activity: SignedActivity,
+    destination: str,
+    use_legacy_key: bool = False,
+) -> Optional[int]:
+    """post the activity to one inbox, returning the response status, or None
+    if there wasn't a response"""
+    headers = activity.get_headers(destination, use_legacy_key=use_legacy_key)
+    try:
+        async with session.post(
+            destination, data=activity.data, headers=headers
+        ) as response:
+            if not response.ok:
+                logger.warning(
+                    "Failed to send broadcast to %s: %s", destination, response.reason
+                )
+            return response.status
+    except asyncio.TimeoutError:
+        logger.info("Connection timed out for url: %s", destination)
+    except aiohttp.ClientError as err:
+        logger.exception(err)
+    return None
@@ -8,6 +8,7 @@ from urllib.parse import quote_plus
 import logging
 import re
 import asyncio
+import time
 from PIL import Image, UnidentifiedImageError
 import requests
 import redis.asyncio as redis
@@ -15,6 +16,7 @@ from requests.exceptions import RequestException
 import aiohttp
 
 from django.contrib.postgres.search import SearchRank, SearchVector
+from django.core.cache import cache
 from django.core.files.base import ContentFile
 from django.utils import timezone
 from django.db import transaction
@@ -23,6 +25,7 @@ from django.db.models import Subquery
 from bookwyrm import activitypub, models, settings
 from bookwyrm.settings import USER_AGENT, INSTANCE_ACTOR_USERNAME, REDIS_ACTIVITY_URL
 from bookwyrm.tasks import app, CONNECTORS
+from . import circuit_breaker
 from .connector_manager import load_more_data, ConnectorException, raise_not_valid_url
 from .format_mappings import format_mappings
 from ..book_search import SearchResult
@@ -45,9 +48,14 @@ class ConnectorResults(TypedDict):
 class AbstractMinimalConnector(ABC):
     """just the bare bones, for other bookwyrm instances"""
 
-    def __init__(self, identifier: str):
+    # how long search results from this connector stay fresh
+    search_cache_timeout = settings.SEARCH_CACHE_TIMEOUT
+
+    def __init__(
+        self, identifier: str, connector_info: Optional[models.Connector] = None
+    ):
         # load connector settings
-        info = models.Connector.objects.get(identifier=identifier)
+        info = connector_info or models.Connector.objects.get(identifier=identifier)
         self.connector = info
 
         # the things in the connector model to copy over
@@ -57,7 +65,7 @@ class AbstractMinimalConnector(ABC):
         self.search_url = info.search_url
         self.isbn_search_url = info.isbn_search_url
         self.name = info.name
-        self.identifier = info.identifier
+        self.identifier: str = info.identifier
 
     def get_search_url(self, query: str) -> str:
         """format the query url"""
@@ -95,71 +103,71 @@ class AbstractMinimalConnector(ABC):
             "User-Agent": USER_AGENT,
         }
         params = {"min_confidence": str(min_confidence)}
-        error_ratelimit_key = f"connector:error:{self.connector.pk}"
-        success_ratelimit_key = f"connector:success:{self.connector.pk}"
-        try:
-            async with (
-                session.get(url, headers=headers, params=params) as response,
-                redis.from_url(REDIS_ACTIVITY_URL) as r,  # type: ignore[no-untyped-call]
-            ):
-                if not response.ok:
-                    if await r.set(
-                        error_ratelimit_key, "1", nx=True, ex=CONNECTOR_STATUS_RATE
-                    ):
-                        update_connector_status.delay(
-                            self.connector.pk,
-                            f"Unable to connect to {url}: {response.reason}",
+        async with redis.from_url(REDIS_ACTIVITY_URL) as r:  # type: ignore[no-untyped-call]
+            timeout = await circuit_breaker.get_timeout(r, self.connector.pk)
+            if timeout is None:
+                logger.info("Skipping %s, which isn't responding", self.identifier)
+                return None
+
+            start = time.monotonic()
+            try:
+                async with session.get(
+                    url,
+                    headers=headers,
+                    params=params,
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                ) as response:
+                    if not response.ok:
+                        await self.record_search_error(
+                            r, f"Unable to connect to {url}: {response.reason}"
                         )
-                    logger.info("Unable to connect to %s: %s", url, response.reason)
-                    return None
+                        logger.info("Unable to connect to %s: %s", url, response.reason)
+                        return None
+
+                    try:
+                        raw_data = await response.json()
+                    except aiohttp.client_exceptions.ContentTypeError as err:
+                        await self.record_search_error(
+                            r, f"ContentType Error: {str(err)}"
+                        )
+                        logger.exception(err)
+                        return None
 
-                try:
-                    raw_data = await response.json()
-                except aiohttp.client_exceptions.ContentTypeError as err:
+                    await circuit_breaker.record_success(
+                        r, self.connector.pk, time.monotonic() - start
+                    )
                     if await r.set(
-                        error_ratelimit_key, "1", nx=True, ex=CONNECTOR_STATUS_RATE
+                        f"connector:success:{self.connector.pk}",
+                        "1",
+                        nx=True,
+                        ex=CONNECTOR_STATUS_RATE,
                     ):
-                        update_connector_status.delay(
-                            self.connector.pk, f"ContentType Error: {str(err)}"
-                        )
-                    logger.exception(err)
-
-                    return None
-
-                if await r.set(
-                    success_ratelimit_key, "1", nx=True, ex=CONNECTOR_STATUS_RATE
-                ):
-                    update_connector_status.delay(self.connector.id)
-                return ConnectorResults(
-                    connector=self,
-                    results=self.process_search_response(
-                        query, raw_data, min_confidence
-                    ),
-                )
-        except asyncio.TimeoutError:
-            async with redis.from_url(  # type: ignore[no-untyped-call]
-                REDIS_ACTIVITY_URL
-            ) as r:
-                if await r.set(
-                    error_ratelimit_key, "1", nx=True, ex=CONNECTOR_STATUS_RATE
-                ):
-                    update_connector_status.delay(
-                        self.connector.pk, f"Timed out for url: {url}"
-                    )
-            logger.info("Connection timed out for url: %s", url)
-        except aiohttp.ClientError as err:
-            async with redis.from_url(  # type: ignore[no-untyped-call]
-                REDIS_ACTIVITY_URL
-            ) as r:
-                if await r.set(
-                    error_ratelimit_key, "1", nx=True, ex=CONNECTOR_STATUS_RATE
-                ):
-                    update_connector_status.delay(
-                        self.connector.pk, f"Client Error: {str(err)}"
+                        update_connector_status.delay(self.connector.id)
+                    return ConnectorResults(
+                        connector=self,
+                        results=self.process_search_response(
+                            query, raw_data, min_confidence
+                        ),
                     )
-            logger.info(err)
+            except asyncio.TimeoutError:
+                await self.record_search_error(r, f"Timed out for url: {url}")
+                logger.info("Connection timed out for url: %s", url)
+            except aiohttp.ClientError as err:
+                await self.record_search_error(r, f"Client Error: {str(err)}")
+                logger.info(err)
         return None
 
+    async def record_search_error(self, r: redis.Redis, message: str) -> None:
+        """count the failure, and save it to the connector every so often"""
+        await circuit_breaker.record_failure(r, self.connector.pk)
+        if await r.set(
+            f"connector:error:{self.connector.pk}",
+            "1",
+            nx=True,
+            ex=CONNECTOR_STATUS_RATE,
+        ):
+            update_connector_status.delay(self.connector.pk, message)
+
     def get_or_create_seriesbook_from_data(  # pylint: disable=no-self-use
         self,
         work: models.Work,
@@ -259,8 +267,10 @@ class AbstractConnector(AbstractMinimalConnector):
 
     generated_remote_link_field = ""
 
-    def __init__(self, identifier: str):
-        super().__init__(identifier)
+    def __init__(
+        self, identifier: str, connector_info: Optional[models.Connector] = None
+    ):
+        super().__init__(identifier, connector_info)
         # fields we want to look for in book data to copy over
         # title we handle separately.
         self.book_mappings: list[Mapping] = []
@@ -361,6 +371,71 @@ class AbstractConnector(AbstractMinimalConnector):
 
         return edition
 
+    def create_editions_from_data(
+        self, work: models.Work, editions_data: list[JsonDict]
+    ) -> list[models.Edition]:
+        """load a batch of a work's editions, looking up the ones we already
+        have in one query and linking up authors all at once"""
+        activities = []
+        for edition_data in editions_data:
+            mapped_data = dict_from_mappings(edition_data, self.book_mappings)
+            mapped_data["work"] = work.remote_id
+            edition_activity = activitypub.Edition(**mapped_data)
+            identifiers = models.Edition.get_identifiers_from_data(
+                edition_activity.serialize()  # type: ignore[no-untyped-call]
+            )
+            activities.append((edition_data, edition_activity, identifiers))
+
+        existing: dict[str, models.Edition] = {}
+        if all_identifiers := [i for (*_, ids) in activities for i in ids]:
+            for edition in models.Edition.objects.filter(
+                identifiers__overlap=all_identifiers
+            ):
+                existing.update(dict.fromkeys(edition.identifiers, edition))
+
+        editions = []
+        edition_authors: dict[int, list[int]] = {}
+        for edition_data, edition_activity, identifiers in activities:
+            instance = next((existing[i] for i in identifiers if i in existing), None)
+            edition = edition_activity.to_model(
+                model=models.Edition, overwrite=False, instance=instance
+            )
+            if not edition:
+                continue
+            # later editions in the batch might be duplicates of this one
+            existing.update(dict.fromkeys(identifiers, edition))
+            editions.append(edition)
+            edition_authors.setdefault(edition.id, []).extend(
+                author.id for author in self.get_authors_from_data(edition_data)
+            )
+
+        models.Edition.objects.filter(
+            id__in=edition_authors, connector__isnull=True
+        ).update(connector=self.connector)
+        for edition in editions:
+            if not edition.connector_id:
+                edition.connector = self.connector
+
+        # use the authors from the work for editions that don't have any
+        through = models.Book.authors.through
+        has_authors = set(
+            through.objects.filter(book_id__in=edition_authors).values_list(
+                "book_id", flat=True
+            )
+        )
+        work_author_ids = list(work.authors.values_list("id", flat=True))
+        links = [
+            through(book_id=edition_id, author_id=author_id)
+            for edition_id, author_ids in edition_authors.items()
+            for author_id in (
+                author_ids or (work_author_ids if edition_id not in has_authors else [])
+            )
+        ]
+        through.objects.bulk_create(links, ignore_conflicts=True)
+        cache.delete_many({f"author-books-{link.author_id}" for link in links})
+
+        return editions
+
     def get_or_create_author(
         self, remote_id: str, instance: Optional[models.Author] = None
     ) -> Optional[models.Author]:
@@ -1,9 +1,9 @@
 """using another bookwyrm instance as a source of book data"""
 
 from __future__ import annotations
-from typing import Any, Iterator
+from typing import Any, Iterator, Optional
 
-from bookwyrm import activitypub, models
+from bookwyrm import activitypub, models, settings
 from bookwyrm.book_search import SearchResult
 from .abstract_connector import AbstractMinimalConnector
 
@@ -11,9 +11,14 @@ from .abstract_connector import AbstractMinimalConnector
 class Connector(AbstractMinimalConnector):
     """this is basically just for search"""
 
-    def __init__(self, identifier: str):
+    # other instances add books as their users find them
+    search_cache_timeout = settings.SEARCH_CACHE_TIMEOUT // 4
+
+    def __init__(
+        self, identifier: str, connector_info: Optional[models.Connector] = None
+    ):
         models.SiteSettings.raise_federation_disabled()
-        super().__init__(identifier)
+        super().__init__(identifier, connector_info)
 
     def get_or_create_book(self, remote_id: str) -> models.Edition:
         edition = activitypub.resolve_remote_id(remote_id, model=models.Edition)
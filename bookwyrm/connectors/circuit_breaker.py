@@ -0,0 +1,85 @@
+"""stop waiting on connectors that aren't responding"""
+
+import logging
+import math
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from bookwyrm.settings import SEARCH_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# searches that fail in a row before the connector is skipped
+FAILURE_THRESHOLD = 5
+# seconds to skip a failing connector for before trying it again
+OPEN_TIMEOUT = 5 * 60
+# failures that aren't followed by another one are forgotten after a day
+FAILURE_TIMEOUT = 60 * 60 * 24
+# how many recent response times to base the timeout on
+LATENCY_SAMPLES = 50
+MIN_LATENCY_SAMPLES = 10
+# the timeout is the 95th percentile response time, with some room to spare
+TIMEOUT_HEADROOM = 1.5
+MIN_TIMEOUT = 1.0
+
+
+def get_key(connector_id: int, name: str) -> str:
+    """the redis key for part of a connector's health"""
+    return f"connector:health:{connector_id}:{name}"
+
+
+def get_timeout_for_latencies(latencies: list[float]) -> float:
+    """how long to wait, based on how long the connector usually takes"""
+    if len(latencies) < MIN_LATENCY_SAMPLES:
+        return float(SEARCH_TIMEOUT)
+    latencies = sorted(latencies)
+    p95 = latencies[math.ceil(len(latencies) * 0.95) - 1]
+    return min(max(p95 * TIMEOUT_HEADROOM, MIN_TIMEOUT), float(SEARCH_TIMEOUT))
+
+
+async def get_timeout(r: Redis, connector_id: int) -> Optional[float]:
+    """how long to wait for a connector, or None if it shouldn't be searched.
+    A connector that keeps failing is skipped for a while, and after that
+    one search at a time is let through to see if it has recovered"""
+    async with r.pipeline() as pipeline:
+        pipeline.exists(get_key(connector_id, "open"))
+        pipeline.get(get_key(connector_id, "failures"))
+        pipeline.lrange(get_key(connector_id, "latency"), 0, -1)
+        is_open, failures, latencies = await pipeline.execute()
+
+    if is_open:
+        return None
+
+    timeout = get_timeout_for_latencies([float(latency) for latency in latencies])
+    if int(failures or 0) >= FAILURE_THRESHOLD:
+        # half open: only one search gets to find out if it's working again
+        if not await r.set(
+            get_key(connector_id, "probe"), 1, nx=True, ex=SEARCH_TIMEOUT
+        ):
+            return None
+    return timeout
+
+
+async def record_success(r: Redis, connector_id: int, latency: float) -> None:
+    """the connector responded, and how long it took"""
+    async with r.pipeline() as pipeline:
+        pipeline.delete(
+            get_key(connector_id, "failures"), get_key(connector_id, "probe")
+        )
+        pipeline.lpush(get_key(connector_id, "latency"), latency)
+        pipeline.ltrim(get_key(connector_id, "latency"), 0, LATENCY_SAMPLES - 1)
+        await pipeline.execute()
+
+
+async def record_failure(r: Redis, connector_id: int) -> None:
+    """the connector didn't respond usefully"""
+    async with r.pipeline() as pipeline:
+        pipeline.incr(get_key(connector_id, "failures"))
+        pipeline.expire(get_key(connector_id, "failures"), FAILURE_TIMEOUT)
+        pipeline.delete(get_key(connector_id, "probe"))
+        failures, *_ = await pipeline.execute()
+
+    if failures >= FAILURE_THRESHOLD:
+        logger.info("Skipping connector %s after %d failures", connector_id, failures)
+        await r.set(get_key(connector_id, "open"), 1, ex=OPEN_TIMEOUT)
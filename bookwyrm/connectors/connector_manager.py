@@ -6,23 +6,37 @@ import importlib
 import ipaddress
 import logging
 from asyncio import Future
-from typing import Iterator, Any, Optional, Union, overload, Literal
+from typing import (
+    AsyncGenerator,
+    Iterator,
+    Any,
+    Optional,
+    TypeVar,
+    Union,
+    overload,
+    Literal,
+)
 from urllib.parse import urlparse
 
 import aiohttp
 from django.dispatch import receiver
+from django.db import transaction
 from django.db.models import signals
+import redis
 
 from requests import HTTPError
 
 from bookwyrm import book_search, models
 from bookwyrm.book_search import SearchResult
-from bookwyrm.connectors import abstract_connector
+from bookwyrm.connectors import abstract_connector, search_cache
+from bookwyrm.redis_store import r
 from bookwyrm.settings import SEARCH_TIMEOUT
 from bookwyrm.tasks import app, CONNECTORS
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class ConnectorException(HTTPError):
     """when the connector can't do what was asked"""
@@ -48,6 +62,135 @@ async def async_connector_search(
         return list(results)
 
 
+async def async_connector_search_iter(
+    query: str,
+    items: list[tuple[str, abstract_connector.AbstractConnector]],
+    min_confidence: float,
+) -> AsyncGenerator[Optional[abstract_connector.ConnectorResults], None]:
+    """Try a number of requests simultaneously, yielding each as it finishes"""
+    timeout = aiohttp.ClientTimeout(total=SEARCH_TIMEOUT)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        tasks = [
+            asyncio.ensure_future(
+                connector.get_results(session, url, min_confidence, query)
+            )
+            for (url, connector) in items
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # if whoever is waiting on the results has gone away
+            for task in tasks:
+                task.cancel()
+
+
+async def async_connector_search_many(
+    searches: list[tuple[str, str, abstract_connector.AbstractConnector]],
+    min_confidence: float,
+    concurrency: int,
+) -> list[tuple[str, Optional[abstract_connector.ConnectorResults]]]:
+    """Run lots of (query, url, connector) searches at once, without sending
+    any one connector more than a few requests at a time"""
+    limits = {
+        connector.identifier: asyncio.Semaphore(concurrency)
+        for (_, _, connector) in searches
+    }
+    timeout = aiohttp.ClientTimeout(total=SEARCH_TIMEOUT)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+
+        async def limited_search(
+            query: str, url: str, connector: abstract_connector.AbstractConnector
+        ) -> tuple[str, Optional[abstract_connector.ConnectorResults]]:
+            async with limits[connector.identifier]:
+                return query, await connector.get_results(
+                    session, url, min_confidence, query
+                )
+
+        return await asyncio.gather(
+            *(limited_search(*search_args) for search_args in searches)
+        )
+
+
+def run_async_iterator(iterator: AsyncGenerator[T, None]) -> Iterator[T]:
+    """consume an async iterator one item at a time, without waiting for the
+    whole thing to finish"""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(anext(iterator))
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(iterator.aclose())
+        loop.close()
+
+
+def get_search_connectors(
+    query: str,
+) -> list[abstract_connector.AbstractConnector]:
+    """the connectors that can be searched for a query"""
+    connectors = []
+    for connector in get_connectors():
+        # get the search url from the connector before sending
+        url = connector.get_search_url(query)
+        try:
+            raise_not_valid_url(url)
+        except ConnectorException:
+            # if this URL is invalid we should skip it and move on
+            logger.info("Request denied to blocked domain: %s", url)
+            continue
+        connectors.append(connector)
+    return connectors
+
+
+def get_cached_results(
+    connector: abstract_connector.AbstractConnector,
+    query: str,
+    min_confidence: float,
+) -> Optional[list[SearchResult]]:
+    """use recent results if we have them, refreshing them if they're stale"""
+    cached_results = search_cache.get_results(connector, query, min_confidence)
+    if cached_results is None:
+        return None
+    connector_results, stale = cached_results
+    if stale and search_cache.claim_refresh(connector, query, min_confidence):
+        refresh_search_results.delay(connector.connector.id, query, min_confidence)
+    return connector_results
+
+
+def iter_search_results(
+    query: str,
+    connectors: list[abstract_connector.AbstractConnector],
+    min_confidence: float = 0.1,
+) -> Iterator[abstract_connector.ConnectorResults]:
+    """search the connectors, yielding results as soon as they're available:
+    cached results first, and then each connector as it responds"""
+    items = []
+    for connector in connectors:
+        connector_results = get_cached_results(connector, query, min_confidence)
+        if connector_results is None:
+            items.append((connector.get_search_url(query), connector))
+            continue
+        yield abstract_connector.ConnectorResults(
+            connector=connector, results=connector_results
+        )
+
+    if not items:
+        return
+    # failed requests will return None, so filter those out
+    for result in run_async_iterator(
+        async_connector_search_iter(query, items, min_confidence)
+    ):
+        if not result:
+            continue
+        search_cache.set_results(
+            result["connector"], query, min_confidence, result["results"]
+        )
+        yield result
+
+
 @overload
 def search(
     query: str, *, min_confidence: float = 0.1, return_first: Literal[False]
@@ -67,25 +210,13 @@ def search(
     if not query:
         return None if return_first else []
 
-    items = []
-    for connector in get_connectors():
-        # get the search url from the connector before sending
-        url = connector.get_search_url(query)
-        try:
-            raise_not_valid_url(url)
-        except ConnectorException:
-            # if this URL is invalid we should skip it and move on
-            logger.info("Request denied to blocked domain: %s", url)
-            continue
-        items.append((url, connector))
-
-    # load as many results as we can
-    # failed requests will return None, so filter those out
-    results = [
-        r
-        for r in asyncio.run(async_connector_search(query, items, min_confidence))
-        if r
-    ]
+    connectors = get_search_connectors(query)
+    # keep the results in the order of the connectors' priority
+    priority = {connector.identifier: i for (i, connector) in enumerate(connectors)}
+    results = sorted(
+        iter_search_results(query, connectors, min_confidence),
+        key=lambda result: priority[result["connector"].identifier],
+    )
 
     if return_first:
         # find the best result from all the responses and return that
@@ -96,6 +227,61 @@ def search(
     return results
 
 
+def first_search_results(
+    queries: list[str], min_confidence: float = 0.1, concurrency: int = 4
+) -> dict[str, SearchResult]:
+    """the best remote result for each of a batch of queries, which are all
+    searched at once"""
+    if not queries:
+        return {}
+    # the connectors' hosts don't depend on what's being searched
+    connectors = get_search_connectors(queries[0])
+    priority = {connector.identifier: i for (i, connector) in enumerate(connectors)}
+
+    results: dict[str, list[abstract_connector.ConnectorResults]] = {
+        query: [] for query in queries
+    }
+    searches = []
+    for query in results:
+        for connector in connectors:
+            connector_results = get_cached_results(connector, query, min_confidence)
+            if connector_results is None:
+                searches.append((query, connector.get_search_url(query), connector))
+                continue
+            results[query].append(
+                abstract_connector.ConnectorResults(
+                    connector=connector, results=connector_results
+                )
+            )
+
+    if searches:
+        for query, result in asyncio.run(
+            async_connector_search_many(searches, min_confidence, concurrency)
+        ):
+            # failed requests will return None
+            if not result:
+                continue
+            search_cache.set_results(
+                result["connector"], query, min_confidence, result["results"]
+            )
+            results[query].append(result)
+
+    first_results = {}
+    for query, query_results in results.items():
+        # the most confident result, with ties going to the preferred connector
+        all_results = [
+            r
+            for con in sorted(
+                query_results,
+                key=lambda result: priority[result["connector"].identifier],
+            )
+            for r in con["results"]
+        ]
+        if all_results:
+            first_results[query] = max(all_results, key=lambda r: r.confidence)
+    return first_results
+
+
 def first_search_result(
     query: str, min_confidence: float = 0.1
 ) -> Union[models.Edition, SearchResult, None]:
@@ -110,12 +296,84 @@ def first_search_result(
 
 def get_connectors() -> Iterator[abstract_connector.AbstractConnector]:
     """load all connectors"""
-    queryset = models.Connector.objects.filter(active=True)
-    if models.SiteSettings.get().disable_federation:
-        queryset = queryset.exclude(connector_file="bookwyrm_connector")
+    yield from connector_registry.get()
+
+
+class ConnectorRegistry:
+    """the active connectors, ready to search, kept in each process until the
+    version number in redis changes (as it does whenever a connector is saved)"""
+
+    version_key = "connectors-version"
+    # saving these fields doesn't change how a connector searches
+    status_fields = {"latest_error", "most_recent_error", "most_recent_success"}
+
+    def __init__(self) -> None:
+        self.connectors: Optional[list[abstract_connector.AbstractConnector]] = None
+        self.version: Optional[bytes] = None
+        self.disable_federation: Optional[bool] = None
+        # saved, but not yet committed
+        self.changing = False
+
+    def get(self) -> list[abstract_connector.AbstractConnector]:
+        """the connectors, if they're up to date, or fresh from the database"""
+        disable_federation = models.SiteSettings.get().disable_federation
+        if self.changing:
+            return self.load(disable_federation)
+        try:
+            version = r.get(self.version_key)
+        except redis.exceptions.RedisError:
+            return self.load(disable_federation)
+
+        connectors = self.connectors
+        if (
+            connectors is None
+            or version != self.version
+            or disable_federation != self.disable_federation
+        ):
+            connectors = self.load(disable_federation)
+            self.connectors = connectors
+            self.version, self.disable_federation = version, disable_federation
+        return list(connectors)
+
+    def load(
+        self, disable_federation: bool
+    ) -> list[abstract_connector.AbstractConnector]:
+        """set up the active connectors"""
+        queryset = models.Connector.objects.filter(active=True)
+        if disable_federation:
+            queryset = queryset.exclude(connector_file="bookwyrm_connector")
+        return [load_connector(info) for info in queryset.order_by("priority")]
+
+    def invalidate(self) -> None:
+        """a connector has been saved, but the change may not be visible to
+        other processes until it's committed"""
+        self.changing = True
+        self.connectors = None
+        transaction.on_commit(self.publish)
+
+    def publish(self) -> None:
+        """let every process know that its connectors are out of date"""
+        self.changing = False
+        self.connectors = None
+        try:
+            r.incr(self.version_key)
+        except redis.exceptions.RedisError:
+            pass
 
-    for info in queryset.order_by("priority").all():
-        yield load_connector(info)
+
+connector_registry = ConnectorRegistry()
+
+
+@receiver(signals.post_save, sender="bookwyrm.Connector")
+@receiver(signals.post_delete, sender="bookwyrm.Connector")
+def invalidate_connectors(
+    sender: Any, instance: models.Connector, *args: Any, **kwargs: Any
+) -> None:
+    """the connectors need to be set up again"""
+    update_fields = kwargs.get("update_fields")
+    if update_fields and set(update_fields) <= ConnectorRegistry.status_fields:
+        return
+    connector_registry.invalidate()
 
 
 def get_or_create_connector(remote_id: str) -> abstract_connector.AbstractConnector:
@@ -154,6 +412,27 @@ def load_more_data(connector_id: str, book_id: str) -> None:
     connector.expand_book_data(book)
 
 
+@app.task(queue=CONNECTORS)
+def refresh_search_results(
+    connector_id: int, query: str, min_confidence: float
+) -> None:
+    """replace a connector's stale search results with new ones"""
+    connector_info = models.Connector.objects.get(id=connector_id)
+    connector = load_connector(connector_info)
+    url = connector.get_search_url(query)
+    try:
+        raise_not_valid_url(url)
+    except ConnectorException:
+        logger.info("Request denied to blocked domain: %s", url)
+        return
+
+    (result,) = asyncio.run(
+        async_connector_search(query, [(url, connector)], min_confidence)
+    )
+    if result:
+        search_cache.set_results(connector, query, min_confidence, result["results"])
+
+
 @app.task(queue=CONNECTORS)
 def create_edition_task(
     connector_id: int, work_id: int, data: Union[str, abstract_connector.JsonDict]
@@ -167,6 +446,19 @@ def create_edition_task(
     connector.create_edition_from_data(work, data)
 
 
+@app.task(queue=CONNECTORS)
+def create_editions_task(
+    connector_id: int, work_id: int, data: list[abstract_connector.JsonDict]
+) -> None:
+    """a batch of editions at a time, for works with lots of them"""
+    connector_info = models.Connector.objects.get(id=connector_id)
+    connector = load_connector(connector_info)
+    work = models.Work.objects.select_subclasses().get(  # type: ignore[no-untyped-call]
+        id=work_id
+    )
+    connector.create_editions_from_data(work, data)
+
+
 def load_connector(
     connector_info: models.Connector,
 ) -> abstract_connector.AbstractConnector:
@@ -174,7 +466,9 @@ def load_connector(
     connector = importlib.import_module(
         f"bookwyrm.connectors.{connector_info.connector_file}"
     )
-    return connector.Connector(connector_info.identifier)  # type: ignore[no-any-return]
+    return connector.Connector(  # type: ignore[no-any-return]
+        connector_info.identifier, connector_info
+    )
 
 
 @receiver(signals.post_save, sender="bookwyrm.FederatedServer")
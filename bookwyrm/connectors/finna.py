@@ -1,7 +1,7 @@
 """finna data connector"""
 
 import re
-from typing import Iterator
+from typing import Iterator, Optional
 
 from bookwyrm import models
 from bookwyrm.book_search import SearchResult
@@ -17,8 +17,10 @@ class Connector(AbstractConnector):
 
     generated_remote_link_field = "id"
 
-    def __init__(self, identifier: str):
-        super().__init__(identifier)
+    def __init__(
+        self, identifier: str, connector_info: Optional[models.Connector] = None
+    ):
+        super().__init__(identifier, connector_info)
 
         get_first = lambda x, *args: x[0] if x else None
         format_remote_id = lambda x: f"{self.books_url}{x}"
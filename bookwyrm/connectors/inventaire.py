@@ -15,8 +15,10 @@ class Connector(AbstractConnector):
 
     generated_remote_link_field = "inventaire_id"
 
-    def __init__(self, identifier: str):
-        super().__init__(identifier)
+    def __init__(
+        self, identifier: str, connector_info: Optional[models.Connector] = None
+    ):
+        super().__init__(identifier, connector_info)
 
         get_first = lambda a: a[0]
         shared_mappings = [
@@ -1,7 +1,7 @@
 """Libris (Swedish National Library) data connector"""
 
 import re
-from typing import Iterator
+from typing import Iterator, Optional
 
 from bookwyrm import models
 from bookwyrm.book_search import SearchResult
@@ -168,8 +168,10 @@ class Connector(AbstractConnector):
 
     generated_remote_link_field = "identifier"
 
-    def __init__(self, identifier: str):
-        super().__init__(identifier)
+    def __init__(
+        self, identifier: str, connector_info: Optional[models.Connector] = None
+    ):
+        super().__init__(identifier, connector_info)
 
         self.book_mappings = [
             Mapping("id", remote_field="identifier"),
@@ -10,17 +10,22 @@ from bookwyrm.book_search import SearchResult
 from bookwyrm.utils.sanitizer import clean
 from .abstract_connector import AbstractConnector, Mapping, JsonDict
 from .abstract_connector import get_data, infer_physical_format, unique_physical_format
-from .connector_manager import ConnectorException, create_edition_task
+from .connector_manager import ConnectorException, create_editions_task
 from .openlibrary_languages import languages
 
+# how many of a work's editions each task loads
+EDITIONS_PER_TASK = 100
+
 
 class Connector(AbstractConnector):
     """instantiate a connector for OL"""
 
     generated_remote_link_field = "openlibrary_link"
 
-    def __init__(self, identifier: str):
-        super().__init__(identifier)
+    def __init__(
+        self, identifier: str, connector_info: Optional[models.Connector] = None
+    ):
+        super().__init__(identifier, connector_info)
 
         get_first = lambda a, *args: a[0]
         get_remote_id = lambda a, *args: self.base_url + a
@@ -220,11 +225,16 @@ class Connector(AbstractConnector):
             # who knows, man
             return
 
-        for edition_data in edition_options.get("entries", []):
-            # does this edition have ANY interesting data?
-            if ignore_edition(edition_data):
-                continue
-            create_edition_task.delay(self.connector.id, work.id, edition_data)
+        # does this edition have ANY interesting data?
+        editions = [
+            edition_data
+            for edition_data in edition_options.get("entries", [])
+            if not ignore_edition(edition_data)
+        ]
+        for i in range(0, len(editions), EDITIONS_PER_TASK):
+            create_editions_task.delay(
+                self.connector.id, work.id, editions[i : i + EDITIONS_PER_TASK]
+            )
 
 
 def ignore_edition(edition_data: JsonDict) -> bool:
@@ -0,0 +1,110 @@
+"""remember what connectors found for a query, so repeat searches are fast"""
+
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import time
+from typing import Literal, Optional, TYPE_CHECKING
+
+import redis
+
+from bookwyrm.book_search import SearchResult
+from bookwyrm.redis_store import r
+from bookwyrm.settings import SEARCH_CACHE_STALE_TIMEOUT
+
+if TYPE_CHECKING:
+    from .abstract_connector import AbstractMinimalConnector
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = "search-cache-stats"
+
+CacheStat = Literal["hit", "stale", "miss"]
+
+
+def normalize_query(query: str) -> str:
+    """searches that only differ in case and spacing get the same results"""
+    return " ".join(query.lower().split())
+
+
+def get_cache_key(
+    connector: AbstractMinimalConnector, query: str, min_confidence: float
+) -> str:
+    """the redis key for a connector's results for a query"""
+    query_hash = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+    return f"search-cache:{connector.identifier}:{min_confidence}:{query_hash}"
+
+
+def get_results(
+    connector: AbstractMinimalConnector, query: str, min_confidence: float
+) -> Optional[tuple[list[SearchResult], bool]]:
+    """the cached results and whether they're stale, or None if there aren't any"""
+    key = get_cache_key(connector, query, min_confidence)
+    try:
+        value = r.get(key)
+    except redis.RedisError as err:
+        logger.warning("Unable to load cached search results: %s", err)
+        return None
+
+    if value is None:
+        record_stat(connector, "miss")
+        return None
+
+    cached = json.loads(value)
+    results = [
+        SearchResult(connector=connector, **result) for result in cached["results"]
+    ]
+    stale = time.time() - cached["time"] > connector.search_cache_timeout
+    record_stat(connector, "stale" if stale else "hit")
+    return results, stale
+
+
+def set_results(
+    connector: AbstractMinimalConnector,
+    query: str,
+    min_confidence: float,
+    results: list[SearchResult],
+) -> None:
+    """store a connector's results, which are kept around for a while after they
+    go stale in case they're all there is"""
+    key = get_cache_key(connector, query, min_confidence)
+    value = json.dumps(
+        {"time": time.time(), "results": [result.json() for result in results]}
+    )
+    try:
+        r.set(
+            key, value, ex=connector.search_cache_timeout + SEARCH_CACHE_STALE_TIMEOUT
+        )
+    except redis.RedisError as err:
+        logger.warning("Unable to cache search results: %s", err)
+
+
+def claim_refresh(
+    connector: AbstractMinimalConnector, query: str, min_confidence: float
+) -> bool:
+    """only one worker needs to refresh stale results"""
+    key = get_cache_key(connector, query, min_confidence)
+    try:
+        return bool(r.set(f"{key}:refresh", 1, nx=True, ex=60))
+    except redis.RedisError:
+        return False
+
+
+def record_stat(connector: AbstractMinimalConnector, stat: CacheStat) -> None:
+    """count cache hits and misses for each connector"""
+    try:
+        r.hincrby(STATS_KEY, f"{connector.identifier}:{stat}", 1)
+    except redis.RedisError:
+        pass
+
+
+def get_stats() -> dict[str, dict[str, int]]:
+    """hits, stale hits, and misses for each connector"""
+    stats: dict[str, dict[str, int]] = {}
+    for field, count in r.hgetall(STATS_KEY).items():
+        identifier, stat = field.decode("utf-8").rsplit(":", 1)
+        stats.setdefault(identifier, {"hit": 0, "stale": 0, "miss": 0})[stat] = int(
+            count
+        )
+    return stats
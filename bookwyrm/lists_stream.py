@@ -210,6 +210,18 @@ def add_list_on_account_create_command(user_id):
     populate_lists_task.delay(user_id)
 
 
+def bulk_populate_lists(resume=False):
+    """fill the lists streams for every user from a single pass over the lists"""
+    stream = ListsStream()
+    return stream.bulk_populate_stores(
+        models.List.objects.select_related("user", "group"),
+        stream.get_stores_for_object,
+        order_field="updated_date",
+        cursor_key="bulk-populate-lists-cursor",
+        resume=resume,
+    )
+
+
 # ---- TASKS
 @app.task(queue=LISTS)
 def populate_lists_task(user_id):
@@ -1,8 +1,30 @@
 """Generate preview images"""
 
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+import time
+
 from django.core.management.base import BaseCommand
+from django.db import connections
+
+from bookwyrm import models, preview_images, settings
+
+logger = logging.getLogger(__name__)
+
+# how often to say how it's going
+PROGRESS_INTERVAL = 100
+
 
-from bookwyrm import models, preview_images
+def render_preview(args):
+    """render one preview, in whichever process it's been given to"""
+    function, object_id = args
+    try:
+        function(object_id)
+    except Exception:  # a bad cover shouldn't stop the rest
+        logger.exception("Unable to generate preview image for %s", object_id)
+        return False
+    return True
 
 
 class Command(BaseCommand):
@@ -18,9 +40,20 @@ class Command(BaseCommand):
             action="store_true",
             help="Generates images for ALL types: site, users and books. Can use a lot of computing power.",
         )
+        parser.add_argument(
+            "--workers",
+            "-w",
+            type=int,
+            default=os.cpu_count(),
+            help="How many processes to render images in (defaults to one per CPU)",
+        )
 
     def handle(self, *args, **options):
         """generate preview images"""
+        if not settings.ENABLE_PREVIEW_IMAGES:
+            self.stdout.write("Preview images are not enabled on this instance")
+            return
+
         self.stdout.write(
             "   | Hello! I will be generating preview images for your instance."
         )
@@ -35,36 +68,65 @@ class Command(BaseCommand):
 
         # Site
         self.stdout.write("   → Site preview image: ", ending="")
-        preview_images.generate_site_preview_image_task.delay()
+        preview_images.generate_site_preview_image()
         self.stdout.write(" OK 🖼")
 
         if options["all"]:
             # Users
-            users = models.User.objects.filter(
-                local=True,
-                is_active=True,
+            user_ids = list(
+                models.User.objects.filter(
+                    local=True,
+                    is_active=True,
+                ).values_list("id", flat=True)
             )
-            self.stdout.write(
-                "   → User preview images ({}): ".format(len(users)), ending=""
+            self.render(
+                "User preview images",
+                preview_images.generate_user_preview_image,
+                user_ids,
+                options["workers"],
             )
-            for user in users:
-                preview_images.generate_user_preview_image_task.delay(user.id)
-                self.stdout.write(".", ending="")
-            self.stdout.write(" OK 🖼")
 
             # Books
-            book_ids = (
-                models.Book.objects.select_subclasses()
-                .filter()
-                .values_list("id", flat=True)
+            book_ids = list(models.Book.objects.values_list("id", flat=True))
+            self.render(
+                "Book preview images",
+                preview_images.generate_edition_preview_image,
+                book_ids,
+                options["workers"],
             )
 
-            self.stdout.write(
-                "   → Book preview images ({}): ".format(len(book_ids)), ending=""
-            )
-            for book_id in book_ids:
-                preview_images.generate_edition_preview_image_task.delay(book_id)
-                self.stdout.write(".", ending="")
-            self.stdout.write(" OK 🖼")
-
         self.stdout.write("🧑‍🎨 ⎨ I’m all done! ✧ Enjoy ✧")
+
+    def render(self, name, function, object_ids, workers):
+        """render previews in a pool of processes, each of which keeps its fonts
+        and layers around from one image to the next"""
+        self.stdout.write(f"   → {name} ({len(object_ids)}): ", ending="")
+        start = time.monotonic()
+        jobs = [(function, object_id) for object_id in object_ids]
+
+        if workers > 1:
+            # each process needs its own database connection
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                failures = self.report(
+                    executor.map(render_preview, jobs, chunksize=10), start
+                )
+        else:
+            failures = self.report(map(render_preview, jobs), start)
+
+        rate = len(object_ids) / max(time.monotonic() - start, 0.001)
+        self.stdout.write(f" OK 🖼 ({failures} failed, {rate:.1f} images per second)")
+
+    def report(self, results, start):
+        """keep track of how fast the images are being made"""
+        failures = 0
+        for count, success in enumerate(results, start=1):
+            failures += not success
+            if count % PROGRESS_INTERVAL == 0:
+                rate = count / max(time.monotonic() - start, 0.001)
+                self.stdout.write(
+                    f"\n     {count} done, {failures} failed, "
+                    f"{rate:.1f} images per second",
+                    ending="",
+                )
+        return failures
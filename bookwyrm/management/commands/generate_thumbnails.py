@@ -0,0 +1,96 @@
+"""Generate cover thumbnails"""
+
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from bookwyrm import models, settings
+from bookwyrm.thumbnail_generation import generate_thumbnails
+
+logger = logging.getLogger(__name__)
+
+# how often to say how it's going
+PROGRESS_INTERVAL = 100
+
+
+def generate_book_thumbnails(args):
+    """make the thumbnails for one book, in whichever process it's been given to"""
+    book_id, force = args
+    try:
+        return generate_thumbnails(models.Book.objects.get(id=book_id), force=force)
+    except Exception:  # a bad cover shouldn't stop the rest
+        logger.exception("Unable to generate thumbnails for book %s", book_id)
+        return None
+
+
+class Command(BaseCommand):
+    """Creates thumbnails for covers that don't have them yet"""
+
+    help = "Generate cover thumbnails"
+
+    def add_arguments(self, parser):
+        """options for how the command is run"""
+        parser.add_argument(
+            "--workers",
+            "-w",
+            type=int,
+            default=os.cpu_count(),
+            help="How many processes to make thumbnails in (defaults to one per CPU)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Replace thumbnails that already exist",
+        )
+
+    def handle(self, *args, **options):
+        """generate thumbnails"""
+        if not settings.ENABLE_THUMBNAIL_GENERATION:
+            self.stdout.write("Thumbnail generation is not enabled on this instance")
+            return
+
+        book_ids = list(
+            models.Book.objects.exclude(cover="")
+            .exclude(cover__isnull=True)
+            .values_list("id", flat=True)
+        )
+        self.stdout.write(f"Generating thumbnails for {len(book_ids)} covers")
+        jobs = [(book_id, options["force"]) for book_id in book_ids]
+        start = time.monotonic()
+
+        if options["workers"] > 1:
+            # each process needs its own database connection
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options["workers"]) as executor:
+                totals = self.report(
+                    executor.map(generate_book_thumbnails, jobs, chunksize=10), start
+                )
+        else:
+            totals = self.report(map(generate_book_thumbnails, jobs), start)
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {self.summarize(totals, start)}"))
+
+    def report(self, results, start):
+        """keep track of how fast the thumbnails are being made"""
+        totals = {"covers": 0, "thumbnails": 0, "failed": 0}
+        for result in results:
+            totals["covers"] += 1
+            if result is None:
+                totals["failed"] += 1
+            else:
+                totals["thumbnails"] += result
+            if totals["covers"] % PROGRESS_INTERVAL == 0:
+                self.stdout.write(self.summarize(totals, start))
+        return totals
+
+    def summarize(self, totals, start):
+        """how many covers have been done, and how quickly"""
+        rate = totals["covers"] / max(time.monotonic() - start, 0.001)
+        return (
+            f"{totals['covers']} covers, {totals['thumbnails']} thumbnails made, "
+            f"{totals['failed']} failed ({rate:.1f} covers per second)"
+        )
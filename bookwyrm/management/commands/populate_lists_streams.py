@@ -2,6 +2,7 @@
 
 from django.core.management.base import BaseCommand
 from bookwyrm import lists_stream, models
+from bookwyrm.management.commands.populate_streams import print_progress
 
 
 def populate_lists_streams():
@@ -18,11 +19,34 @@ def populate_lists_streams():
     print("\nAll done, thank you for your patience!")
 
 
+def bulk_populate_lists_streams(resume=False):
+    """build all the lists streams for all the users in one pass over the lists"""
+    print("Populating lists streams in bulk")
+    print_progress(lists_stream.bulk_populate_lists(resume=resume), "lists")
+    print("All done, thank you for your patience!")
+
+
 class Command(BaseCommand):
     """start all over with lists streams"""
 
     help = "Populate list streams for all users"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="Populate every user's stream at once, here, instead of queueing "
+            "a task per user",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue an interrupted bulk run from where it stopped",
+        )
+
     def handle(self, *args, **options):
         """run feed builder"""
+        if options.get("bulk"):
+            bulk_populate_lists_streams(resume=options.get("resume"))
+            return
         populate_lists_streams()
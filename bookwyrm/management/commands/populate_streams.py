@@ -21,6 +21,27 @@ def populate_streams(stream=None):
             activitystreams.populate_stream_task.delay(stream_key, user.id)
 
 
+def bulk_populate_streams(stream=None, resume=False):
+    """build all the streams for all the users in one pass over the statuses"""
+    streams = [stream] if stream else list(activitystreams.streams.keys())
+    print("Populating streams in bulk", streams)
+    print_progress(
+        activitystreams.bulk_populate_streams(streams, resume=resume), "statuses"
+    )
+    print("Populating lists streams in bulk")
+    print_progress(lists_stream.bulk_populate_lists(resume=resume), "lists")
+    print("All done, thank you for your patience!")
+
+
+def print_progress(progress, name):
+    """how far a bulk run has got, and how fast it's going"""
+    for step in progress:
+        print(
+            f"{step['objects']} {name}, {step['entries']} stream entries "
+            f"({step['per_second']:.1f} {name} per second)"
+        )
+
+
 class Command(BaseCommand):
     """start all over with user streams"""
 
@@ -32,8 +53,22 @@ class Command(BaseCommand):
             default=None,
             help="Specifies which time of stream to populate",
         )
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="Populate every user's streams at once, here, instead of queueing "
+            "a task per user",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue an interrupted bulk run from where it stopped",
+        )
 
     def handle(self, *args, **options):
         """run feed builder"""
         stream = options.get("stream")
+        if options.get("bulk"):
+            bulk_populate_streams(stream=stream, resume=options.get("resume"))
+            return
         populate_streams(stream=stream)
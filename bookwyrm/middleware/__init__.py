@@ -6,3 +6,5 @@ from .file_too_big import FileTooBig
 from .force_logout import ForceLogoutMiddleware
 from .require_signed_get import RequireSignedGet
 from .require_login import RequireLoginNearlyEverywhere
+from .site_settings import SiteSettingsMiddleware
+from .request_cache import RequestCacheMiddleware
@@ -0,0 +1,15 @@
+"""Remember cached values for the length of a request"""
+
+from bookwyrm.utils.cache import request_cache
+
+
+class RequestCacheMiddleware:
+    """Pages look up the same cached values over and over, and feeds load them
+    all at once before rendering"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with request_cache():
+            return self.get_response(request)
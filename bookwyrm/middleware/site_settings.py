@@ -0,0 +1,14 @@
+"""Load the site settings once per request"""
+
+from bookwyrm.models.site import site_settings_cache
+
+
+class SiteSettingsMiddleware:
+    """Every page needs the site settings, and many need them more than once"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with site_settings_cache.request_memo():
+            return self.get_response(request)
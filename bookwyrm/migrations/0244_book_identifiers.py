@@ -0,0 +1,43 @@
+# Generated by Django 5.2.16 on 2026-10-17 10:07
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookwyrm', '0243_auto_20260730_0926'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='identifiers',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), null=True, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['identifiers'], name='bookwyrm_bo_identif_4f9e62_gin'),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name='book',
+            trigger=pgtrigger.compiler.Trigger(name='update_identifiers_on_book_edit', sql=pgtrigger.compiler.UpsertTriggerSql(func="SELECT array_remove(ARRAY[ 'remote_id:' || nullif(new.remote_id, ''), 'origin_id:' || nullif(new.origin_id, ''), 'openlibrary_key:' || nullif(new.openlibrary_key, ''), 'finna_key:' || nullif(new.finna_key, ''), 'libris_key:' || nullif(new.libris_key, ''), 'inventaire_id:' || nullif(new.inventaire_id, ''), 'librarything_key:' || nullif(new.librarything_key, ''), 'goodreads_key:' || nullif(new.goodreads_key, ''), 'bnf_id:' || nullif(new.bnf_id, ''), 'viaf:' || nullif(new.viaf, ''), 'wikidata:' || nullif(new.wikidata, ''), 'asin:' || nullif(new.asin, ''), 'aasin:' || nullif(new.aasin, ''), 'isfdb:' || nullif(new.isfdb, '') ], NULL) || coalesce((SELECT array_remove(ARRAY[ 'isbn_10:' || nullif(isbn_10, ''), 'isbn_13:' || nullif(isbn_13, ''), 'oclc_number:' || nullif(oclc_number, '') ], NULL) FROM bookwyrm_edition WHERE book_ptr_id = new.id), '{}') || coalesce((SELECT array_remove(ARRAY['lccn:' || nullif(lccn, '')], NULL) FROM bookwyrm_work WHERE book_ptr_id = new.id), '{}') INTO new.identifiers;RETURN NEW;", hash='94c5a055a5d1ce483dedf3a1ab7e8d50d1a4b3c6', operation='INSERT OR UPDATE OF "remote_id", "origin_id", "openlibrary_key", "finna_key", "libris_key", "inventaire_id", "librarything_key", "goodreads_key", "bnf_id", "viaf", "wikidata", "asin", "aasin", "isfdb", "identifiers"', pgid='pgtrigger_update_identifiers_on_book_edit_3cd0c', table='bookwyrm_book', when='BEFORE')),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name='edition',
+            trigger=pgtrigger.compiler.Trigger(name='reset_book_identifiers_on_edition_edit', sql=pgtrigger.compiler.UpsertTriggerSql(func='UPDATE bookwyrm_book SET identifiers = NULL WHERE id = new.book_ptr_id;RETURN NEW;', hash='9b6dc1ab45957d7f2fc8d2a59db1b14943d611dc', operation='INSERT OR UPDATE OF "isbn_10", "isbn_13", "oclc_number"', pgid='pgtrigger_reset_book_identifiers_on_edition_edit_df844', table='bookwyrm_edition', when='AFTER')),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name='work',
+            trigger=pgtrigger.compiler.Trigger(name='reset_book_identifiers_on_work_edit', sql=pgtrigger.compiler.UpsertTriggerSql(func='UPDATE bookwyrm_book SET identifiers = NULL WHERE id = new.book_ptr_id;RETURN NEW;', hash='2370a3f16c8554cb17badc6733965b8d77b9ee7c', operation='INSERT OR UPDATE OF "lccn"', pgid='pgtrigger_reset_book_identifiers_on_work_edit_ac6d9', table='bookwyrm_work', when='AFTER')),
+        ),
+        migrations.RunSQL(
+            # Fill in the identifiers for all existing Books
+            sql="UPDATE bookwyrm_book SET identifiers = NULL;",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
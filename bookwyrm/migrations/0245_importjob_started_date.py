@@ -0,0 +1,18 @@
+# Generated by Django 5.2.16 on 2026-10-17 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookwyrm", "0244_book_identifiers"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="started_date",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
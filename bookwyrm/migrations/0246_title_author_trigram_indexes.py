@@ -0,0 +1,30 @@
+# Generated by Django 5.2.16 on 2026-10-17 11:49
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookwyrm", "0245_importjob_started_date"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="author",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"],
+                name="bookwyrm_author_name_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"],
+                name="bookwyrm_book_title_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.16 on 2026-10-17 12:14
+
+from decimal import Decimal
+
+import bookwyrm.models.rating
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def add_up_ratings(apps, schema_editor):
+    """summarize the ratings every work already has"""
+    db_alias = schema_editor.connection.alias
+    Review = apps.get_model("bookwyrm", "Review")
+    WorkRating = apps.get_model("bookwyrm", "WorkRating")
+
+    summaries = {}
+    counts = (
+        Review.objects.using(db_alias)
+        .filter(deleted=False, rating__gt=0, book__parent_work__isnull=False)
+        .values("book__parent_work", "rating")
+        .annotate(rating_count=Count("id"))
+        .values_list("book__parent_work", "rating", "rating_count")
+    )
+    for work_id, rating, rating_count in counts.iterator():
+        summary = summaries.setdefault(
+            work_id,
+            WorkRating(
+                work_id=work_id,
+                total=Decimal(0),
+                histogram=bookwyrm.models.rating.empty_histogram(),
+            ),
+        )
+        summary.count += rating_count
+        summary.total += rating * rating_count
+        summary.histogram[bookwyrm.models.rating.get_step(rating)] += rating_count
+
+    WorkRating.objects.using(db_alias).bulk_create(
+        summaries.values(), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookwyrm", "0246_title_author_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WorkRating",
+            fields=[
+                (
+                    "work",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="rating_summary",
+                        serialize=False,
+                        to="bookwyrm.work",
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "histogram",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.IntegerField(),
+                        default=bookwyrm.models.rating.empty_histogram,
+                        size=10,
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(add_up_ratings, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.16 on 2026-10-17 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookwyrm", "0247_workrating"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="preview_image_fingerprint",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="sitesettings",
+            name="preview_image_fingerprint",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="preview_image_fingerprint",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -1,6 +1,5 @@
 """activitypub model functionality"""
 
-import asyncio
 from base64 import b64encode
 from collections import namedtuple
 from functools import reduce
@@ -11,19 +10,17 @@ from typing import Any, Optional
 from uuid import uuid4
 from typing_extensions import Self
 
-import aiohttp
-from Crypto.PublicKey import RSA
 from Crypto.Signature import pkcs1_15
 from Crypto.Hash import SHA256
 from django.apps import apps
 from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator
 from django.db.models import Q
-from django.utils.http import http_date
 
 from bookwyrm import activitypub
-from bookwyrm.settings import USER_AGENT, PAGE_LENGTH
-from bookwyrm.signatures import make_signature, make_digest
+from bookwyrm.broadcast import broadcaster, deliver
+from bookwyrm.settings import PAGE_LENGTH
+from bookwyrm.signatures import import_key
 from bookwyrm.tasks import app, BROADCAST
 from bookwyrm.models.fields import ImageField, ManyToManyField
 
@@ -282,7 +279,7 @@ class ObjectMixin(ActivitypubMixin):
         signature = None
         create_id = self.remote_id + "/activity"
         if hasattr(activity_object, "content") and activity_object.content:
-            signer = pkcs1_15.new(RSA.import_key(user.key_pair.private_key))
+            signer = pkcs1_15.new(import_key(user.key_pair.private_key))
             content = activity_object.content
             signed_message = signer.sign(SHA256.new(content.encode("utf8")))
 
@@ -531,70 +528,7 @@ def broadcast_task(sender_id: int, activity: str, recipients: list[str]):
 
     user_model = apps.get_model("bookwyrm.User", require_ready=True)
     sender = user_model.objects.select_related("key_pair").get(id=sender_id)
-    asyncio.run(async_broadcast(recipients, sender, activity))
-
-
-async def async_broadcast(recipients: list[str], sender, data: str):
-    """Send all the broadcasts simultaneously"""
-    timeout = aiohttp.ClientTimeout(total=10)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        tasks = []
-        for recipient in recipients:
-            tasks.append(
-                asyncio.ensure_future(sign_and_send(session, sender, data, recipient))
-            )
-
-        results = await asyncio.gather(*tasks)
-        return results
-
-
-async def sign_and_send(
-    session: aiohttp.ClientSession, sender, data: str, destination: str, **kwargs
-):
-    """Sign the messages and send them in an asynchronous bundle"""
-    now = http_date()
-
-    if not sender.key_pair.private_key:
-        # this shouldn't happen. it would be bad if it happened.
-        raise ValueError("No private key found for sender")
-
-    digest = make_digest(data)
-    signature = make_signature(
-        "post",
-        sender,
-        destination,
-        now,
-        digest=digest,
-        use_legacy_key=kwargs.get("use_legacy_key"),
-    )
-
-    headers = {
-        "Date": now,
-        "Digest": digest,
-        "Signature": signature,
-        "Content-Type": "application/activity+json; charset=utf-8",
-        "User-Agent": USER_AGENT,
-    }
-
-    try:
-        async with session.post(destination, data=data, headers=headers) as response:
-            if not response.ok:
-                logger.exception(
-                    "Failed to send broadcast to %s: %s", destination, response.reason
-                )
-                if kwargs.get("use_legacy_key") is not True:
-                    logger.info("Trying again with legacy keyId header value")
-                    asyncio.ensure_future(
-                        sign_and_send(
-                            session, sender, data, destination, use_legacy_key=True
-                        )
-                    )
-
-            return response
-    except asyncio.TimeoutError:
-        logger.info("Connection timed out for url: %s", destination)
-    except aiohttp.ClientError as err:
-        logger.exception(err)
+    broadcaster.run(deliver(recipients, sender, activity))
 
 
 def to_ordered_collection_page(
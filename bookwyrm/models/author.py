@@ -75,7 +75,15 @@ class Author(BookDataModel):
     class Meta:
         """sets up indexes and triggers"""
 
-        indexes = (GinIndex(fields=["search_vector"]),)
+        indexes = (
+            GinIndex(fields=["search_vector"]),
+            # trigrams, for finding misspelled names
+            GinIndex(
+                fields=["name"],
+                name="bookwyrm_author_name_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        )
         triggers = [
             pgtrigger.Trigger(
                 name="update_search_vector_on_author_edit",
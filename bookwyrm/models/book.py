@@ -1,17 +1,22 @@
 """database schema for books and shelves"""
 
 from itertools import chain
-from functools import reduce
 import re
-import operator
 from typing import Any, Dict, Optional, Iterable
 from typing_extensions import Self
+from django.contrib.postgres.fields import ArrayField
 from django.contrib.postgres.search import SearchVectorField
 from django.contrib.postgres.indexes import GinIndex, BloomIndex, Index
 from django.core.cache import cache
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.db import models, transaction
-from django.db.models import Prefetch, ManyToManyField, Q
+from django.db.models import (
+    BooleanField,
+    ExpressionWrapper,
+    ManyToManyField,
+    Prefetch,
+    Q,
+)
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 from model_utils import FieldTracker
@@ -22,6 +27,7 @@ import pgtrigger
 from bookwyrm import activitypub
 from bookwyrm.isbn.isbn import hyphenator_singleton as hyphenator
 from bookwyrm.preview_images import generate_edition_preview_image_task
+from bookwyrm.thumbnail_generation import generate_thumbnails_task
 from bookwyrm.settings import (
     BASE_URL,
     DEFAULT_LANGUAGE,
@@ -38,6 +44,7 @@ from .activitypub_mixin import (
     ObjectMixin,
 )
 from .base_model import BookWyrmModel
+from .rating import WorkRating
 from . import fields
 
 
@@ -286,9 +293,15 @@ class Book(BookDataModel):
     preview_image = models.ImageField(
         upload_to="previews/covers/", blank=True, null=True
     )
+    # a hash of what the preview image shows, so it's only redrawn if that changes
+    preview_image_fingerprint = models.CharField(max_length=64, blank=True, null=True)
     first_published_date = fields.PartialDateField(blank=True, null=True)
     published_date = fields.PartialDateField(blank=True, null=True)
 
+    # every identifier for the book, as "field_name:value", for looking books up
+    # by any of them at once. Kept up to date by triggers
+    identifiers = ArrayField(models.CharField(max_length=255), null=True)
+
     objects = InheritanceManager()
     field_tracker = FieldTracker(fields=["authors", "title", "subtitle", "cover"])
 
@@ -367,6 +380,11 @@ class Book(BookDataModel):
 
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def format_identifier(field_name: str, value: Any) -> str:
+        """how an identifier is stored in the identifiers field"""
+        return f"{field_name}:{value}"
+
     def get_remote_id(self):
         """editions and works both use "book" instead of model_name"""
         return f"{BASE_URL}/book/{self.id}"
@@ -421,6 +439,13 @@ class Book(BookDataModel):
 
         indexes = [
             GinIndex(fields=["search_vector"]),
+            GinIndex(fields=["identifiers"]),
+            # trigrams, for finding misspelled titles
+            GinIndex(
+                fields=["title"],
+                name="bookwyrm_book_title_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
             # Add bloom index for all deduplication_fields
             BloomIndex(
                 fields=[
@@ -477,7 +502,66 @@ class Book(BookDataModel):
                     RETURN new;
                     """
                 ),
-            )
+            ),
+            pgtrigger.Trigger(
+                name="update_identifiers_on_book_edit",
+                when=pgtrigger.Before,
+                operation=pgtrigger.Insert
+                | pgtrigger.UpdateOf(
+                    "remote_id",
+                    "origin_id",
+                    "openlibrary_key",
+                    "finna_key",
+                    "libris_key",
+                    "inventaire_id",
+                    "librarything_key",
+                    "goodreads_key",
+                    "bnf_id",
+                    "viaf",
+                    "wikidata",
+                    "asin",
+                    "aasin",
+                    "isfdb",
+                    "identifiers",
+                ),
+                func=format_trigger(
+                    """
+                    SELECT array_remove(ARRAY[
+                        'remote_id:' || nullif(new.remote_id, ''),
+                        'origin_id:' || nullif(new.origin_id, ''),
+                        'openlibrary_key:' || nullif(new.openlibrary_key, ''),
+                        'finna_key:' || nullif(new.finna_key, ''),
+                        'libris_key:' || nullif(new.libris_key, ''),
+                        'inventaire_id:' || nullif(new.inventaire_id, ''),
+                        'librarything_key:' || nullif(new.librarything_key, ''),
+                        'goodreads_key:' || nullif(new.goodreads_key, ''),
+                        'bnf_id:' || nullif(new.bnf_id, ''),
+                        'viaf:' || nullif(new.viaf, ''),
+                        'wikidata:' || nullif(new.wikidata, ''),
+                        'asin:' || nullif(new.asin, ''),
+                        'aasin:' || nullif(new.aasin, ''),
+                        'isfdb:' || nullif(new.isfdb, '')
+                    ], NULL) ||
+
+                    -- identifiers that are specific to editions or works
+                    COALESCE((
+                        SELECT array_remove(ARRAY[
+                            'isbn_10:' || nullif(isbn_10, ''),
+                            'isbn_13:' || nullif(isbn_13, ''),
+                            'oclc_number:' || nullif(oclc_number, '')
+                        ], NULL)
+                        FROM bookwyrm_edition WHERE book_ptr_id = new.id
+                    ), '{}') ||
+                    COALESCE((
+                        SELECT array_remove(ARRAY['lccn:' || nullif(lccn, '')], NULL)
+                        FROM bookwyrm_work WHERE book_ptr_id = new.id
+                    ), '{}')
+
+                        INTO new.identifiers;
+                    RETURN new;
+                    """
+                ),
+            ),
         ]
 
 
@@ -526,6 +610,24 @@ class Work(OrderedCollectionPageMixin, Book):
         ("seriesbooks", "seriesBooks"),
     ]
 
+    class Meta:
+        """keep the book's identifiers up to date"""
+
+        triggers = [
+            pgtrigger.Trigger(
+                name="reset_book_identifiers_on_work_edit",
+                when=pgtrigger.After,
+                operation=pgtrigger.Insert | pgtrigger.UpdateOf("lccn"),
+                func=format_trigger(
+                    """UPDATE bookwyrm_book
+                    SET identifiers = NULL
+                    WHERE id = new.book_ptr_id;
+                    RETURN new;
+                """
+                ),
+            ),
+        ]
+
 
 # https://schema.org/BookFormatType
 FormatChoices = [
@@ -665,6 +767,11 @@ class Edition(Book):
     )
     edition_rank = fields.IntegerField(default=0)
 
+    work_tracker = FieldTracker(fields=["parent_work"])
+
+    # identifiers that are more trustworthy than the rest for finding a match
+    specific_identifier_fields = ["isbn_10", "isbn_13", "oclc_number"]
+
     activity_serializer = activitypub.Edition
     name_field = "title"
     serialize_reverse_fields = [
@@ -687,14 +794,28 @@ class Edition(Book):
             ),
             Index(fields=["parent_work", "-edition_rank"]),
         ]
+        triggers = [
+            pgtrigger.Trigger(
+                name="reset_book_identifiers_on_edition_edit",
+                when=pgtrigger.After,
+                operation=pgtrigger.Insert
+                | pgtrigger.UpdateOf("isbn_10", "isbn_13", "oclc_number"),
+                func=format_trigger(
+                    """UPDATE bookwyrm_book
+                    SET identifiers = NULL
+                    WHERE id = new.book_ptr_id;
+                    RETURN new;
+                """
+                ),
+            ),
+        ]
 
     @classmethod
-    def find_existing(cls, data):
-        """compare data to fields that can be used for deduplication.
-        This always includes remote_id, but can also be unique identifiers
-        like an isbn for an edition"""
-        filters = []
-        # grabs all the data from the model to create django queryset filters
+    def get_identifiers_from_data(cls, data: Dict[str, Any]) -> list[str]:
+        """the identifiers in activitypub data, formatted like the identifiers
+        field, with isbns and oclc numbers first since they're the most specific"""
+        identifiers = []
+        # grabs all the data from the model to look up in the identifiers field
         for field in cls._meta.get_fields():
             if (
                 not hasattr(field, "deduplication_field")
@@ -705,57 +826,47 @@ class Edition(Book):
             value = data.get(field.get_activitypub_field())
             if not value:
                 continue
-            filters.append({field.name: value})
+            identifiers.append(cls.format_identifier(field.name, value))
 
         if "id" in data:
             # kinda janky, but this handles special case for books
-            filters.append({"origin_id": data["id"]})
+            identifiers.append(cls.format_identifier("origin_id", data["id"]))
+
+        return sorted(
+            identifiers,
+            key=lambda identifier: identifier.split(":", 1)[0]
+            not in cls.specific_identifier_fields,
+        )
 
-        if not filters:
+    @classmethod
+    def find_existing(cls, data):
+        """compare data to fields that can be used for deduplication.
+        This always includes remote_id, but can also be unique identifiers
+        like an isbn for an edition"""
+        identifiers = cls.get_identifiers_from_data(data)
+        if not identifiers:
             # if there are no deduplication fields, it will match the first
             # item no matter what. this shouldn't happen but just in case.
             return None
 
-        # For books, we want to first check with isbn10/13/oclc fields if possible
-        # as it hits Edition table bloom index
-        book_filters = []
-        for filter_item in filters:
-            filter_fields = {
-                field_name: field_value
-                for field_name, field_value in filter_item.items()
-                if field_name in ["isbn_10", "isbn_13", "oclc_number"]
-            }
-            if filter_fields:
-                book_filters.append(filter_fields)
         objects = cls.objects
         if hasattr(objects, "select_subclasses"):
             objects = objects.select_subclasses()
 
-        if book_filters:
-            possible_book = objects.filter(
-                reduce(operator.or_, (Q(**f) for f in book_filters))
+        # every identifier is in one indexed field, so this is a single lookup
+        match = objects.filter(identifiers__overlap=identifiers)
+        if edition_identifiers := [
+            identifier
+            for identifier in identifiers
+            if identifier.split(":", 1)[0] in cls.specific_identifier_fields
+        ]:
+            # isbns and oclc numbers are the most specific, so those come first
+            match = match.order_by(
+                ExpressionWrapper(
+                    Q(identifiers__overlap=edition_identifiers),
+                    output_field=BooleanField(),
+                ).desc()
             )
-            if (book := possible_book.first()) is not None:
-                return book
-
-        # if no match, drop isbn10/13/oclc_number from filters so bloom index hits from Book-table
-        book_filters = []
-        for filter_item in filters:
-            filter_fields = {
-                field_name: field_value
-                for field_name, field_value in filter_item.items()
-                if field_name not in ["isbn_10", "isbn_13", "oclc_number"]
-            }
-            if filter_fields:
-                book_filters.append(filter_fields)
-
-        filters = book_filters
-
-        if not filters:
-            return None
-
-        # an OR operation on all the match fields, sorry for the dense syntax
-        match = objects.filter(reduce(operator.or_, (Q(**f) for f in filters)))
         # there OUGHT to be only one match
         return match.first()
 
@@ -828,8 +939,16 @@ class Edition(Book):
             self.sort_title = self.guess_sort_title()
             update_fields = add_update_fields(update_fields, "sort_title")
 
+        moved = not self._state.adding and self.work_tracker.has_changed("parent_work")
+        previous_work = self.work_tracker.previous("parent_work")
         super().save(*args, update_fields=update_fields, **kwargs)
 
+        # the edition's ratings count towards a different work now
+        if moved:
+            for work_id in (previous_work, self.parent_work_id):
+                if work_id:
+                    WorkRating.recalculate(work_id)
+
         # clear author cache
         if self.id:
             cache.delete_many(
@@ -953,6 +1072,16 @@ def preview_image(instance, *args, **kwargs):
         )
 
 
+@receiver(models.signals.post_save)
+def cover_thumbnails(sender, instance, *args, **kwargs):
+    """make all the thumbnails of a new cover at once"""
+    if not ENABLE_THUMBNAIL_GENERATION or sender not in (Edition, Work):
+        return
+
+    if instance.cover and "cover" in instance.field_tracker.changed():
+        transaction.on_commit(lambda: generate_thumbnails_task.delay(instance.id))
+
+
 class Series(OrderedCollectionMixin, BookDataModel):
     """a series of books"""
 
@@ -1,13 +1,23 @@
 """connections to external ActivityPub servers"""
 
+import logging
+import os
+import threading
+import time
+from typing import Optional
 from urllib.parse import urlparse
 
+import redis
 from django.apps import apps
-from django.db import models
+from django.db import models, transaction
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 
+from bookwyrm.redis_store import r
 from .base_model import BookWyrmModel
 
+logger = logging.getLogger(__name__)
+
 FederationStatus = [
     ("federated", _("Federated")),
     ("blocked", _("Blocked")),
@@ -63,6 +73,110 @@ class FederatedServer(BookWyrmModel):
 
     @classmethod
     def is_blocked(cls, url: str) -> bool:
-        """look up if a domain is blocked"""
-        url = urlparse(url)
-        return cls.objects.filter(server_name=url.hostname, status="blocked").exists()
+        """look up if a domain, or a domain it's part of, is blocked"""
+        hostname = urlparse(url).hostname
+        if not hostname:
+            return False
+        return blocked_servers.is_blocked(hostname)
+
+
+class BlockedServers:
+    """the hostnames of blocked servers, kept in memory so that checking a url
+    doesn't need a database query. Each process listens for changes to the list
+    over redis pub/sub, and goes back to the database if it can't"""
+
+    channel = "blocked-servers-changed"
+    # how long to wait after failing to subscribe before trying again
+    retry_after = 60
+
+    def __init__(self) -> None:
+        self.hostnames: Optional[frozenset[str]] = None
+        # counts changes, so a list loaded during a change isn't kept
+        self.version = 0
+        self.pid: Optional[int] = None
+        self.listener: Optional[redis.client.PubSubWorkerThread] = None
+        self.retry_at = 0.0
+        self.lock = threading.Lock()
+
+    def is_blocked(self, hostname: str) -> bool:
+        """check the hostname and every domain it's a subdomain of"""
+        hostnames = self.get_hostnames()
+        labels = hostname.lower().split(".")
+        return any(".".join(labels[i:]) in hostnames for i in range(len(labels)))
+
+    def get_hostnames(self) -> frozenset[str]:
+        """the in-memory list, loaded from the database if it isn't there"""
+        hostnames = self.hostnames
+        if hostnames is not None and self.pid == os.getpid():
+            return hostnames
+
+        version = self.version
+        hostnames = frozenset(
+            name.lower()
+            for name in FederatedServer.objects.filter(status="blocked").values_list(
+                "server_name", flat=True
+            )
+        )
+        # without a listener, there'd be no way to know when it was out of date
+        if self.subscribe() and version == self.version:
+            self.hostnames = hostnames
+        return hostnames
+
+    def subscribe(self) -> bool:
+        """start listening for changes, if this process isn't already"""
+        with self.lock:
+            if self.pid != os.getpid():
+                # a forked process doesn't get its parent's listener thread
+                self.listener = None
+                self.pid = os.getpid()
+            if self.listener:
+                return True
+            if time.monotonic() < self.retry_at:
+                return False
+            try:
+                pubsub = r.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.channel: lambda _: self.invalidate()})
+                self.listener = pubsub.run_in_thread(
+                    sleep_time=1, daemon=True, exception_handler=self.handle_error
+                )
+            except redis.exceptions.RedisError as err:
+                logger.warning("Unable to listen for blocklist changes: %s", err)
+                self.retry_at = time.monotonic() + self.retry_after
+                return False
+            return True
+
+    def handle_error(self, err, pubsub, thread) -> None:
+        """lost the connection, so any changes from now on would be missed"""
+        logger.warning("Stopped listening for blocklist changes: %s", err)
+        thread.stop()
+        pubsub.close()
+        with self.lock:
+            self.listener = None
+            self.retry_at = time.monotonic() + self.retry_after
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """forget the list, so it's loaded again next time it's needed"""
+        self.version += 1
+        self.hostnames = None
+
+    def publish(self) -> None:
+        """tell every process that the list has changed"""
+        try:
+            r.publish(self.channel, "")
+        except redis.exceptions.RedisError as err:
+            logger.warning("Unable to publish blocklist change: %s", err)
+
+
+blocked_servers = BlockedServers()
+
+
+@receiver(models.signals.post_save, sender=FederatedServer)
+@receiver(models.signals.post_delete, sender=FederatedServer)
+def update_blocked_servers(sender, instance, *args, update_fields=None, **kwargs):
+    """a server has been blocked or unblocked, maybe"""
+    if update_fields and not {"status", "server_name"} & set(update_fields):
+        return
+    blocked_servers.invalidate()
+    # other processes shouldn't reload the list until they can see the change
+    transaction.on_commit(blocked_servers.publish)
@@ -1,16 +1,20 @@
 """track progress of goodreads imports"""
 
 from datetime import datetime
+import hashlib
+import logging
 import math
 import re
 import dateutil.parser
 
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from bookwyrm.connectors import connector_manager
+from bookwyrm import book_search
+from bookwyrm.connectors import connector_manager, search_cache
 from bookwyrm.models import (
     User,
     Book,
@@ -25,6 +29,17 @@ from bookwyrm.models import (
 from bookwyrm.tasks import app, IMPORT_TRIGGERED, IMPORTS
 from .fields import PrivacyLevels
 
+logger = logging.getLogger(__name__)
+
+# how many rows each import task looks up at once
+IMPORT_BATCH_SIZE = 50
+# how many searches to have going at once on each connector
+IMPORT_SEARCH_CONCURRENCY = 4
+# how long to remember the book an import search found, and how long to
+# remember that it didn't find one, since the connectors may get it later
+RESOLVED_BOOK_TIMEOUT = 60 * 60 * 24 * 30
+UNRESOLVED_BOOK_TIMEOUT = 60 * 60 * 24
+
 
 def unquote_string(text):
     """resolve csv quote weirdness"""
@@ -59,6 +74,7 @@ class ImportJob(models.Model):
 
     user: User = models.ForeignKey(User, on_delete=models.CASCADE)
     created_date = models.DateTimeField(default=timezone.now)
+    started_date = models.DateTimeField(null=True, blank=True)
     updated_date = models.DateTimeField(default=timezone.now)
     include_reviews: bool = models.BooleanField(default=True)
     create_shelves: bool = models.BooleanField(default=True)
@@ -119,6 +135,16 @@ class ImportJob(models.Model):
             return 0
         return math.floor((item_count - self.pending_item_count) / item_count * 100)
 
+    @property
+    def items_per_second(self):
+        """How fast is it going?"""
+        if not self.started_date:
+            return 0
+        elapsed = (self.updated_date - self.started_date).total_seconds()
+        if elapsed <= 0:
+            return 0
+        return (self.item_count - self.pending_item_count) / elapsed
+
     @property
     def pending_item_count(self):
         """And how many pending items??"""
@@ -189,35 +215,48 @@ class ImportItem(models.Model):
 
     def get_book_from_identifier(self, field="isbn"):
         """search by isbn or other unique identifier"""
+        query = getattr(self, field)
+        if resolved := get_resolved_books([query], 0.999).get(query):
+            return resolved[0]
+
+        book = None
         search_result = connector_manager.first_search_result(
-            getattr(self, field), min_confidence=0.999
+            query, min_confidence=0.999
         )
         if search_result:
             # it's already in the right format
             if isinstance(search_result, Edition):
-                return search_result
-            # it's just a search result, book needs to be created
-            # raises ConnectorException
-            return search_result.connector.get_or_create_book(search_result.key)
-        return None
+                book = search_result
+            else:
+                # it's just a search result, book needs to be created
+                # raises ConnectorException
+                book = search_result.connector.get_or_create_book(search_result.key)
+        set_resolved_books({query: (book, 1)}, 0.999)
+        return book
 
     def get_book_from_title_author(self):
         """search by title and author"""
         if not self.title:
             return None, 0
         search_term = construct_search_term(self.title, self.author)
+        if resolved := get_resolved_books([search_term], 0.1).get(search_term):
+            return resolved
+
+        resolved = (None, 0)
         search_result = connector_manager.first_search_result(
             search_term, min_confidence=0.1
         )
         if search_result:
             if isinstance(search_result, Edition):
-                return (search_result, 1)
-            # raises ConnectorException
-            return (
-                search_result.connector.get_or_create_book(search_result.key),
-                search_result.confidence,
-            )
-        return None, 0
+                resolved = (search_result, 1)
+            else:
+                # raises ConnectorException
+                resolved = (
+                    search_result.connector.get_or_create_book(search_result.key),
+                    search_result.confidence,
+                )
+        set_resolved_books({search_term: resolved}, 0.1)
+        return resolved
 
     @property
     def title(self):
@@ -346,23 +385,202 @@ class ImportItem(models.Model):
 
 @app.task(queue=IMPORTS)
 def start_import_task(job_id):
-    """trigger the child tasks for each row"""
+    """trigger the child tasks for each batch of rows"""
     job = ImportJob.objects.get(id=job_id)
     job.status = "active"
-    job.save(update_fields=["status"])
+    job.started_date = timezone.now()
+    job.save(update_fields=["status", "started_date"])
     # don't start the job if it was stopped from the UI
     if job.complete:
         return
 
     # these are sub-tasks so that one big task doesn't use up all the memory in celery
-    for item in job.items.all():
-        task = import_item_task.delay(item.id)
-        item.task_id = task.id
-        item.save()
+    item_ids = list(job.items.order_by("index").values_list("id", flat=True))
+    for i in range(0, len(item_ids), IMPORT_BATCH_SIZE):
+        batch = item_ids[i : i + IMPORT_BATCH_SIZE]
+        task = import_batch_task.delay(job.id, batch)
+        ImportItem.objects.filter(id__in=batch).update(task_id=task.id)
     job.status = "active"
     job.save()
 
 
+@app.task(queue=IMPORTS)
+def import_batch_task(job_id, item_ids):
+    """resolve a batch of rows into books"""
+    job = ImportJob.objects.get(id=job_id)
+    # make sure the job has not been stopped
+    if job.complete:
+        return
+
+    items = list(job.pending_items.filter(id__in=item_ids).order_by("index"))
+    if not items:
+        return
+    for item in items:
+        item.job = job
+
+    try:
+        resolve_items(items)
+    except Exception as err:
+        for item in items:
+            item.fail_reason = _("Error loading book")
+            item.save()
+        items[-1].update_job()
+        raise err
+
+    # the searches can take a while, so check again that it's still going
+    job.refresh_from_db(fields=["complete"])
+    for item in items:
+        if item.book:
+            item.book = get_import_edition(item.book)
+
+    # look up what's already shelved and the shelves for the whole batch at once
+    shelves: dict[str, Shelf] = {}
+    shelved_books = set(
+        ShelfBook.objects.filter(
+            user=job.user, book__in=[item.book for item in items if item.book]
+        ).values_list("book_id", flat=True)
+    )
+    for item in items:
+        if item.book:
+            # shelves book and handles reviews
+            handle_imported_book(item, shelves=shelves, shelved_books=shelved_books)
+        elif not item.fail_reason:
+            item.fail_reason = _("Could not find a match for book")
+        item.save()
+    items[-1].update_job()
+
+
+def resolve_items(items):
+    """try various ways to lookup the books for a batch of rows, with one local
+    query for all the identifiers and the remote searches all going at once"""
+    items = [item for item in items if not item.book]
+    identifier_queries = {
+        item: item.isbn or item.openlibrary_key
+        for item in items
+        if item.isbn or item.openlibrary_key
+    }
+    # don't fall back on title/author search if isbn is present.
+    # you're too likely to mismatch
+    title_queries = {
+        item: construct_search_term(item.title, item.author)
+        for item in items
+        if item not in identifier_queries and item.title
+    }
+
+    # earlier imports may already have found these
+    resolved = get_resolved_books(identifier_queries.values(), 0.999)
+    unresolved = set(identifier_queries.values()) - set(resolved)
+    found = {
+        query: (book, 1)
+        for (query, book) in book_search.search_identifiers_in_bulk(
+            list(unresolved)
+        ).items()
+    }
+    found.update(find_remote_books(unresolved - set(found), 0.999))
+    set_resolved_books(found, 0.999)
+    resolved.update(found)
+    for item, query in identifier_queries.items():
+        if query not in resolved:
+            item.fail_reason = _("Error loading book")
+            continue
+        item.book = resolved[query][0]
+
+    resolved = get_resolved_books(title_queries.values(), 0.1)
+    unresolved = set(title_queries.values()) - set(resolved)
+    found = {}
+    for query in unresolved:
+        # a local match is always taken to be the book
+        if book := book_search.search(query, min_confidence=0.1, return_first=True):
+            found[query] = (book, 1)
+    found.update(find_remote_books(unresolved - set(found), 0.1))
+    set_resolved_books(found, 0.1)
+    resolved.update(found)
+    for item, query in title_queries.items():
+        if query not in resolved:
+            item.fail_reason = _("Error loading book")
+            continue
+        book, confidence = resolved[query]
+        if confidence > 0.999:
+            item.book = book
+        else:
+            item.book_guess = book
+
+
+def find_remote_books(queries, min_confidence):
+    """search the connectors for a batch of queries at once, and load the books
+    they found. Queries that found a book which couldn't be loaded are left out"""
+    if not queries:
+        return {}
+    results = connector_manager.first_search_results(
+        list(queries),
+        min_confidence=min_confidence,
+        concurrency=IMPORT_SEARCH_CONCURRENCY,
+    )
+    found = {}
+    for query in queries:
+        if not (search_result := results.get(query)):
+            found[query] = (None, 0)
+            continue
+        try:
+            book = search_result.connector.get_or_create_book(search_result.key)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Unable to load book for import search %r", query)
+            continue
+        found[query] = (book, search_result.confidence)
+    return found
+
+
+def get_resolved_cache_key(query, min_confidence):
+    """the cache key for the book an import search found"""
+    query_hash = hashlib.sha256(
+        search_cache.normalize_query(query).encode("utf-8")
+    ).hexdigest()
+    return f"import-resolved-{min_confidence}-{query_hash}"
+
+
+def get_resolved_books(queries, min_confidence):
+    """the books and confidences that imports (this one or any other) found for
+    these searches, with None for the ones that didn't find anything. Searches
+    that haven't been done yet are left out"""
+    keys = {get_resolved_cache_key(query, min_confidence): query for query in queries}
+    if not keys:
+        return {}
+    cached = cache.get_many(keys)
+    books = Book.objects.select_subclasses().in_bulk(
+        [value[0] for value in cached.values() if value]
+    )
+
+    resolved = {}
+    for key, value in cached.items():
+        # 0 means nothing was found
+        if not value:
+            resolved[keys[key]] = (None, 0)
+        elif book := books.get(value[0]):
+            resolved[keys[key]] = (book, value[1])
+    return resolved
+
+
+def set_resolved_books(resolved, min_confidence):
+    """remember what some import searches found, so the same book in another row
+    or another import doesn't need to be looked up again"""
+    cache.set_many(
+        {
+            get_resolved_cache_key(query, min_confidence): (book.id, confidence)
+            for (query, (book, confidence)) in resolved.items()
+            if book
+        },
+        RESOLVED_BOOK_TIMEOUT,
+    )
+    cache.set_many(
+        {
+            get_resolved_cache_key(query, min_confidence): 0
+            for (query, (book, _)) in resolved.items()
+            if not book
+        },
+        UNRESOLVED_BOOK_TIMEOUT,
+    )
+
+
 @app.task(queue=IMPORTS)
 def import_item_task(item_id):
     """resolve a row into a book"""
@@ -389,42 +607,58 @@ def import_item_task(item_id):
     item.update_job()
 
 
-def handle_imported_book(item):
-    """process a csv and then post about it"""
+def get_import_edition(book):
+    """the edition to shelve for whatever kind of book a row was matched to"""
+    if isinstance(book, Work):
+        book = book.default_edition
+    if book and not isinstance(book, Edition):
+        book = book.edition
+    return book
+
+
+def handle_imported_book(item, shelves=None, shelved_books=None):
+    """process a csv and then post about it. An import batch can share the
+    shelves it's looked up and the books it knows are already shelved"""
     job = item.job
     if job.complete:
         return
 
     user = job.user
-    if isinstance(item.book, Work):
-        item.book = item.book.default_edition
+    item.book = get_import_edition(item.book)
     if not item.book:
         item.fail_reason = _("Error loading book")
         item.save()
         return
-    if not isinstance(item.book, Edition):
-        item.book = item.book.edition
 
-    existing_shelf = ShelfBook.objects.filter(book=item.book, user=user).exists()
+    if shelved_books is None:
+        existing_shelf = ShelfBook.objects.filter(book=item.book, user=user).exists()
+    else:
+        existing_shelf = item.book.id in shelved_books
     if job.create_shelves and item.shelf and not existing_shelf:
         # shelve the book if it hasn't been shelved already
 
         shelved_date = item.date_added or timezone.now()
         shelfname = getattr(item, "shelf", item.shelf)
 
-        try:
-            shelf = Shelf.objects.get(name=shelfname, user=user)
-        except ObjectDoesNotExist:
+        shelf = shelves.get(item.shelf) if shelves is not None else None
+        if not shelf:
             try:
-                shelf = Shelf.objects.get(identifier=item.shelf, user=user)
+                shelf = Shelf.objects.get(name=shelfname, user=user)
             except ObjectDoesNotExist:
-                shelf = Shelf.objects.create(
-                    user=user,
-                    identifier=item.shelf,
-                    name=shelfname,
-                    privacy=job.privacy,
-                )
-
+                try:
+                    shelf = Shelf.objects.get(identifier=item.shelf, user=user)
+                except ObjectDoesNotExist:
+                    shelf = Shelf.objects.create(
+                        user=user,
+                        identifier=item.shelf,
+                        name=shelfname,
+                        privacy=job.privacy,
+                    )
+            if shelves is not None:
+                shelves[item.shelf] = shelf
+
+        if shelved_books is not None:
+            shelved_books.add(item.book.id)
         ShelfBook(
             book=item.book,
             shelf=shelf,
@@ -0,0 +1,113 @@
+"""the ratings of all the editions of a work, added up ahead of time"""
+
+from decimal import Decimal
+from typing import Optional
+
+from django.apps import apps
+from django.contrib.postgres.fields import ArrayField
+from django.db import models, transaction
+from django.db.models import Count
+
+# ratings go from half a star to five stars, in half stars
+RATING_STEPS = 10
+
+
+def empty_histogram() -> list[int]:
+    """no ratings at any number of stars"""
+    return [0] * RATING_STEPS
+
+
+def get_step(rating: Decimal) -> int:
+    """which half star a rating falls on"""
+    return min(max(round(rating * 2), 1), RATING_STEPS) - 1
+
+
+class WorkRating(models.Model):
+    """how a work has been rated, kept up to date as reviews are saved so that
+    showing or sorting by a rating doesn't mean averaging every review"""
+
+    work = models.OneToOneField(
+        "Work",
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="rating_summary",
+    )
+    count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # how many ratings there are at each half star
+    histogram = ArrayField(
+        models.IntegerField(), size=RATING_STEPS, default=empty_histogram
+    )
+
+    @property
+    def average(self) -> Decimal:
+        """the mean rating"""
+        return self.total / self.count if self.count else Decimal(0)
+
+    @classmethod
+    def get_average(cls, work_id: int) -> Decimal:
+        """the mean rating of a work, or 0 if nobody has rated it"""
+        summary = cls.objects.filter(work_id=work_id).first()
+        return summary.average if summary else Decimal(0)
+
+    @classmethod
+    def add_rating(cls, work_id: int, rating: Decimal, change: int = 1) -> None:
+        """count a rating of the work, or stop counting it with a change of -1"""
+        rating = Decimal(str(rating))
+        with transaction.atomic():
+            if change > 0:
+                summary, _ = cls.objects.select_for_update().get_or_create(
+                    work_id=work_id
+                )
+            elif not (
+                summary := cls.objects.select_for_update()
+                .filter(work_id=work_id)
+                .first()
+            ):
+                # the work is already gone
+                return
+
+            summary.count += change
+            summary.total += rating * change
+            summary.histogram[get_step(rating)] += change
+            summary.save()
+
+    @classmethod
+    def update_rating(
+        cls,
+        previous: Optional[tuple[int, Decimal]],
+        current: Optional[tuple[int, Decimal]],
+    ) -> None:
+        """a review's (work, rating) has changed from one value to another"""
+        if previous == current:
+            return
+        if previous:
+            cls.add_rating(*previous, change=-1)
+        if current:
+            cls.add_rating(*current)
+
+    @classmethod
+    def recalculate(cls, work_id: int) -> None:
+        """add up all the ratings of a work from scratch"""
+        review_model = apps.get_model("bookwyrm", "Review", require_ready=True)
+        counts = (
+            review_model.objects.filter(
+                book__parent_work=work_id, deleted=False, rating__gt=0
+            )
+            .values("rating")
+            .annotate(rating_count=Count("id"))
+            .values_list("rating", "rating_count")
+        )
+        histogram = empty_histogram()
+        total = Decimal(0)
+        for rating, rating_count in counts:
+            histogram[get_step(rating)] += rating_count
+            total += rating * rating_count
+
+        if not sum(histogram):
+            cls.objects.filter(work_id=work_id).delete()
+            return
+        cls.objects.update_or_create(
+            work_id=work_id,
+            defaults={"count": sum(histogram), "total": total, "histogram": histogram},
+        )
@@ -1,19 +1,24 @@
 """the particulars for this instance of BookWyrm"""
 
 from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from copy import copy
 import datetime
-from typing import Any, Optional, Iterable
+from typing import Any, Callable, Iterator, Optional, Iterable
 from urllib.parse import urljoin
 import uuid
 
+import redis
 import django.contrib.auth.models as auth_models
 from django.core.exceptions import PermissionDenied
-from django.db import models, IntegrityError
+from django.db import models, transaction, IntegrityError
 from django.dispatch import receiver
 from django.utils import timezone
 from model_utils import FieldTracker
 
 from bookwyrm.connectors.abstract_connector import get_data
+from bookwyrm.redis_store import r
 from bookwyrm.preview_images import generate_site_preview_image_task
 from bookwyrm.settings import BASE_URL, ENABLE_PREVIEW_IMAGES, STATIC_FULL_URL
 from bookwyrm.settings import RELEASE_API
@@ -97,6 +102,7 @@ class SiteSettings(SiteModel):
     preview_image = models.ImageField(
         upload_to="previews/logos/", null=True, blank=True
     )
+    preview_image_fingerprint = models.CharField(max_length=64, null=True, blank=True)
 
     # footer
     support_link = models.CharField(max_length=255, null=True, blank=True)
@@ -118,6 +124,11 @@ class SiteSettings(SiteModel):
     @classmethod
     def get(cls) -> SiteSettings:
         """gets the site settings db entry or defaults"""
+        return site_settings_cache.get(cls.load)
+
+    @classmethod
+    def load(cls) -> SiteSettings:
+        """gets the site settings from the database, bypassing the cache"""
         try:
             return cls.objects.get(id=1)
         except cls.DoesNotExist:
@@ -182,6 +193,83 @@ class Theme(SiteModel):
         return self.name
 
 
+class SiteSettingsCache:
+    """a copy of the site settings in each process, which is loaded again when
+    the version number in redis changes (as it does whenever they're saved).
+    Within a request, the version isn't even checked more than once"""
+
+    version_key = "site-settings-version"
+
+    def __init__(self) -> None:
+        self.site: Optional[SiteSettings] = None
+        self.version: Optional[bytes] = None
+        # saved, but not yet committed
+        self.changing = False
+        self.memo: ContextVar[Optional[dict[str, SiteSettings]]] = ContextVar(
+            "site_settings_memo", default=None
+        )
+
+    def get(self, load: Callable[[], SiteSettings]) -> SiteSettings:
+        """a copy of the settings, so that changing it changes nothing else"""
+        memo = self.memo.get()
+        if memo is None:
+            return copy(self.get_shared(load))
+        if "site" not in memo:
+            memo["site"] = self.get_shared(load)
+        return copy(memo["site"])
+
+    def get_shared(self, load: Callable[[], SiteSettings]) -> SiteSettings:
+        """the settings, if they're up to date, or fresh from the database"""
+        if self.changing:
+            return load()
+        try:
+            version = r.get(self.version_key)
+        except redis.exceptions.RedisError:
+            return load()
+        site = self.site
+        if site is None or version != self.version:
+            site = load()
+            self.site, self.version = site, version
+        return site
+
+    @contextmanager
+    def request_memo(self) -> Iterator[None]:
+        """keep hold of the settings for the length of a request"""
+        token = self.memo.set({})
+        try:
+            yield
+        finally:
+            self.memo.reset(token)
+
+    def invalidate(self) -> None:
+        """the settings have been saved, but the change may not be visible to
+        other processes until it's committed"""
+        self.changing = True
+        self.site = None
+        if (memo := self.memo.get()) is not None:
+            memo.clear()
+        transaction.on_commit(self.publish)
+
+    def publish(self) -> None:
+        """let every process know that its copy is out of date"""
+        self.changing = False
+        self.site = None
+        try:
+            r.incr(self.version_key)
+        except redis.exceptions.RedisError:
+            pass
+
+
+site_settings_cache = SiteSettingsCache()
+
+
+@receiver(models.signals.post_save, sender=SiteSettings)
+@receiver(models.signals.post_delete, sender=SiteSettings)
+def invalidate_site_settings(sender, instance, *args, **kwargs):
+    """everyone needs to see the new settings"""
+    site_settings_cache.invalidate()
+
+
 class SiteInvite(models.Model):
     """gives someone access to create an account on the instance"""
 
@@ -5,7 +5,6 @@ from typing import Optional, Iterable
 import re
 
 from django.apps import apps
-from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
@@ -25,6 +24,7 @@ from bookwyrm.utils.db import add_update_fields
 from .activitypub_mixin import ActivitypubMixin, ActivityMixin
 from .activitypub_mixin import OrderedCollectionPageMixin
 from .base_model import BookWyrmModel
+from .rating import WorkRating
 from .readthrough import ProgressMode
 from . import fields
 
@@ -463,7 +463,7 @@ class Review(BookStatus):
         max_digits=3,
     )
 
-    field_tracker = FieldTracker(fields=["rating"])
+    field_tracker = FieldTracker(fields=["rating", "deleted", "book"])
 
     @property
     def pure_name(self):
@@ -493,11 +493,35 @@ class Review(BookStatus):
     pure_type = "Article"
 
     def save(self, *args, **kwargs):
-        """clear rating caches"""
+        """keep the work's ratings up to date"""
+        # saving again while this save is underway mustn't count the rating twice
+        previous = getattr(self, "_counted_rating", MISSING)
+        if previous is MISSING:
+            previous = self.get_counted_rating(
+                self.field_tracker.previous("book"),
+                self.field_tracker.previous("rating"),
+                self.field_tracker.previous("deleted"),
+            )
+        current = self.get_counted_rating(self.book_id, self.rating, self.deleted)
+        self._counted_rating = current
         super().save(*args, **kwargs)
 
-        if self.book.parent_work:
-            cache.delete(f"book-rating-{self.book.parent_work.id}")
+        WorkRating.update_rating(previous, current)
+
+    def get_counted_rating(self, book_id, rating, deleted):
+        """the work and rating that go into the work's ratings, if there are any"""
+        if not book_id or deleted or not rating or rating <= 0:
+            return None
+        if book_id == self.book_id:
+            work_id = self.book.parent_work_id
+        else:
+            work_id = (
+                apps.get_model("bookwyrm.Edition", require_ready=True)
+                .objects.filter(id=book_id)
+                .values_list("parent_work", flat=True)
+                .first()
+            )
+        return (work_id, rating) if work_id else None
 
 
 class ReviewRating(Review):
@@ -566,6 +590,18 @@ class Boost(ActivityMixin, Status):
         self.deserialize_reverse_fields = []
 
 
+@receiver(models.signals.post_delete)
+def remove_rating(instance, sender, *args, **kwargs):
+    """stop counting a rating that's gone"""
+    # deleting a ReviewRating deletes its Review too, which is the one counted
+    if sender is not Review:
+        return
+    if counted := instance.get_counted_rating(
+        instance.book_id, instance.rating, instance.deleted
+    ):
+        WorkRating.add_rating(*counted, change=-1)
+
+
 @receiver(models.signals.post_save)
 def preview_image(instance, sender, *args, **kwargs):
     """Updates book previews if the rating has changed"""
@@ -101,6 +101,7 @@ class User(OrderedCollectionPageMixin, AbstractUser):
     preview_image = models.ImageField(
         upload_to="previews/avatars/", blank=True, null=True
     )
+    preview_image_fingerprint = models.CharField(max_length=64, blank=True, null=True)
     followers_url = fields.CharField(max_length=255, activitypub_field="followers")
     followers = models.ManyToManyField(
         "self",
@@ -1,8 +1,11 @@
 """Generate social media preview images for twitter/mastodon/etc"""
 
+import hashlib
+import json
 import math
 import os
 import textwrap
+from functools import lru_cache
 from io import BytesIO
 from uuid import uuid4
 import logging
@@ -37,6 +40,10 @@ margin = math.floor(IMG_HEIGHT / 10)
 gutter = math.floor(margin / 2)
 inner_img_height = math.floor(IMG_HEIGHT * 0.8)
 inner_img_width = math.floor(inner_img_height * 0.7)
+# the dominant color comes from a copy of the cover that's at most this big
+COLOR_SAMPLE_SIZE = 100
+# change this when previews are drawn differently, so that they're all redrawn
+PREVIEW_VERSION = 1
 
 
 def get_imagefont(name, size):
@@ -53,8 +60,10 @@ def get_imagefont(name, size):
     return ImageFont.load_default()
 
 
+@lru_cache(maxsize=32)
 def get_font(weight, size=28):
-    """Gets a custom font with the given weight and size"""
+    """Gets a custom font with the given weight and size, which is kept around
+    because loading it is a lot of the work of making a preview"""
 
     fonts = DEFAULT_FONT.split(",")
     for file in fonts:
@@ -235,16 +244,23 @@ def generate_texts_layer(texts, content_width):
 
 def generate_instance_layer(content_width):
     """Places components for instance preview"""
+    site = models.SiteSettings.get()
+    return get_instance_layer(site.name, site.logo_small.name or None, content_width)
+
+
+@lru_cache(maxsize=8)
+def get_instance_layer(name, logo_name, content_width):
+    """the instance layer is the same for every preview until the site changes"""
     font_instance = get_font("light", size=28)
 
-    site = models.SiteSettings.get()
-    site_name = process_arabic_script(site.name)
+    site_name = process_arabic_script(name)
     site_name_width = round(font_instance.getlength(site_name))
     site_name_direction = get_text_direction(site_name)
 
-    if site.logo_small:
-        with Image.open(site.logo_small) as logo_img:
-            logo_img.load()
+    if logo_name:
+        with default_storage.open(logo_name) as logo_file:
+            with Image.open(logo_file) as logo_img:
+                logo_img.load()
     else:
         try:
             static_path = os.path.join(settings.STATIC_ROOT, "images/logo-small.png")
@@ -278,6 +294,12 @@ def generate_instance_layer(content_width):
 
 def generate_rating_layer(rating):
     """Places components for rating preview"""
+    return get_rating_layer(math.floor(rating), math.floor(rating) != math.ceil(rating))
+
+
+@lru_cache(maxsize=16)
+def get_rating_layer(full_stars, half_star):
+    """there are only so many ways to draw a rating, so each is only drawn once"""
     path_star_full = os.path.join(settings.STATIC_ROOT, "images/icons/star-full.png")
     path_star_empty = os.path.join(settings.STATIC_ROOT, "images/icons/star-empty.png")
     path_star_half = os.path.join(settings.STATIC_ROOT, "images/icons/star-half.png")
@@ -299,17 +321,17 @@ def generate_rating_layer(rating):
 
     try:
         with Image.open(path_star_full) as icon_star_full:
-            for _ in range(math.floor(rating)):
+            for _ in range(full_stars):
                 rating_layer_mask.alpha_composite(icon_star_full, (position_x, 0))
                 position_x = position_x + icon_size + icon_margin
 
-        if math.floor(rating) != math.ceil(rating):
+        if half_star:
             with Image.open(path_star_half) as icon_star_half:
                 rating_layer_mask.alpha_composite(icon_star_half, (position_x, 0))
                 position_x = position_x + icon_size + icon_margin
 
         with Image.open(path_star_empty) as icon_star_empty:
-            for _ in range(5 - math.ceil(rating)):
+            for _ in range(5 - full_stars - half_star):
                 rating_layer_mask.alpha_composite(icon_star_empty, (position_x, 0))
                 position_x = position_x + icon_size + icon_margin
     except FileNotFoundError:
@@ -325,6 +347,7 @@ def generate_rating_layer(rating):
     return rating_layer_composite
 
 
+@lru_cache(maxsize=1)
 def generate_default_inner_img():
     """Adds cover image"""
     font_cover = get_font("light", size=28)
@@ -347,6 +370,20 @@ def generate_default_inner_img():
     return default_cover
 
 
+def get_dominant_color(image):
+    """the main color of an image, which is found from a small copy of it
+    rather than by going through every pixel of the whole thing"""
+    sample = image.copy()
+    sample.thumbnail((COLOR_SAMPLE_SIZE, COLOR_SAMPLE_SIZE))
+    with BytesIO() as sample_buffer:
+        sample.save(sample_buffer, format="png")
+        sample_buffer.seek(0)
+        try:
+            return ColorThief(sample_buffer).get_color(quality=1)
+        except Exception:
+            return ImageColor.getrgb(DEFAULT_COVER_COLOR)
+
+
 def generate_preview_image(
     texts=None, picture=None, rating=None, show_instance_layer=True
 ):
@@ -359,15 +396,14 @@ def generate_preview_image(
         inner_img_layer.thumbnail(
             (inner_img_width, inner_img_height), Image.Resampling.LANCZOS
         )
-        color_thief = ColorThief(picture)
-        dominant_color = color_thief.get_color(quality=1)
+        dominant_color = None
     except:
         inner_img_layer = generate_default_inner_img()
         dominant_color = ImageColor.getrgb(DEFAULT_COVER_COLOR)
 
     # Color
     if BG_COLOR in ["use_dominant_color_light", "use_dominant_color_dark"]:
-        red, green, blue = dominant_color
+        red, green, blue = dominant_color or get_dominant_color(inner_img_layer)
         image_bg_color = f"rgb({red}, {green}, {blue})"
 
         # Adjust color
@@ -459,7 +495,42 @@ def generate_preview_image(
     return img.convert("RGB")
 
 
-def save_and_cleanup(image, instance=None):
+def get_preview_fingerprint(
+    texts=None, picture=None, rating=None, show_instance_layer=True
+):
+    """a hash of everything that goes into a preview, to tell if it would look
+    any different from the one that's already there"""
+    instance_layer = None
+    if show_instance_layer:
+        site = models.SiteSettings.get()
+        instance_layer = [site.name, site.logo_small.name or None]
+
+    inputs = {
+        "version": PREVIEW_VERSION,
+        "style": [IMG_WIDTH, IMG_HEIGHT, BG_COLOR, TEXT_COLOR, DEFAULT_FONT],
+        "texts": texts or {},
+        "picture": str(picture) if picture else None,
+        # only whole and half stars are drawn
+        "rating": [math.floor(rating), math.ceil(rating)] if rating else None,
+        "instance_layer": instance_layer,
+    }
+    return hashlib.sha256(
+        json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def update_preview_image(instance, **preview):
+    """draw and store a preview, unless the one that's there already shows the
+    same thing"""
+    fingerprint = get_preview_fingerprint(**preview)
+    if instance.preview_image and instance.preview_image_fingerprint == fingerprint:
+        return False
+
+    image = generate_preview_image(**preview)
+    return save_and_cleanup(image, instance=instance, fingerprint=fingerprint)
+
+
+def save_and_cleanup(image, instance=None, fingerprint=None):
     """Save and close the file"""
     if not isinstance(instance, (models.Book, models.User, models.SiteSettings)):
         return False
@@ -491,11 +562,14 @@ def save_and_cleanup(image, instance=None):
             None,
         )
 
+        instance.preview_image_fingerprint = fingerprint
+        update_fields = ["preview_image", "preview_image_fingerprint"]
+
         save_without_broadcast = isinstance(instance, (models.Book, models.User))
         if save_without_broadcast:
-            instance.save(broadcast=False, update_fields=["preview_image"])
+            instance.save(broadcast=False, update_fields=update_fields)
         else:
-            instance.save(update_fields=["preview_image"])
+            instance.save(update_fields=update_fields)
 
     finally:
         image_buffer.close()
@@ -508,6 +582,29 @@ def generate_site_preview_image_task():
     if not settings.ENABLE_PREVIEW_IMAGES:
         return
 
+    generate_site_preview_image()
+
+
+@app.task(queue=IMAGES)
+def generate_edition_preview_image_task(book_id):
+    """generate preview_image for a book"""
+    if not settings.ENABLE_PREVIEW_IMAGES:
+        return
+
+    generate_edition_preview_image(book_id)
+
+
+@app.task(queue=IMAGES)
+def generate_user_preview_image_task(user_id):
+    """generate preview_image for a user"""
+    if not settings.ENABLE_PREVIEW_IMAGES:
+        return
+
+    generate_user_preview_image(user_id)
+
+
+def generate_site_preview_image():
+    """render and store the website's preview"""
     site = models.SiteSettings.get()
 
     if site.logo:
@@ -521,17 +618,11 @@ def generate_site_preview_image_task():
         "text_three": site.instance_tagline,
     }
 
-    image = generate_preview_image(texts=texts, picture=logo, show_instance_layer=False)
+    update_preview_image(site, texts=texts, picture=logo, show_instance_layer=False)
 
-    save_and_cleanup(image, instance=site)
-
-
-@app.task(queue=IMAGES)
-def generate_edition_preview_image_task(book_id):
-    """generate preview_image for a book"""
-    if not settings.ENABLE_PREVIEW_IMAGES:
-        return
 
+def generate_edition_preview_image(book_id):
+    """render and store a book's preview"""
     book = models.Book.objects.select_subclasses().get(id=book_id)
 
     rating = models.Review.objects.filter(
@@ -546,17 +637,11 @@ def generate_edition_preview_image_task(book_id):
         "text_three": book.author_text,
     }
 
-    image = generate_preview_image(texts=texts, picture=book.cover, rating=rating)
+    update_preview_image(book, texts=texts, picture=book.cover, rating=rating)
 
-    save_and_cleanup(image, instance=book)
-
-
-@app.task(queue=IMAGES)
-def generate_user_preview_image_task(user_id):
-    """generate preview_image for a user"""
-    if not settings.ENABLE_PREVIEW_IMAGES:
-        return
 
+def generate_user_preview_image(user_id):
+    """render and store a local user's preview"""
     user = models.User.objects.get(id=user_id)
 
     if not user.local:
@@ -572,9 +657,7 @@ def generate_user_preview_image_task(user_id):
     else:
         avatar = os.path.join(settings.STATIC_ROOT, "images/default_avi.jpg")
 
-    image = generate_preview_image(texts=texts, picture=avatar)
-
-    save_and_cleanup(image, instance=user)
+    update_preview_image(user, texts=texts, picture=avatar)
 
 
 @app.task(queue=IMAGES)
@@ -592,7 +675,10 @@ def remove_user_preview_image_task(user_id):
 
     # Delete image in model
     user.preview_image.delete(save=False)
-    user.save(broadcast=False, update_fields=["preview_image"])
+    user.preview_image_fingerprint = None
+    user.save(
+        broadcast=False, update_fields=["preview_image", "preview_image_fingerprint"]
+    )
 
     # Delete image file
     if file_name and default_storage.exists(file_name):
@@ -1,9 +1,12 @@
 """access the activity stores stored in redis"""
 
 from abc import ABC, abstractmethod
-from typing import Any
+from datetime import datetime
+import time
+from typing import Any, Callable, Iterable, Iterator
 
 import redis
+from django.db.models import Q
 from django.db.models.query import QuerySet
 
 from bookwyrm import settings
@@ -20,11 +23,11 @@ class RedisStore(ABC):
         """the object and rank"""
         return {obj.id: self.get_rank(obj)}
 
-    def add_object_to_stores(self, obj, stores, execute=True):
+    def add_object_to_stores(self, obj, stores, execute=True, pipeline=None):
         """add an object to a given set of stores"""
         value = self.get_value(obj)
         # we want to do this as a bulk operation, hence "pipeline"
-        pipeline = r.pipeline()
+        pipeline = pipeline if pipeline is not None else r.pipeline()
         for store in stores:
             # add the status to the feed
             pipeline.zadd(store, value)
@@ -69,6 +72,44 @@ class RedisStore(ABC):
         """load the values in a store"""
         return r.zrevrange(store, 0, -1, **kwargs)
 
+    def get_store_page(
+        self, store: str, count: int, before: tuple[float, int] | None = None
+    ) -> list[tuple[int, float]]:
+        """load the (id, rank) pairs in a store that come after a cursor, highest
+        rank first. Objects with the same rank are ordered by id, which means
+        fetching the whole of the group the page ends in."""
+        entries = []
+        max_score: str | float = "+inf"
+        if before is not None:
+            score, obj_id = before
+            entries = [
+                (int(value), rank)
+                for (value, rank) in r.zrangebyscore(
+                    store, score, score, withscores=True
+                )
+                if int(value) < obj_id
+            ]
+            max_score = f"({score!r}"
+
+        page = [
+            (int(value), rank)
+            for (value, rank) in r.zrevrangebyscore(
+                store, max_score, "-inf", start=0, num=count, withscores=True
+            )
+        ]
+        if len(page) == count:
+            last_rank = page[-1][1]
+            page = [entry for entry in page if entry[1] != last_rank] + [
+                (int(value), rank)
+                for (value, rank) in r.zrangebyscore(
+                    store, last_rank, last_rank, withscores=True
+                )
+            ]
+
+        entries += page
+        entries.sort(key=lambda entry: (entry[1], entry[0]), reverse=True)
+        return entries[:count]
+
     def populate_store(self, store: str) -> None:
         """go from zero to a store"""
         pipeline = r.pipeline()
@@ -82,6 +123,78 @@ class RedisStore(ABC):
             pipeline.zremrangebyrank(store, 0, -1 * self.max_length)
         pipeline.execute()
 
+    def bulk_populate_stores(
+        self,
+        queryset: QuerySet[Any],
+        get_stores: Callable[[Any], Iterable[str]],
+        order_field: str,
+        cursor_key: str,
+        resume: bool = False,
+        chunk_size: int = 500,
+    ) -> Iterator[dict[str, float]]:
+        """go from zero to many stores at once: one pass over the objects, newest
+        first, instead of one query per store. Yields progress after each chunk,
+        and keeps track of its place so an interrupted run can be resumed."""
+        queryset = queryset.order_by(f"-{order_field}", "-id")
+
+        def after(date, obj_id):
+            """the objects that come after a given one"""
+            return queryset.filter(
+                Q(**{f"{order_field}__lt": date})
+                | Q(**{order_field: date, "id__lt": obj_id})
+            )
+
+        page = queryset
+        if resume and (cursor := r.get(cursor_key)):
+            date, obj_id = cursor.decode("utf-8").rsplit(" ", 1)
+            page = after(datetime.fromisoformat(date), int(obj_id))
+
+        # how full each store is: objects come newest first, so once a store is
+        # full nothing else would stay in it
+        lengths: dict[str, int] = {}
+        progress = {"objects": 0, "entries": 0, "per_second": 0.0}
+        start = time.monotonic()
+        while chunk := list(page[:chunk_size]):
+            targets = [(obj, list(get_stores(obj))) for obj in chunk]
+
+            # find out how much is already in the stores we haven't seen yet
+            new_stores = list(
+                {s for (_, stores) in targets for s in stores} - set(lengths)
+            )
+            pipeline = r.pipeline()
+            for store in new_stores:
+                pipeline.zcard(store)
+            lengths.update(zip(new_stores, pipeline.execute()))
+
+            pipeline = r.pipeline()
+            for obj, stores in targets:
+                value = self.get_value(obj)
+                for store in stores:
+                    if self.max_length and lengths[store] >= self.max_length:
+                        continue
+                    pipeline.zadd(store, value)
+                    lengths[store] += 1
+                    progress["entries"] += 1
+
+            last_date, last_id = getattr(chunk[-1], order_field), chunk[-1].id
+            pipeline.set(cursor_key, f"{last_date.isoformat()} {last_id}")
+            pipeline.execute()
+
+            progress["objects"] += len(chunk)
+            progress["per_second"] = progress["objects"] / max(
+                time.monotonic() - start, 0.001
+            )
+            yield progress
+            page = after(last_date, last_id)
+
+        # stores that already had objects in them may have gone over the limit
+        if self.max_length:
+            pipeline = r.pipeline()
+            for store in lengths:
+                pipeline.zremrangebyrank(store, 0, -1 * self.max_length)
+            pipeline.execute()
+        r.delete(cursor_key)
+
     @abstractmethod
     def get_objects_for_store(self, store):
         """a queryset of what should go in a store, used for populating it"""
@@ -114,6 +114,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.humanize",
+    "django.contrib.postgres",
     "oauth2_provider",
     "file_resubmit",
     "sass_processor",
@@ -133,6 +134,8 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "csp.middleware.CSPMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "bookwyrm.middleware.SiteSettingsMiddleware",
+    "bookwyrm.middleware.RequestCacheMiddleware",
     "bookwyrm.middleware.RequireSignedGet",
     "bookwyrm.middleware.RequireLoginNearlyEverywhere",
     "bookwyrm.middleware.TimezoneMiddleware",
@@ -264,6 +267,29 @@ STREAMS = [
 SEARCH_TIMEOUT = env.int("SEARCH_TIMEOUT", 8)
 # timeout for a query to an individual connector
 QUERY_TIMEOUT = env.int("INTERACTIVE_QUERY_TIMEOUT", env.int("QUERY_TIMEOUT", 5))
+# seconds that a connector's results for a query are fresh, and how much longer
+# stale results are shown while they are refreshed in the background
+SEARCH_CACHE_TIMEOUT = env.int("SEARCH_CACHE_TIMEOUT", 60 * 60)
+SEARCH_CACHE_STALE_TIMEOUT = env.int("SEARCH_CACHE_STALE_TIMEOUT", 60 * 60 * 24)
+
+# Federation delivery
+# timeout in seconds for sending an activity to a remote inbox
+BROADCAST_TIMEOUT = env.int("BROADCAST_TIMEOUT", 10)
+# open connections each worker keeps, in total and to any one server
+BROADCAST_MAX_CONNECTIONS = env.int("BROADCAST_MAX_CONNECTIONS", 100)
+BROADCAST_MAX_CONNECTIONS_PER_HOST = env.int("BROADCAST_MAX_CONNECTIONS_PER_HOST", 4)
+# how many times, and how many inboxes at most, to retry when delivery fails
+BROADCAST_MAX_RETRIES = env.int("BROADCAST_MAX_RETRIES", 3)
+BROADCAST_RETRY_QUEUE_SIZE = env.int("BROADCAST_RETRY_QUEUE_SIZE", 1000)
+
+# Inbox
+# accept incoming activities with only basic checks, and queue them up to be
+# verified and handled by the inbox workers
+INBOX_DEFERRED_VERIFICATION = env.bool("INBOX_DEFERRED_VERIFICATION", False)
+# how many queued activities an inbox worker takes at a time
+INBOX_QUEUE_BATCH_SIZE = env.int("INBOX_QUEUE_BATCH_SIZE", 100)
+# activities past this are dropped, oldest first, if the workers fall behind
+INBOX_QUEUE_MAX_LENGTH = env.int("INBOX_QUEUE_MAX_LENGTH", 100000)
 
 CACHE_KEY_PREFIX = "django_cache"
 # Redis cache backend
@@ -1,12 +1,14 @@
 """signs activitypub activities"""
 
 import hashlib
+from functools import lru_cache
 from urllib.parse import urlparse
 import datetime
 from base64 import b64encode, b64decode
 
 from Crypto import Random
 from Crypto.PublicKey import RSA
+from Crypto.PublicKey.RSA import RsaKey
 from Crypto.Signature import pkcs1_15
 from Crypto.Hash import SHA256
 
@@ -23,6 +25,13 @@ def create_key_pair():
     return private_key, public_key
 
 
+@lru_cache(maxsize=512)
+def import_key(key: str) -> RsaKey:
+    """parse a PEM key. This is slow, so parsed keys are kept around, looked up
+    by the key itself: a key pair that changes just gets a new cache entry"""
+    return RSA.import_key(key)
+
+
 def make_signature(method, sender, destination, date, **kwargs):
     """uses a private key to sign an outgoing message"""
     inbox_parts = urlparse(destination)
@@ -38,7 +47,7 @@ def make_signature(method, sender, destination, date, **kwargs):
         headers = "(request-target) host date digest"
 
     message_to_sign = "\n".join(signature_headers)
-    signer = pkcs1_15.new(RSA.import_key(sender.key_pair.private_key))
+    signer = pkcs1_15.new(import_key(sender.key_pair.private_key))
     signed_message = signer.sign(SHA256.new(message_to_sign.encode("utf8")))
     # For legacy reasons we need to use an incorrect keyId for older Bookwyrm versions
     key_id = (
@@ -107,7 +116,7 @@ class Signature:
         """verify rsa signature"""
         if http_date_age(request.headers["date"]) > MAX_SIGNATURE_AGE:
             raise ValueError(f"Request too old: {request.headers['date']}")
-        public_key = RSA.import_key(public_key)
+        public_key = import_key(public_key)
 
         comparison_string = []
         for signed_header_name in self.headers.split(" "):
@@ -0,0 +1,196 @@
+"""follows and blocks, stored in redis as sets of user ids"""
+
+from typing import Callable, Iterable
+
+from django.dispatch import receiver
+from django.db.models import signals, Q
+
+from bookwyrm import models
+from bookwyrm.redis_store import r
+
+
+class SocialGraph:
+    """who follows and blocks whom, so that working out the audience of a status
+    is a matter of set operations rather than joins"""
+
+    # user and work ids start at 1, so this marks a set that has been loaded from
+    # the database but has nothing in it, as opposed to one that was never loaded
+    placeholder = 0
+    # how long a set can drift from the database if an update is missed
+    expiry = 60 * 60 * 24
+
+    local_users_id = "local-users"
+
+    def followers_id(self, user_id: int) -> str:
+        """the redis key for the local users following a user"""
+        return f"{user_id}-local-followers"
+
+    def blocks_id(self, user_id: int) -> str:
+        """the redis key for the users blocking, or blocked by, a user"""
+        return f"{user_id}-blocks"
+
+    def work_blocks_id(self, work_id: int) -> str:
+        """the redis key for the local users blocking a work"""
+        return f"{work_id}-work-blocked-by"
+
+    def get_local_users(self) -> set[int]:
+        """every active user on this instance"""
+        return self._get_set(
+            self.local_users_id,
+            lambda: models.User.objects.filter(local=True, is_active=True).values_list(
+                "id", flat=True
+            ),
+        )
+
+    def get_followers(self, user_id: int) -> set[int]:
+        """local users following a user"""
+        return self._get_set(
+            self.followers_id(user_id),
+            lambda: models.UserFollows.objects.filter(
+                user_object_id=user_id, user_subject__local=True
+            ).values_list("user_subject_id", flat=True),
+        )
+
+    def get_blocks(self, user_id: int) -> set[int]:
+        """users in a block with a user, in either direction"""
+
+        def load_blocks():
+            blocks = models.UserBlocks.objects.filter(
+                Q(user_subject_id=user_id) | Q(user_object_id=user_id)
+            ).values_list("user_subject_id", "user_object_id")
+            return {i for block in blocks for i in block} - {user_id}
+
+        return self._get_set(self.blocks_id(user_id), load_blocks)
+
+    def get_work_blocks(self, work_ids: Iterable[int]) -> set[int]:
+        """local users blocking any of these works"""
+        blocked_books = models.User.blocked_books.through.objects
+        audience = set()
+        for work_id in work_ids:
+            audience |= self._get_set(
+                self.work_blocks_id(work_id),
+                lambda work_id=work_id: blocked_books.filter(
+                    work_id=work_id, user__local=True
+                ).values_list("user_id", flat=True),
+            )
+        return audience
+
+    def add_to_set(self, key: str, *ids: int) -> None:
+        """add users to a set, if it's been loaded (if not, it will be loaded
+        from the database with them in it when it's next needed)"""
+        if ids and r.exists(key):
+            r.sadd(key, *ids)
+
+    def remove_from_set(self, key: str, *ids: int) -> None:
+        """take users out of a set"""
+        if ids:
+            r.srem(key, *ids)
+
+    def _get_set(self, key: str, load: Callable[[], Iterable[int]]) -> set[int]:
+        """the members of a set, loaded from the database if necessary"""
+        if members := r.smembers(key):
+            return {int(member) for member in members} - {self.placeholder}
+
+        ids = set(load())
+        pipeline = r.pipeline()
+        pipeline.sadd(key, self.placeholder, *ids)
+        pipeline.expire(key, self.expiry)
+        pipeline.execute()
+        return ids
+
+
+social_graph = SocialGraph()
+
+
+@receiver(signals.post_save, sender=models.User)
+def update_local_users(sender, instance, created, update_fields=None, **kwargs):
+    """new users, and users who are deactivated or reactivated"""
+    if update_fields and not {"local", "is_active"} & set(update_fields):
+        return
+    if instance.local and instance.is_active:
+        social_graph.add_to_set(social_graph.local_users_id, instance.id)
+    elif not created:
+        social_graph.remove_from_set(social_graph.local_users_id, instance.id)
+
+
+@receiver(signals.post_save, sender=models.UserFollows)
+def add_follower(sender, instance, created, *args, **kwargs):
+    """a local user follows someone"""
+    if created and instance.user_subject.local:
+        social_graph.add_to_set(
+            social_graph.followers_id(instance.user_object_id),
+            instance.user_subject_id,
+        )
+
+
+@receiver(signals.post_delete, sender=models.UserFollows)
+def remove_follower(sender, instance, *args, **kwargs):
+    """a local user unfollows someone"""
+    social_graph.remove_from_set(
+        social_graph.followers_id(instance.user_object_id), instance.user_subject_id
+    )
+
+
+@receiver(signals.post_save, sender=models.UserBlocks)
+def add_block(sender, instance, created, *args, **kwargs):
+    """blocks go in both users' sets"""
+    if not created:
+        return
+    social_graph.add_to_set(
+        social_graph.blocks_id(instance.user_subject_id), instance.user_object_id
+    )
+    social_graph.add_to_set(
+        social_graph.blocks_id(instance.user_object_id), instance.user_subject_id
+    )
+
+
+@receiver(signals.post_delete, sender=models.UserBlocks)
+def remove_block(sender, instance, *args, **kwargs):
+    """unblock, unless there's still a block in the other direction"""
+    if models.UserBlocks.objects.filter(
+        user_subject=instance.user_object, user_object=instance.user_subject
+    ).exists():
+        return
+    social_graph.remove_from_set(
+        social_graph.blocks_id(instance.user_subject_id), instance.user_object_id
+    )
+    social_graph.remove_from_set(
+        social_graph.blocks_id(instance.user_object_id), instance.user_subject_id
+    )
+
+
+@receiver(signals.m2m_changed, sender=models.UserFollows)
+@receiver(signals.m2m_changed, sender=models.UserBlocks)
+@receiver(signals.m2m_changed, sender=models.User.blocked_books.through)
+def invalidate_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """follows, blocks and blocked books changed with add(), remove() or clear()
+    don't send save signals, so reload whatever sets they touch from the database"""
+    if action not in ["post_add", "post_remove", "pre_clear"]:
+        return
+
+    if sender == models.User.blocked_books.through:
+        if reverse:
+            work_ids = {instance.id}
+        elif pk_set is None:
+            work_ids = set(instance.blocked_books.values_list("id", flat=True))
+        else:
+            work_ids = pk_set
+        keys = [social_graph.work_blocks_id(work_id) for work_id in work_ids]
+    else:
+        if pk_set is None:
+            pk_set = set(
+                sender.objects.filter(
+                    **{"user_object" if reverse else "user_subject": instance}
+                ).values_list(
+                    "user_subject_id" if reverse else "user_object_id", flat=True
+                )
+            )
+        get_key = (
+            social_graph.followers_id
+            if sender == models.UserFollows
+            else social_graph.blocks_id
+        )
+        keys = [get_key(user_id) for user_id in {instance.id, *pk_set}]
+
+    if keys:
+        r.delete(*keys)
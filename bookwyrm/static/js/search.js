@@ -0,0 +1,64 @@
+/* exported SearchStream */
+/* globals BookWyrm */
+
+let SearchStream = new (class {
+    constructor() {
+        document
+            .querySelectorAll("[data-search-stream]")
+            .forEach((container) => this.loadResults(container));
+    }
+
+    /**
+     * Read results from other catalogues as each one arrives, as lines of json.
+     *
+     * @param  {Element} container
+     * @return {undefined}
+     */
+    async loadResults(container) {
+        const loading = container.querySelector("[data-search-stream-loading]");
+
+        try {
+            const response = await fetch(container.dataset.searchStream);
+            const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = "";
+
+            for (;;) {
+                // eslint-disable-next-line no-await-in-loop
+                const { value, done } = await reader.read();
+
+                if (done) {
+                    break;
+                }
+
+                buffer += value;
+                const lines = buffer.split("\n");
+
+                // The last line may not have arrived in full yet
+                buffer = lines.pop();
+                lines.forEach((line) => this.addResults(container, line));
+            }
+        } finally {
+            BookWyrm.classHide(loading);
+        }
+    }
+
+    /**
+     * Add one connector's results to the page.
+     *
+     * @param  {Element} container
+     * @param  {string} line
+     * @return {undefined}
+     */
+    addResults(container, line) {
+        if (!line) {
+            return;
+        }
+
+        const data = JSON.parse(line);
+
+        // Local results are already on the page
+        if (data.html) {
+            container.insertAdjacentHTML("beforeend", data.html);
+        }
+    }
+})();
@@ -1,7 +1,6 @@
 """template filters"""
 
 from django import template
-from django.db.models import Avg
 
 from bookwyrm import models
 from bookwyrm.utils import cache
@@ -14,34 +13,30 @@ register = template.Library()
 def get_rating(book, user):
     """get the overall rating of a book"""
     # this shouldn't happen, but it CAN
-    if not book.parent_work:
+    if not book.parent_work_id:
         return None
 
-    return cache.get_or_set(
-        f"book-rating-{book.parent_work.id}",
-        lambda u, b: models.Review.objects.filter(
-            book__parent_work__editions=b, rating__gt=0
-        ).aggregate(Avg("rating"))["rating__avg"]
-        or 0,
-        user,
-        book,
-        timeout=15552000,
+    return cache.get_or_memoize(
+        f"book-rating-{book.parent_work_id}",
+        models.WorkRating.get_average,
+        book.parent_work_id,
     )
 
 
 @register.filter(name="user_rating")
 def get_user_rating(book, user):
     """get a user's rating of a book"""
-    rating = (
-        models.Review.objects.filter(
-            user=user,
-            book=book,
-            rating__isnull=False,
-            deleted=False,
-        )
-        .order_by("-published_date")
-        .first()
+    return cache.get_or_memoize(
+        f"user-rating-{user.id}-{book.id}",
+        lambda u, b: (
+            models.Review.objects.filter(
+                user=u, book=b, rating__isnull=False, deleted=False
+            )
+            .order_by("-published_date")
+            .values_list("rating", flat=True)
+            .first()
+            or 0
+        ),
+        user,
+        book,
     )
-    if rating:
-        return rating.rating
-    return 0
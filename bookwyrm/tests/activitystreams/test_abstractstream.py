@@ -1,8 +1,9 @@
 """testing activitystreams"""
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
 from django.test import TestCase
+import fakeredis
 
 from bookwyrm import activitystreams, models
 
@@ -119,6 +120,80 @@ class Activitystreams(TestCase):
         self.assertEqual(result.last(), status)
         self.assertIsInstance(result.first(), models.Comment)
 
+    def test_get_store_page(self, *_):
+        """load a page at a time, with ties broken by id"""
+        redis_mock = fakeredis.FakeRedis()
+        redis_mock.zadd("store", {1: 10.0, 2: 20.0, 9: 20.0, 10: 20.0, 11: 30.0})
+        with patch("bookwyrm.redis_store.r", redis_mock):
+            page = self.test_stream.get_store_page("store", 2)
+            self.assertEqual(page, [(11, 30.0), (10, 20.0)])
+
+            page = self.test_stream.get_store_page("store", 2, before=(20.0, 10))
+            self.assertEqual(page, [(9, 20.0), (2, 20.0)])
+
+            page = self.test_stream.get_store_page("store", 2, before=(20.0, 2))
+            self.assertEqual(page, [(1, 10.0)])
+
+    def test_get_activity_page(self, *_):
+        """load statuses a page at a time"""
+        date = datetime(2022, 1, 28, 0, 0, tzinfo=timezone.utc)
+        statuses = [
+            models.Comment.objects.create(
+                user=self.remote_user,
+                content="hi",
+                privacy="direct",
+                book=self.book,
+                published_date=date + timedelta(days=i),
+            )
+            for i in range(4)
+        ]
+        # a status that's filtered out
+        note = models.Status.objects.create(
+            user=self.remote_user,
+            content="hi",
+            privacy="direct",
+            published_date=date + timedelta(days=2, hours=1),
+        )
+        redis_mock = fakeredis.FakeRedis()
+        stream_id = self.test_stream.stream_id(self.local_user.id)
+        with (
+            patch("bookwyrm.redis_store.r", redis_mock),
+            patch("bookwyrm.activitystreams.r", redis_mock),
+        ):
+            for status in statuses + [note]:
+                self.test_stream.add_object_to_stores(status, [stream_id])
+
+            page = self.test_stream.get_activity_page(
+                self.local_user,
+                status_filter=lambda q: q.exclude(id=note.id),
+                page_length=2,
+            )
+            self.assertTrue(page.is_first_page)
+            self.assertEqual(list(page), [statuses[3], statuses[2]])
+            self.assertIsInstance(page.object_list[0], models.Comment)
+
+            page = self.test_stream.get_activity_page(
+                self.local_user,
+                before=page.next_cursor,
+                status_filter=lambda q: q.exclude(id=note.id),
+                page_length=2,
+            )
+            self.assertFalse(page.is_first_page)
+            self.assertEqual(list(page), [statuses[1], statuses[0]])
+
+            page = self.test_stream.get_activity_page(
+                self.local_user, before=page.next_cursor, page_length=2
+            )
+            self.assertEqual(list(page), [])
+            self.assertFalse(page.has_next)
+
+            # a cursor that doesn't make sense is the first page
+            page = self.test_stream.get_activity_page(
+                self.local_user, before="nan_1", page_length=2
+            )
+            self.assertTrue(page.is_first_page)
+            self.assertEqual(list(page), [statuses[3], note])
+
     def test_abstractstream_get_audience(self, *_):
         """get a list of users that should see a status"""
         status = models.Status.objects.create(
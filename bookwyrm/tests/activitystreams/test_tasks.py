@@ -91,6 +91,43 @@ class Activitystreams(TestCase):
         args = mock.call_args[0]
         self.assertEqual(args[0], self.status)
 
+    def test_add_status_task_single_pipeline(self):
+        """all the streams share one redis pipeline"""
+        with patch("bookwyrm.activitystreams.r.pipeline") as pipeline_mock:
+            activitystreams.add_status_task(self.status.id)
+        self.assertEqual(pipeline_mock.call_count, 1)
+        self.assertEqual(pipeline_mock.return_value.execute.call_count, 1)
+
+    @patch("bookwyrm.models.activitypub_mixin.broadcast_task.apply_async")
+    def test_get_stream_audiences(self, *_):
+        """the shared audience query agrees with each stream's own audience"""
+        self.another_user.following.add(self.local_user)
+        models.ShelfBook.objects.create(
+            user=self.another_user,
+            shelf=self.another_user.shelf_set.first(),
+            book=self.book,
+        )
+        statuses = [
+            self.status,
+            models.Comment.objects.create(
+                user=self.local_user, content="hi", book=self.book
+            ),
+            models.Comment.objects.create(
+                user=self.remote_user, content="hi", book=self.book
+            ),
+            models.Status.objects.create(
+                user=self.local_user, content="hi", privacy="followers"
+            ),
+            models.Status.objects.create(
+                user=self.local_user, content="hi", privacy="direct"
+            ),
+        ]
+        for status in statuses:
+            status = models.Status.objects.select_subclasses().get(id=status.id)
+            audiences = activitystreams.get_stream_audiences(status)
+            for key, stream in activitystreams.streams.items():
+                self.assertCountEqual(audiences[key], stream.get_audience(status))
+
     def test_remove_user_statuses_task(self):
         """remove all statuses by a user from another users' feeds"""
         with patch(
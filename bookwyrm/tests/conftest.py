@@ -4,6 +4,10 @@ import fakeredis
 import pytest
 from unittest import mock
 
+from bookwyrm.connectors.connector_manager import connector_registry
+from bookwyrm.models.federated_server import blocked_servers
+from bookwyrm.models.site import site_settings_cache
+
 
 @pytest.fixture(scope="session", autouse=True)
 def fake_redis():
@@ -12,3 +16,84 @@ def fake_redis():
         "bookwyrm.activitypub.base_activity.r", fakeredis.FakeRedis()
     ) as _fakeredis:
         yield _fakeredis
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_social_graph_redis():
+    """the follow and block sets are read whenever an audience is calculated"""
+    with mock.patch("bookwyrm.social_graph.r", fakeredis.FakeRedis()) as _fakeredis:
+        yield _fakeredis
+
+
+@pytest.fixture(autouse=True)
+def flush_social_graph(fake_social_graph_redis):
+    """database changes are rolled back between tests, so the sets must be too"""
+    fake_social_graph_redis.flushall()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_blocked_servers_redis():
+    """changes to the server blocklist are announced over pub/sub"""
+    with mock.patch(
+        "bookwyrm.models.federated_server.r", fakeredis.FakeRedis()
+    ) as _fakeredis:
+        yield _fakeredis
+
+
+@pytest.fixture(autouse=True)
+def reset_blocked_servers(fake_blocked_servers_redis):
+    """the blocklist is kept in memory, but the database is rolled back"""
+    blocked_servers.invalidate()
+    yield
+    # the next test class may load it while setting up
+    blocked_servers.invalidate()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_site_settings_redis():
+    """the site settings version number is checked before using the settings"""
+    with mock.patch("bookwyrm.models.site.r", fakeredis.FakeRedis()) as _fakeredis:
+        yield _fakeredis
+
+
+@pytest.fixture(autouse=True)
+def reset_site_settings(fake_site_settings_redis):
+    """the settings are kept in memory, but the database is rolled back"""
+    site_settings_cache.changing = False
+    site_settings_cache.site = None
+    yield
+    # the next test class may load them while setting up
+    site_settings_cache.site = None
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_search_cache_redis():
+    """remote search results are cached for each connector"""
+    with mock.patch(
+        "bookwyrm.connectors.search_cache.r", fakeredis.FakeRedis()
+    ) as _fakeredis:
+        yield _fakeredis
+
+
+@pytest.fixture(autouse=True)
+def flush_search_cache(fake_search_cache_redis):
+    """a result cached by one test shouldn't turn up in another"""
+    fake_search_cache_redis.flushall()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_connector_registry_redis():
+    """the connectors version number is checked before each search"""
+    with mock.patch(
+        "bookwyrm.connectors.connector_manager.r", fakeredis.FakeRedis()
+    ) as _fakeredis:
+        yield _fakeredis
+
+
+@pytest.fixture(autouse=True)
+def reset_connector_registry(fake_connector_registry_redis):
+    """the connectors are kept in memory, but the database is rolled back"""
+    connector_registry.changing = False
+    connector_registry.connectors = None
+    yield
+    connector_registry.connectors = None
@@ -0,0 +1,125 @@
+"""keeping track of which connectors are responding"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from django.test import TestCase
+import aiohttp
+import fakeredis
+
+from bookwyrm import models
+from bookwyrm.connectors import circuit_breaker
+from bookwyrm.connectors.connector_manager import load_connector
+from bookwyrm.settings import SEARCH_TIMEOUT
+
+
+class CircuitBreaker(TestCase):
+    """skipping connectors that keep failing"""
+
+    @classmethod
+    def setUpTestData(cls):
+        """a connector to search"""
+        cls.connector_info = models.Connector.objects.create(
+            identifier="example.com",
+            connector_file="openlibrary",
+            base_url="https://example.com",
+            books_url="https://example.com",
+            covers_url="https://example.com/covers",
+            search_url="https://example.com/search?q=",
+        )
+
+    def setUp(self):
+        """a fresh redis for each test"""
+        self.r = fakeredis.FakeAsyncRedis()
+
+    def test_get_timeout_for_latencies(self):
+        """wait for about as long as the connector usually takes"""
+        self.assertEqual(
+            circuit_breaker.get_timeout_for_latencies([0.1] * 5), SEARCH_TIMEOUT
+        )
+        self.assertEqual(
+            circuit_breaker.get_timeout_for_latencies([1.0] * 19 + [100.0]), 1.5
+        )
+        self.assertEqual(circuit_breaker.get_timeout_for_latencies([0.1] * 20), 1.0)
+        self.assertEqual(
+            circuit_breaker.get_timeout_for_latencies([100.0] * 20), SEARCH_TIMEOUT
+        )
+
+    def test_circuit_breaker(self):
+        """open after too many failures, then half open, then closed"""
+
+        async def run():
+            """go through the states"""
+            connector_id = self.connector_info.id
+            for _ in range(circuit_breaker.MIN_LATENCY_SAMPLES):
+                await circuit_breaker.record_success(self.r, connector_id, 2.0)
+            self.assertEqual(await circuit_breaker.get_timeout(self.r, connector_id), 3)
+
+            for _ in range(circuit_breaker.FAILURE_THRESHOLD):
+                await circuit_breaker.record_failure(self.r, connector_id)
+            self.assertIsNone(await circuit_breaker.get_timeout(self.r, connector_id))
+
+            # half open: one search gets through
+            await self.r.delete(circuit_breaker.get_key(connector_id, "open"))
+            self.assertEqual(await circuit_breaker.get_timeout(self.r, connector_id), 3)
+            self.assertIsNone(await circuit_breaker.get_timeout(self.r, connector_id))
+
+            await circuit_breaker.record_success(self.r, connector_id, 2.0)
+            self.assertEqual(await circuit_breaker.get_timeout(self.r, connector_id), 3)
+            self.assertEqual(await circuit_breaker.get_timeout(self.r, connector_id), 3)
+
+        asyncio.run(run())
+
+    @patch("bookwyrm.connectors.abstract_connector.update_connector_status.delay")
+    def test_get_results_skipped(self, status_mock):
+        """a connector that isn't working isn't searched"""
+        connector = load_connector(self.connector_info)
+        session = MagicMock()
+        session.get.side_effect = asyncio.TimeoutError
+
+        async def search():
+            """try searching a few times"""
+            for _ in range(circuit_breaker.FAILURE_THRESHOLD + 1):
+                result = await connector.get_results(
+                    session, "https://example.com/search?q=hi", 0.1, "hi"
+                )
+                self.assertIsNone(result)
+
+        with patch(
+            "bookwyrm.connectors.abstract_connector.redis.from_url",
+            return_value=self.r,
+        ):
+            asyncio.run(search())
+        self.assertEqual(session.get.call_count, circuit_breaker.FAILURE_THRESHOLD)
+        self.assertEqual(status_mock.call_count, 1)
+
+    @patch("bookwyrm.connectors.abstract_connector.update_connector_status.delay")
+    def test_get_results_timeout(self, _):
+        """each search is given the connector's timeout"""
+        connector = load_connector(self.connector_info)
+        response = MagicMock(ok=True)
+        response.json = AsyncMock(return_value={"docs": []})
+        session = MagicMock()
+        session.get.return_value.__aenter__.return_value = response
+
+        async def search():
+            """search, and see what was recorded"""
+            result = await connector.get_results(
+                session, "https://example.com/search?q=hi", 0.1, "hi"
+            )
+            latencies = await self.r.llen(
+                circuit_breaker.get_key(self.connector_info.id, "latency")
+            )
+            return result, latencies
+
+        with patch(
+            "bookwyrm.connectors.abstract_connector.redis.from_url",
+            return_value=self.r,
+        ):
+            result, latencies = asyncio.run(search())
+        self.assertEqual(result["results"], [])
+        self.assertEqual(latencies, 1)
+        self.assertEqual(
+            session.get.call_args.kwargs["timeout"],
+            aiohttp.ClientTimeout(total=SEARCH_TIMEOUT),
+        )
@@ -1,5 +1,7 @@
 """interface between the app and various connectors"""
 
+import asyncio
+
 from django.test import TestCase
 import fakeredis
 import pytest
@@ -7,7 +9,8 @@ import responses
 from unittest import mock
 
 from bookwyrm import models
-from bookwyrm.connectors import connector_manager
+from bookwyrm.book_search import SearchResult
+from bookwyrm.connectors import connector_manager, search_cache
 from bookwyrm.connectors.bookwyrm_connector import Connector as BookWyrmConnector
 
 
@@ -34,6 +37,7 @@ class ConnectorManager(TestCase):
     @classmethod
     def setUpTestData(cls):
         """we'll need some books and a connector info entry"""
+        models.SiteSettings.objects.create(id=1)
         cls.work = models.Work.objects.create(title="Example Work")
 
         models.Edition.objects.create(
@@ -71,16 +75,154 @@ class ConnectorManager(TestCase):
         self.assertEqual(len(connectors), 1)
         self.assertIsInstance(connectors[0], BookWyrmConnector)
 
+    def test_get_connectors_cached(self):
+        """searching doesn't need to load the connectors every time"""
+        connectors = list(connector_manager.get_connectors())
+        with self.assertNumQueries(0):
+            self.assertEqual(list(connector_manager.get_connectors()), connectors)
+
+        # the connector's status doesn't change how it searches
+        self.remote_connector.latest_error = "oops"
+        self.remote_connector.save(update_fields=["latest_error"])
+        with self.assertNumQueries(0):
+            list(connector_manager.get_connectors())
+
+        self.remote_connector.deactivate()
+        self.assertEqual(list(connector_manager.get_connectors()), [])
+
+    def test_get_connectors_published(self):
+        """other processes find out about changes once they're committed"""
+        list(connector_manager.get_connectors())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.remote_connector.change_priority(3)
+        self.assertFalse(connector_manager.connector_registry.changing)
+        self.assertIsNone(connector_manager.connector_registry.connectors)
+        self.assertEqual(
+            connector_manager.r.get(connector_manager.ConnectorRegistry.version_key),
+            b"1",
+        )
+
     def test_search_empty_query(self):
         """don't panic on empty queries"""
         results = connector_manager.search("")
         self.assertEqual(results, [])
 
+    def test_search_cached(self):
+        """the connectors are only searched once for the same query"""
+        connector = connector_manager.load_connector(self.remote_connector)
+        result = SearchResult(
+            title="Example", key="https://example.com/book/1", connector=connector
+        )
+        with mock.patch.object(
+            BookWyrmConnector, "get_results", new_callable=mock.AsyncMock
+        ) as search_mock:
+            search_mock.return_value = {"connector": connector, "results": [result]}
+            connector_manager.search("Example")
+            results = connector_manager.search("example")
+        self.assertEqual(search_mock.call_count, 1)
+        self.assertEqual(results[0]["results"][0].title, "Example")
+        self.assertEqual(results[0]["connector"].identifier, "test_connector_remote")
+
+    @mock.patch("bookwyrm.connectors.connector_manager.refresh_search_results.delay")
+    def test_search_cached_stale(self, refresh_mock):
+        """stale results are used, and refreshed in the background"""
+        connector = connector_manager.load_connector(self.remote_connector)
+        result = SearchResult(
+            title="Example", key="https://example.com/book/1", connector=connector
+        )
+        search_cache.set_results(connector, "example", 0.1, [result])
+        with (
+            mock.patch.object(BookWyrmConnector, "search_cache_timeout", -1),
+            mock.patch.object(
+                BookWyrmConnector, "get_results", new_callable=mock.AsyncMock
+            ) as search_mock,
+        ):
+            results = connector_manager.search("example")
+        self.assertFalse(search_mock.called)
+        self.assertEqual(results[0]["results"][0].title, "Example")
+        refresh_mock.assert_called_once_with(self.remote_connector.id, "example", 0.1)
+
+    def test_iter_search_results(self):
+        """results arrive in the order the connectors respond"""
+        models.Connector.objects.create(
+            identifier="slow.example",
+            priority=2,
+            connector_file="bookwyrm_connector",
+            base_url="https://slow.example",
+            books_url="https://slow.example/book",
+            covers_url="https://slow.example/images",
+            search_url="https://slow.example/search?q=",
+        )
+
+        async def get_results(connector, session, url, min_confidence, query):
+            """the higher priority connector is also the slower one"""
+            if connector.identifier == "test_connector_remote":
+                await asyncio.sleep(0.1)
+            return {"connector": connector, "results": []}
+
+        with mock.patch.object(BookWyrmConnector, "get_results", get_results):
+            connectors = connector_manager.get_search_connectors("example")
+            streamed = [
+                result["connector"].identifier
+                for result in connector_manager.iter_search_results(
+                    "example", connectors, 0.1
+                )
+            ]
+            search_cache.r.flushall()
+            results = connector_manager.search("example")
+
+        self.assertEqual(streamed, ["slow.example", "test_connector_remote"])
+        self.assertEqual(
+            [result["connector"].identifier for result in results],
+            ["test_connector_remote", "slow.example"],
+        )
+
     def test_first_search_result(self):
         """only get one search result"""
         result = connector_manager.first_search_result("Example")
         self.assertEqual(result.title, "Example Edition")
 
+    def test_first_search_results(self):
+        """a batch of queries is searched at once, a few at a time"""
+        running = []
+        most_running = []
+
+        async def get_results(connector, session, url, min_confidence, query):
+            """keep track of how many searches are going at once"""
+            running.append(query)
+            most_running.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(query)
+            if query == "nothing":
+                return {"connector": connector, "results": []}
+            return {
+                "connector": connector,
+                "results": [
+                    SearchResult(title="Close", key="close", connector=connector),
+                    SearchResult(
+                        title=query, key=query, connector=connector, confidence=2
+                    ),
+                ],
+            }
+
+        queries = [f"query {i}" for i in range(10)] + ["nothing"]
+        with mock.patch.object(BookWyrmConnector, "get_results", get_results):
+            results = connector_manager.first_search_results(queries, concurrency=3)
+
+        self.assertEqual(max(most_running), 3)
+        self.assertEqual(set(results), set(queries) - {"nothing"})
+        self.assertEqual(results["query 4"].title, "query 4")
+        # the results are cached like any other search
+        self.assertIsNotNone(
+            search_cache.get_results(
+                connector_manager.load_connector(self.remote_connector), "query 4", 0.1
+            )
+        )
+
+    def test_first_search_results_empty(self):
+        """nothing to search"""
+        self.assertEqual(connector_manager.first_search_results([]), {})
+
     def test_first_search_result_empty_query(self):
         """only get one search result"""
         result = connector_manager.first_search_result("")
@@ -245,15 +245,21 @@ class Openlibrary(TestCase):
         responses.add(
             responses.GET,
             "https://openlibrary.org/works/OL1234W/editions",
-            json={"entries": []},
+            json={"entries": [self.edition_data] * 150 + [{"title": "Boring"}]},
         )
         with patch(
-            "bookwyrm.connectors.abstract_connector.AbstractConnector."
-            "create_edition_from_data"
-        ):
+            "bookwyrm.connectors.openlibrary.create_editions_task.delay"
+        ) as mock:
             self.connector.expand_book_data(edition)
             self.connector.expand_book_data(work)
 
+        # editions are loaded in batches, and the uninteresting ones are skipped
+        self.assertEqual(mock.call_count, 4)
+        self.assertEqual(
+            [len(args[2]) for (args, _) in mock.call_args_list], [100, 50, 100, 50]
+        )
+        self.assertEqual(mock.call_args_list[0][0][1], work.id)
+
     def test_get_description(self):
         """should do some cleanup on the description data"""
         description = get_description(self.work_data["description"])
@@ -312,6 +318,42 @@ class Openlibrary(TestCase):
         self.assertEqual(result.subjects[0], "Fantasy.")
         self.assertEqual(result.physical_format, "Hardcover")
 
+    def test_create_editions_from_data(self):
+        """load a batch of editions"""
+        author = models.Author.objects.create(name="Garth Nix")
+        work = models.Work.objects.create(title="Sabriel")
+        work.authors.add(author)
+        existing = models.Edition.objects.create(
+            title="Sabriel", parent_work=work, isbn_10="0060273224"
+        )
+        other_edition_data = {
+            **self.edition_data,
+            "key": "/books/OL1234M",
+            "isbn_10": [],
+            "isbn_13": ["9780060273231"],
+        }
+
+        with patch(
+            "bookwyrm.connectors.openlibrary.Connector.get_authors_from_data"
+        ) as mock:
+            mock.return_value = []
+            result = self.connector.create_editions_from_data(
+                work, [self.edition_data, other_edition_data, other_edition_data]
+            )
+
+        # the existing edition was filled in, and the duplicate wasn't created twice
+        self.assertEqual(result[0], existing)
+        self.assertEqual(result[1], result[2])
+        self.assertEqual(models.Edition.objects.count(), 2)
+        existing.refresh_from_db()
+        self.assertEqual(existing.pages, 491)
+
+        new_edition = result[1]
+        self.assertEqual(new_edition.parent_work, work)
+        self.assertEqual(new_edition.isbn_13, "9780060273231")
+        self.assertEqual(new_edition.connector.identifier, "openlibrary.org")
+        self.assertEqual(list(new_edition.authors.all()), [author])
+
     @responses.activate
     def test_create_edition_markdown_from_data(self):
         """okay but can it actually create an edition with proper metadata"""
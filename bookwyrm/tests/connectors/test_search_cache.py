@@ -0,0 +1,77 @@
+"""caching connector search results"""
+
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from bookwyrm import models
+from bookwyrm.book_search import SearchResult
+from bookwyrm.connectors import search_cache
+from bookwyrm.connectors.connector_manager import load_connector
+
+
+class SearchCache(TestCase):
+    """remembering what connectors found"""
+
+    @classmethod
+    def setUpTestData(cls):
+        """a connector to search"""
+        cls.connector_info = models.Connector.objects.create(
+            identifier="example.com",
+            connector_file="openlibrary",
+            base_url="https://example.com",
+            books_url="https://example.com",
+            covers_url="https://example.com/covers",
+            search_url="https://example.com/search?q=",
+        )
+
+    def setUp(self):
+        """load the connector"""
+        self.connector = load_connector(self.connector_info)
+        self.result = SearchResult(
+            title="Example Book",
+            key="https://example.com/book/1",
+            connector=self.connector,
+            author="Example Author",
+            confidence=0.5,
+        )
+
+    def test_normalize_query(self):
+        """case and spacing don't matter"""
+        self.assertEqual(
+            search_cache.normalize_query("  Example   BOOK "), "example book"
+        )
+        self.assertEqual(
+            search_cache.get_cache_key(self.connector, "example book", 0.1),
+            search_cache.get_cache_key(self.connector, "Example  Book", 0.1),
+        )
+        self.assertNotEqual(
+            search_cache.get_cache_key(self.connector, "example book", 0.1),
+            search_cache.get_cache_key(self.connector, "example book", 0.5),
+        )
+
+    def test_get_results(self):
+        """results come back as they went in"""
+        self.assertIsNone(search_cache.get_results(self.connector, "example", 0.1))
+
+        search_cache.set_results(self.connector, "example", 0.1, [self.result])
+        results, stale = search_cache.get_results(self.connector, "Example", 0.1)
+        self.assertFalse(stale)
+        self.assertEqual(results, [self.result])
+        self.assertIs(results[0].connector, self.connector)
+
+        self.assertEqual(
+            search_cache.get_stats(),
+            {"example.com": {"hit": 1, "stale": 0, "miss": 1}},
+        )
+
+    def test_get_results_stale(self):
+        """results are kept around after they stop being fresh"""
+        search_cache.set_results(self.connector, "example", 0.1, [self.result])
+        with patch.object(self.connector, "search_cache_timeout", -1):
+            results, stale = search_cache.get_results(self.connector, "example", 0.1)
+        self.assertTrue(stale)
+        self.assertEqual(results, [self.result])
+
+        self.assertTrue(search_cache.claim_refresh(self.connector, "example", 0.1))
+        self.assertFalse(search_cache.claim_refresh(self.connector, "example", 0.1))
@@ -3,15 +3,20 @@
 from collections import namedtuple
 import pathlib
 import io
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 import datetime
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 import responses
 
 from bookwyrm import models
+from bookwyrm.book_search import SearchResult
 from bookwyrm.importers import Importer
-from bookwyrm.models.import_job import start_import_task, import_item_task
+from bookwyrm.models.import_job import (
+    start_import_task,
+    import_batch_task,
+    import_item_task,
+)
 from bookwyrm.models.import_job import handle_imported_book
 
 
@@ -146,11 +151,66 @@ class GenericImporter(TestCase):
         )
 
         MockTask = namedtuple("Task", ("id"))
-        with patch("bookwyrm.models.import_job.import_item_task.delay") as mock:
+        with (
+            patch("bookwyrm.models.import_job.IMPORT_BATCH_SIZE", 3),
+            patch("bookwyrm.models.import_job.import_batch_task.delay") as mock,
+        ):
             mock.return_value = MockTask(123)
             start_import_task(import_job.id)
 
-        self.assertEqual(mock.call_count, 4)
+        self.assertEqual(mock.call_count, 2)
+        self.assertEqual(len(mock.call_args_list[0].args[1]), 3)
+        self.assertEqual(len(mock.call_args_list[1].args[1]), 1)
+        self.assertFalse(import_job.items.filter(task_id__isnull=True).exists())
+        import_job.refresh_from_db()
+        self.assertIsNotNone(import_job.started_date)
+
+    @responses.activate
+    def test_import_batch_task(self, *_):
+        """resolve a batch of entries at once"""
+        import_job = self.importer.create_job(
+            self.local_user, self.csv, False, "unlisted"
+        )
+        local_book = models.Edition.objects.create(
+            title="Gideon the Ninth",
+            isbn_13="9781250313195",
+            parent_work=self.book.parent_work,
+        )
+        connector = MagicMock()
+        connector.get_or_create_book.return_value = self.book
+        item_ids = list(import_job.items.values_list("id", flat=True))
+
+        with (
+            patch(
+                "bookwyrm.connectors.connector_manager.first_search_results"
+            ) as search,
+            patch("bookwyrm.models.activitypub_mixin.ActivitypubMixin.broadcast"),
+        ):
+            search.side_effect = [
+                {
+                    "9780062445315": SearchResult(
+                        title="Patisserie", key="patisserie", connector=connector
+                    )
+                },
+                {},
+            ]
+            import_batch_task(import_job.id, item_ids)
+
+        # the local isbn lookup didn't need a remote search
+        self.assertEqual(search.call_args_list[0].args[0], ["9780062445315"])
+        self.assertEqual(
+            set(search.call_args_list[1].args[0]),
+            {"Harrow the Ninth Tamsyn Muir", "Subcutanean Aaron Reed"},
+        )
+        items = import_job.items.order_by("index")
+        self.assertEqual(items[0].book.id, local_book.id)
+        self.assertEqual(items[1].fail_reason, "Could not find a match for book")
+        self.assertEqual(items[3].book.id, self.book.id)
+        self.assertEqual(
+            models.ShelfBook.objects.filter(user=self.local_user).count(), 2
+        )
+        import_job.refresh_from_db()
+        self.assertTrue(import_job.complete)
 
     @responses.activate
     def test_import_item_task(self, *_):
@@ -173,6 +233,45 @@ class GenericImporter(TestCase):
         self.assertEqual(kwargs["queue"], "import_triggered")
         import_item.refresh_from_db()
 
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_import_batch_task_remembered(self, *_):
+        """books found by one import don't need to be looked up by the next"""
+        connector = MagicMock()
+        connector.get_or_create_book.return_value = self.book
+        search_results = {
+            "9780062445315": SearchResult(
+                title="Patisserie", key="patisserie", connector=connector
+            )
+        }
+        with (
+            patch(
+                "bookwyrm.connectors.connector_manager.first_search_results"
+            ) as search,
+            patch("bookwyrm.models.activitypub_mixin.ActivitypubMixin.broadcast"),
+        ):
+            search.side_effect = lambda queries, **_: {
+                query: search_results[query]
+                for query in queries
+                if query in search_results
+            }
+            for _ in range(2):
+                self.csv.seek(0)
+                import_job = self.importer.create_job(
+                    self.local_user, self.csv, False, "unlisted"
+                )
+                import_batch_task(
+                    import_job.id, list(import_job.items.values_list("id", flat=True))
+                )
+
+        # searched for the isbns and title/authors by the first import only
+        self.assertEqual(search.call_count, 2)
+        self.assertEqual(connector.get_or_create_book.call_count, 1)
+        items = import_job.items.order_by("index")
+        self.assertEqual(items[3].book.id, self.book.id)
+        self.assertEqual(items[1].fail_reason, "Could not find a match for book")
+
     def test_complete_job(self, *_):
         """test notification"""
 
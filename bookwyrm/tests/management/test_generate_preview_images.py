@@ -0,0 +1,55 @@
+"""test generating preview images from the command line"""
+
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from bookwyrm import models
+
+
+@patch("bookwyrm.settings.ENABLE_PREVIEW_IMAGES", True)
+class GeneratePreviewImages(TestCase):
+    """render previews for everything"""
+
+    @classmethod
+    def setUpTestData(cls):
+        """we need some stuff"""
+        with (
+            patch("bookwyrm.suggested_users.rerank_suggestions_task.delay"),
+            patch("bookwyrm.activitystreams.populate_stream_task.delay"),
+            patch("bookwyrm.lists_stream.populate_lists_task.delay"),
+            patch("bookwyrm.preview_images.generate_user_preview_image_task.delay"),
+        ):
+            cls.local_user = models.User.objects.create_user(
+                "mouse", "mouse@mouse.mouse", "password", local=True, localname="mouse"
+            )
+        with patch("bookwyrm.preview_images.generate_edition_preview_image_task.delay"):
+            cls.work = models.Work.objects.create(title="Test Work")
+            cls.book = models.Edition.objects.create(
+                title="Example Edition", parent_work=cls.work
+            )
+
+    def test_generate_preview_images(self):
+        """the site, users, and books all get previews"""
+        output = StringIO()
+        call_command("generate_preview_images", all=True, workers=1, stdout=output)
+
+        self.local_user.refresh_from_db()
+        self.book.refresh_from_db()
+        self.assertTrue(self.local_user.preview_image)
+        self.assertTrue(self.book.preview_image)
+        self.assertTrue(models.SiteSettings.get().preview_image)
+        self.assertIn("0 failed", output.getvalue())
+        self.assertIn("images per second", output.getvalue())
+
+    def test_generate_preview_images_failure(self):
+        """one bad image doesn't stop the rest"""
+        output = StringIO()
+        with patch(
+            "bookwyrm.preview_images.generate_edition_preview_image",
+            side_effect=[ValueError(), None],
+        ):
+            call_command("generate_preview_images", all=True, workers=1, stdout=output)
+        self.assertIn("Book preview images (2):  OK 🖼 (1 failed", output.getvalue())
@@ -1,10 +1,14 @@
 """test populating user streams"""
 
 from unittest.mock import patch
+import fakeredis
 from django.test import TestCase
 
-from bookwyrm import models
-from bookwyrm.management.commands.populate_lists_streams import populate_lists_streams
+from bookwyrm import lists_stream, models
+from bookwyrm.management.commands.populate_lists_streams import (
+    bulk_populate_lists_streams,
+    populate_lists_streams,
+)
 
 
 @patch("bookwyrm.models.activitypub_mixin.broadcast_task.apply_async")
@@ -56,3 +60,24 @@ class Activitystreams(TestCase):
         with patch("bookwyrm.lists_stream.populate_lists_task.delay") as list_mock:
             populate_lists_streams()
         self.assertEqual(list_mock.call_count, 2)  # 2 users
+
+    def test_bulk_populate_lists_streams(self, *_):
+        """one pass over the lists fills everyone's streams"""
+        with patch("bookwyrm.lists_stream.add_list_task.delay"):
+            book_list = models.List.objects.create(user=self.local_user, name="hi")
+            private = models.List.objects.create(
+                user=self.local_user, name="private", privacy="direct"
+            )
+
+        with patch("bookwyrm.redis_store.r", fakeredis.FakeRedis()) as redis_mock:
+            bulk_populate_lists_streams()
+            stream = lists_stream.ListsStream()
+            self.assertEqual(
+                [int(i) for i in stream.get_store(stream.stream_id(self.local_user))],
+                [private.id, book_list.id],
+            )
+            self.assertEqual(
+                [int(i) for i in stream.get_store(stream.stream_id(self.another_user))],
+                [book_list.id],
+            )
+            self.assertEqual(redis_mock.keys("bulk-populate-*"), [])
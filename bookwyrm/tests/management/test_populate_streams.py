@@ -1,10 +1,14 @@
 """test populating user streams"""
 
 from unittest.mock import patch
+import fakeredis
 from django.test import TestCase
 
-from bookwyrm import models
-from bookwyrm.management.commands.populate_streams import populate_streams
+from bookwyrm import activitystreams, models
+from bookwyrm.management.commands.populate_streams import (
+    bulk_populate_streams,
+    populate_streams,
+)
 
 
 @patch("bookwyrm.models.activitypub_mixin.broadcast_task.apply_async")
@@ -63,3 +67,76 @@ class Activitystreams(TestCase):
             populate_streams()
         self.assertEqual(redis_mock.call_count, 6)  # 2 users x 3 streams
         self.assertEqual(list_mock.call_count, 2)  # 2 users
+
+    def test_bulk_populate_streams(self, _):
+        """one pass over the statuses fills everyone's streams"""
+        self.another_user.following.add(self.local_user)
+        with patch("bookwyrm.activitystreams.add_status_task.delay"):
+            status = models.Comment.objects.create(
+                user=self.local_user, content="hi", book=self.book
+            )
+            private = models.Status.objects.create(
+                user=self.local_user, content="hi", privacy="followers"
+            )
+            models.Status.objects.create(
+                user=self.remote_user, content="hi", privacy="direct"
+            )
+
+        with patch("bookwyrm.redis_store.r", fakeredis.FakeRedis()) as redis_mock:
+            bulk_populate_streams()
+            home = activitystreams.streams["home"]
+            local = activitystreams.streams["local"]
+            self.assertEqual(
+                [int(i) for i in home.get_store(home.stream_id(self.another_user.id))],
+                [private.id, status.id],
+            )
+            self.assertEqual(
+                [
+                    int(i)
+                    for i in local.get_store(local.stream_id(self.another_user.id))
+                ],
+                [status.id],
+            )
+            self.assertEqual(
+                [int(i) for i in home.get_store(home.stream_id(self.local_user.id))],
+                [private.id, status.id],
+            )
+            self.assertEqual(local.get_store(local.stream_id(self.local_user.id)), [])
+            # finished runs don't leave anything to resume
+            self.assertEqual(redis_mock.keys("bulk-populate-*"), [])
+
+    def test_bulk_populate_streams_resume(self, _):
+        """pick up where an interrupted run left off"""
+        with patch("bookwyrm.activitystreams.add_status_task.delay"):
+            statuses = [
+                models.Status.objects.create(user=self.local_user, content="hi")
+                for _ in range(3)
+            ]
+        home = activitystreams.streams["home"]
+        store = home.stream_id(self.local_user.id)
+
+        with patch("bookwyrm.redis_store.r", fakeredis.FakeRedis()):
+            # stop after the first chunk
+            populate = home.bulk_populate_stores(
+                models.Status.objects.filter(id__in=[s.id for s in statuses]),
+                lambda _: [store],
+                order_field="published_date",
+                cursor_key="test-cursor",
+                chunk_size=2,
+            )
+            self.assertEqual(next(populate)["objects"], 2)
+            self.assertEqual(len(home.get_store(store)), 2)
+
+            resumed = home.bulk_populate_stores(
+                models.Status.objects.filter(id__in=[s.id for s in statuses]),
+                lambda _: [store],
+                order_field="published_date",
+                cursor_key="test-cursor",
+                resume=True,
+                chunk_size=2,
+            )
+            self.assertEqual([step["objects"] for step in resumed], [1])
+            self.assertEqual(
+                [int(i) for i in home.get_store(store)],
+                [s.id for s in reversed(statuses)],
+            )
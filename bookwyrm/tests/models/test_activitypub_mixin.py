@@ -143,6 +143,19 @@ class ActivitypubMixins(TestCase):
         )
         self.assertEqual(result, matching_book)
 
+    def test_find_existing_prefers_isbn(self, *_):
+        """an isbn match is more trustworthy than other identifiers"""
+        models.Edition.objects.create(title="Test edition", openlibrary_key="OL1234")
+        isbn_book = models.Edition.objects.create(
+            title="Another test edition", isbn_13="9780300112511"
+        )
+
+        with self.assertNumQueries(1):
+            result = models.Edition.find_existing(
+                {"openlibraryKey": "OL1234", "isbn13": "9780300112511"}
+            )
+        self.assertEqual(result, isbn_book)
+
     def test_get_recipients_public_object(self, *_):
         """determines the recipients for an object's broadcast"""
         MockSelf = namedtuple("Self", ("privacy"))
@@ -452,12 +465,15 @@ class ActivitypubMixins(TestCase):
         self.assertEqual(page_2.orderedItems[-1]["content"], "<p>test status 0</p>")
 
     def test_broadcast_task(self, *_):
-        """Should be calling asyncio"""
+        """Should be delivering on the worker's event loop"""
         recipients = [
             "https://instance.example/user/inbox",
             "https://instance.example/okay/inbox",
         ]
-        with patch("bookwyrm.models.activitypub_mixin.asyncio.run") as mock:
+        with patch(
+            "bookwyrm.models.activitypub_mixin.broadcaster.run",
+            side_effect=lambda coroutine: coroutine.close(),
+        ) as mock:
             broadcast_task(self.local_user.id, {}, recipients)
         self.assertTrue(mock.called)
         self.assertEqual(mock.call_count, 1)
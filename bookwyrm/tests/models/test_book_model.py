@@ -55,6 +55,38 @@ class Book(TestCase):
         self.assertEqual(book.openlibrary_link, "https://openlibrary.org/books/OL123M")
         self.assertEqual(book.inventaire_link, "https://inventaire.io/entity/isbn:123")
 
+    def test_identifiers(self):
+        """every identifier is collected in one field"""
+        book = models.Edition.objects.create(
+            title="ExEd",
+            parent_work=self.work,
+            openlibrary_key="OL123M",
+            isbn_13="9780300112511",
+        )
+        book.refresh_from_db()
+        self.assertCountEqual(
+            book.identifiers,
+            [
+                f"remote_id:{book.remote_id}",
+                "openlibrary_key:OL123M",
+                "isbn_10:0300112513",
+                "isbn_13:9780300112511",
+            ],
+        )
+
+        # updates to either table are picked up, however they're made
+        models.Edition.objects.filter(id=book.id).update(
+            oclc_number="123", openlibrary_key=None
+        )
+        book.refresh_from_db()
+        self.assertIn("oclc_number:123", book.identifiers)
+        self.assertNotIn("openlibrary_key:OL123M", book.identifiers)
+
+        self.work.lccn = "2001012345"
+        self.work.save(broadcast=False)
+        self.work.refresh_from_db()
+        self.assertIn("lccn:2001012345", self.work.identifiers)
+
     def test_create_book_invalid(self):
         """you shouldn't be able to create Books (only editions and works)"""
         self.assertRaises(ValueError, models.Book.objects.create, title="Invalid Book")
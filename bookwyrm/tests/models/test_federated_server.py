@@ -1,9 +1,11 @@
 """testing models"""
 
+import time
 from unittest.mock import patch
 from django.test import TestCase
 
 from bookwyrm import models
+from bookwyrm.models.federated_server import blocked_servers
 
 
 class FederatedServer(TestCase):
@@ -66,3 +68,55 @@ class FederatedServer(TestCase):
         self.inactive_remote_user.refresh_from_db()
         self.assertFalse(self.inactive_remote_user.is_active)
         self.assertEqual(self.inactive_remote_user.deactivation_reason, "self_deletion")
+
+    def test_is_blocked(self):
+        """blocked servers and their subdomains"""
+        self.assertFalse(models.FederatedServer.is_blocked("https://test.server/user"))
+
+        self.server.block()
+        self.assertTrue(models.FederatedServer.is_blocked("https://test.server/user"))
+        self.assertTrue(models.FederatedServer.is_blocked("https://a.test.server/"))
+        self.assertTrue(models.FederatedServer.is_blocked("https://Test.Server/"))
+        self.assertFalse(models.FederatedServer.is_blocked("https://atest.server/"))
+        self.assertFalse(models.FederatedServer.is_blocked("https://server/"))
+        self.assertFalse(models.FederatedServer.is_blocked("not a url"))
+
+        self.server.unblock()
+        self.assertFalse(models.FederatedServer.is_blocked("https://test.server/user"))
+
+    def test_is_blocked_cached(self):
+        """the list is only loaded once, until it changes"""
+        self.server.block()
+        with self.assertNumQueries(1):
+            self.assertTrue(models.FederatedServer.is_blocked("https://test.server/"))
+            self.assertFalse(models.FederatedServer.is_blocked("https://other.server/"))
+
+        # a change made somewhere else, without signals, isn't seen
+        models.FederatedServer.objects.filter(id=self.server.id).update(
+            status="federated"
+        )
+        self.assertTrue(models.FederatedServer.is_blocked("https://test.server/"))
+
+        # until it's announced
+        blocked_servers.publish()
+        for _ in range(50):
+            if blocked_servers.hostnames is None:
+                break
+            time.sleep(0.1)
+        self.assertFalse(models.FederatedServer.is_blocked("https://test.server/"))
+
+    def test_is_blocked_publish(self):
+        """other processes hear about changes once they're committed"""
+        with (
+            patch.object(blocked_servers, "publish") as publish_mock,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            self.server.block()
+            self.assertFalse(publish_mock.called)
+        self.assertEqual(publish_mock.call_count, 1)
+
+        with patch.object(blocked_servers, "publish") as publish_mock:
+            self.server.application_type = "bookwyrm"
+            self.server.save(update_fields=["application_type"])
+            self.server.save(update_fields=["application_type"])
+        self.assertFalse(publish_mock.called)
@@ -4,9 +4,9 @@ import datetime
 from datetime import timezone
 import json
 import pathlib
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 import responses
 
 from bookwyrm import models, settings
@@ -48,6 +48,21 @@ class ImportJob(TestCase):
         )
         self.assertEqual(item.isbn, "9780356506999")
 
+    def test_items_per_second(self):
+        """how fast the import is going"""
+        self.assertEqual(self.job.items_per_second, 0)
+
+        for index in range(3):
+            models.ImportItem.objects.create(
+                index=index,
+                job=self.job,
+                data={},
+                normalized_data={},
+                fail_reason="nope" if index else None,
+            )
+        self.job.started_date = self.job.updated_date - datetime.timedelta(seconds=4)
+        self.assertEqual(self.job.items_per_second, 0.5)
+
     def test_construct_search_term(self):
         """formats queries"""
         title = "the book title"
@@ -224,3 +239,65 @@ class ImportJob(TestCase):
                 book = item.get_book_from_identifier()
 
         self.assertEqual(book.title, "Sabriel")
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_get_book_from_identifier_remembered(self):
+        """an identifier that's been looked up before isn't searched again"""
+        work = models.Work.objects.create(title="Test Work")
+        edition = models.Edition.objects.create(title="Sabriel", parent_work=work)
+        items = [
+            models.ImportItem.objects.create(
+                index=index,
+                job=self.job,
+                data={},
+                normalized_data={"isbn_13": isbn},
+            )
+            for (index, isbn) in enumerate(["9780356506999", "9780356506999", "123"])
+        ]
+
+        with patch(
+            "bookwyrm.connectors.connector_manager.first_search_result"
+        ) as search:
+            search.side_effect = [edition, None]
+            self.assertEqual(items[0].get_book_from_identifier(), edition)
+            self.assertEqual(items[1].get_book_from_identifier(), edition)
+            # nothing being found is remembered too
+            self.assertIsNone(items[2].get_book_from_identifier())
+            self.assertIsNone(items[2].get_book_from_identifier())
+        self.assertEqual(search.call_count, 2)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_get_book_from_title_author_remembered(self):
+        """a title and author that's been looked up before isn't searched again"""
+        work = models.Work.objects.create(title="Test Work")
+        edition = models.Edition.objects.create(title="Sabriel", parent_work=work)
+        connector = MagicMock()
+        connector.get_or_create_book.return_value = edition
+        item = models.ImportItem.objects.create(
+            index=1,
+            job=self.job,
+            data={},
+            normalized_data={"title": "Sabriel", "authors": "Garth Nix"},
+        )
+        other_job = models.ImportJob.objects.create(user=self.local_user, mappings={})
+        other_item = models.ImportItem.objects.create(
+            index=1,
+            job=other_job,
+            data={},
+            normalized_data={"title": "sabriel", "authors": "Garth  Nix"},
+        )
+
+        with patch(
+            "bookwyrm.connectors.connector_manager.first_search_result"
+        ) as search:
+            search.return_value = SearchResult(
+                title="Sabriel", key="sabriel", connector=connector, confidence=0.5
+            )
+            self.assertEqual(item.get_book_from_title_author(), (edition, 0.5))
+            self.assertEqual(other_item.get_book_from_title_author(), (edition, 0.5))
+        self.assertEqual(search.call_count, 1)
+        self.assertEqual(connector.get_or_create_book.call_count, 1)
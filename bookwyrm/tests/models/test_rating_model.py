@@ -0,0 +1,133 @@
+"""testing models"""
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from bookwyrm import models
+
+
+@patch("bookwyrm.models.Status.broadcast")
+@patch("bookwyrm.activitystreams.add_status_task.delay")
+@patch("bookwyrm.activitystreams.remove_status_task.delay")
+class WorkRating(TestCase):
+    """adding up the ratings of a work as they happen"""
+
+    @classmethod
+    def setUpTestData(cls):
+        """useful things for creating a review"""
+        with (
+            patch("bookwyrm.suggested_users.rerank_suggestions_task.delay"),
+            patch("bookwyrm.activitystreams.populate_stream_task.delay"),
+            patch("bookwyrm.lists_stream.populate_lists_task.delay"),
+        ):
+            cls.local_user = models.User.objects.create_user(
+                "mouse", "mouse@mouse.mouse", "mouseword", local=True, localname="mouse"
+            )
+        cls.work = models.Work.objects.create(title="Test Work")
+        cls.book = models.Edition.objects.create(
+            title="Test Edition", parent_work=cls.work
+        )
+        cls.other_book = models.Edition.objects.create(
+            title="Another Edition", parent_work=cls.work
+        )
+
+    def get_summary(self, work=None):
+        """the current ratings of the work"""
+        return models.WorkRating.objects.get(work=work or self.work)
+
+    def test_add_ratings(self, *_):
+        """ratings of any edition count towards the work"""
+        models.ReviewRating.objects.create(
+            user=self.local_user, book=self.book, rating=5
+        )
+        models.Review.objects.create(
+            user=self.local_user, book=self.other_book, rating=Decimal("3.5")
+        )
+
+        summary = self.get_summary()
+        self.assertEqual(summary.count, 2)
+        self.assertEqual(summary.total, Decimal("8.5"))
+        self.assertEqual(summary.average, Decimal("4.25"))
+        self.assertEqual(summary.histogram, [0, 0, 0, 0, 0, 0, 1, 0, 0, 1])
+
+    def test_review_without_rating(self, *_):
+        """a review with no stars doesn't change the rating"""
+        models.Review.objects.create(user=self.local_user, book=self.book)
+        models.Review.objects.create(user=self.local_user, book=self.book, rating=0)
+
+        self.assertFalse(models.WorkRating.objects.exists())
+        self.assertEqual(models.WorkRating.get_average(self.work.id), 0)
+
+    def test_change_rating(self, *_):
+        """editing the review replaces its old rating"""
+        review = models.Review.objects.create(
+            user=self.local_user, book=self.book, rating=2
+        )
+        review.rating = 4
+        review.save()
+
+        summary = self.get_summary()
+        self.assertEqual(summary.count, 1)
+        self.assertEqual(summary.total, 4)
+        self.assertEqual(summary.histogram, [0, 0, 0, 0, 0, 0, 0, 1, 0, 0])
+
+    def test_delete_rating(self, *_):
+        """deleted reviews aren't counted"""
+        review = models.ReviewRating.objects.create(
+            user=self.local_user, book=self.book, rating=2
+        )
+        models.ReviewRating.objects.create(
+            user=self.local_user, book=self.book, rating=4
+        )
+        review.delete()
+
+        summary = self.get_summary()
+        self.assertEqual(summary.count, 1)
+        self.assertEqual(summary.total, 4)
+        self.assertEqual(summary.histogram, [0, 0, 0, 0, 0, 0, 0, 1, 0, 0])
+
+    def test_remove_rating(self, *_):
+        """a review that's removed from the database altogether"""
+        review = models.ReviewRating.objects.create(
+            user=self.local_user, book=self.book, rating=2
+        )
+        models.ReviewRating.objects.filter(id=review.id).delete()
+
+        summary = self.get_summary()
+        self.assertEqual(summary.count, 0)
+        self.assertEqual(summary.total, 0)
+        self.assertEqual(summary.histogram, [0] * 10)
+
+    def test_move_edition(self, *_):
+        """an edition's ratings go with it to another work"""
+        models.ReviewRating.objects.create(
+            user=self.local_user, book=self.book, rating=2
+        )
+        models.ReviewRating.objects.create(
+            user=self.local_user, book=self.other_book, rating=4
+        )
+        new_work = models.Work.objects.create(title="New Work")
+
+        self.book.parent_work = new_work
+        self.book.save()
+
+        self.assertEqual(self.get_summary().count, 1)
+        self.assertEqual(self.get_summary().total, 4)
+        self.assertEqual(self.get_summary(new_work).count, 1)
+        self.assertEqual(self.get_summary(new_work).total, 2)
+
+    def test_recalculate(self, *_):
+        """start over from the reviews"""
+        models.ReviewRating.objects.create(
+            user=self.local_user, book=self.book, rating=2
+        )
+        models.WorkRating.objects.all().delete()
+
+        models.WorkRating.recalculate(self.work.id)
+
+        summary = self.get_summary()
+        self.assertEqual(summary.count, 1)
+        self.assertEqual(summary.total, 2)
+        self.assertEqual(summary.histogram, [0, 0, 0, 1, 0, 0, 0, 0, 0, 0])
@@ -8,6 +8,7 @@ from django.test import TestCase
 from django.utils import timezone
 
 from bookwyrm import models, settings
+from bookwyrm.models.site import site_settings_cache
 
 
 class SiteModels(TestCase):
@@ -46,6 +47,56 @@ class SiteModels(TestCase):
         self.assertEqual(result.name, "Fish Town")
         self.assertEqual(models.SiteSettings.objects.all().count(), 1)
 
+    def test_site_settings_cached(self):
+        """settings are loaded once, until they change"""
+        with self.captureOnCommitCallbacks(execute=True):
+            models.SiteSettings.objects.create(id=1, name="Fish Town")
+        with self.assertNumQueries(1):
+            site = models.SiteSettings.get()
+            self.assertEqual(models.SiteSettings.get().name, "Fish Town")
+        # each caller has its own copy
+        site.name = "Cat Town"
+        self.assertEqual(models.SiteSettings.get().name, "Fish Town")
+
+        # a change in another process bumps the version
+        models.SiteSettings.objects.update(name="Cat Town")
+        self.assertEqual(models.SiteSettings.get().name, "Fish Town")
+        site_settings_cache.publish()
+        self.assertEqual(models.SiteSettings.get().name, "Cat Town")
+
+    def test_site_settings_saved(self):
+        """a change is seen straight away, but not cached until committed"""
+        with self.captureOnCommitCallbacks(execute=True):
+            site = models.SiteSettings.objects.create(id=1, name="Fish Town")
+        models.SiteSettings.get()
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            site.name = "Cat Town"
+            site.save()
+            with self.assertNumQueries(2):
+                self.assertEqual(models.SiteSettings.get().name, "Cat Town")
+                self.assertEqual(models.SiteSettings.get().name, "Cat Town")
+
+        for callback in callbacks:
+            callback()
+        with self.assertNumQueries(1):
+            self.assertEqual(models.SiteSettings.get().name, "Cat Town")
+            self.assertEqual(models.SiteSettings.get().name, "Cat Town")
+
+    def test_site_settings_request_memo(self):
+        """within a request, not even the version is checked twice"""
+        with self.captureOnCommitCallbacks(execute=True):
+            models.SiteSettings.objects.create(id=1, name="Fish Town")
+        with (
+            site_settings_cache.request_memo(),
+            patch("bookwyrm.models.site.r") as redis_mock,
+        ):
+            redis_mock.get.return_value = b"1"
+            with self.assertNumQueries(1):
+                self.assertEqual(models.SiteSettings.get().name, "Fish Town")
+                self.assertEqual(models.SiteSettings.get().name, "Fish Town")
+        self.assertEqual(redis_mock.get.call_count, 1)
+
     def test_site_invite(self):
         """default invite"""
         invite = models.SiteInvite.objects.create(
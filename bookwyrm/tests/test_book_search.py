@@ -2,12 +2,15 @@
 
 import datetime
 from datetime import timezone
+import time
 
 from django.db import connection
 from django.test import TestCase
+import pgtrigger
 
 from bookwyrm import book_search, models
 from bookwyrm.connectors.abstract_connector import AbstractMinimalConnector
+from bookwyrm.settings import SEARCH_TIMEOUT
 
 
 class BookSearch(TestCase):
@@ -102,12 +105,44 @@ class BookSearch(TestCase):
         result = book_search.search_identifiers("hello", return_first=True)
         self.assertEqual(result, self.second_edition)
 
+    def test_search_identifiers_one_query(self):
+        """all the identifier fields are searched at once"""
+        with self.assertNumQueries(1):
+            self.assertFalse(book_search.search_identifiers("nothing"))
+
+    def test_search_identifiers_in_bulk(self):
+        """look up a batch of identifiers in one query"""
+        with self.assertNumQueries(1):
+            results = book_search.search_identifiers_in_bulk(
+                ["0000000000", "hello", "22222222x", "nothing"]
+            )
+        self.assertEqual(
+            results,
+            {
+                "0000000000": self.first_edition,
+                "hello": self.second_edition,
+                "22222222x": self.third_edition,
+            },
+        )
+
     def test_search_title_author(self):
         """search by unique identifiers"""
         results = book_search.search_title_author("annoying", min_confidence=0)
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0], self.third_edition)
 
+    def test_search_title_author_misspelled_title(self):
+        """typos in a title still find the book"""
+        results = book_search.search_title_author("Exmaple Editon", min_confidence=0)
+        self.assertEqual(results, [self.first_edition])
+
+    def test_search_title_author_misspelled_author(self):
+        """typos in an author's name still find their books"""
+        result = book_search.search_title_author(
+            "Athor Two", min_confidence=0.1, return_first=True
+        )
+        self.assertIn(result, [self.second_edition, self.third_edition])
+
     def test_search_title_author_return_first(self):
         """sorts by edition rank"""
         result = book_search.search_title_author(
@@ -120,6 +155,17 @@ class BookSearch(TestCase):
         results = book_search.search_title_author("Edition", 0)
         self.assertEqual(results, [self.first_edition])  # highest edition rank
 
+    def test_search_title_author_one_query(self):
+        """picking an edition of each work doesn't take a query per work"""
+        other_work = models.Work.objects.create(title="Other Work")
+        other_edition = models.Edition.objects.create(
+            title="Other Edition", parent_work=other_work
+        )
+        with self.assertNumQueries(1):
+            results = book_search.search_title_author("Edition", 0)
+        self.assertEqual(len(results), 2)
+        self.assertIn(other_edition, results)
+
     def test_format_search_result(self):
         """format a search result"""
         result = book_search.format_search_result(self.first_edition)
@@ -169,6 +215,72 @@ class BookSearch(TestCase):
         self.assertEqual(result.title, "Title")
 
 
+class SearchTitleAuthorBenchmark(TestCase):
+    """title and author search against a large catalog"""
+
+    works = 20000
+    editions = 100000
+
+    @classmethod
+    def setUpTestData(cls):
+        """a lot of editions, all of which match the search"""
+        # filling in identifiers one row at a time would slow this down a lot,
+        # and they aren't what's being searched
+        with (
+            pgtrigger.ignore(
+                "bookwyrm.Edition:reset_book_identifiers_on_edition_edit",
+                "bookwyrm.Work:reset_book_identifiers_on_work_edit",
+            ),
+            connection.cursor() as cursor,
+        ):
+            cursor.execute(
+                """
+                WITH new_books AS (
+                    INSERT INTO bookwyrm_book
+                        (created_date, updated_date, title, languages)
+                    SELECT now(), now(), 'Benchmark Work ' || n, '{}'
+                    FROM generate_series(1, %s) AS n
+                    RETURNING id
+                )
+                INSERT INTO bookwyrm_work (book_ptr_id) SELECT id FROM new_books;
+
+                WITH new_books AS (
+                    INSERT INTO bookwyrm_book
+                        (created_date, updated_date, title, languages)
+                    SELECT now(), now(), 'Benchmark Edition ' || n, '{}'
+                    FROM generate_series(1, %s) AS n
+                    RETURNING id
+                ), numbered_books AS (
+                    SELECT id, row_number() OVER (ORDER BY id) AS n FROM new_books
+                ), numbered_works AS (
+                    SELECT book_ptr_id, row_number() OVER (ORDER BY book_ptr_id) AS n
+                    FROM bookwyrm_work
+                )
+                INSERT INTO bookwyrm_edition
+                    (book_ptr_id, parent_work_id, publishers, edition_rank)
+                SELECT numbered_books.id, numbered_works.book_ptr_id, '{}',
+                    numbered_books.n %% 7
+                FROM numbered_books JOIN numbered_works
+                ON numbered_works.n = numbered_books.n %% %s + 1;
+
+                ANALYZE bookwyrm_book, bookwyrm_work, bookwyrm_edition;
+                """,
+                [cls.works, cls.editions, cls.works],
+            )
+
+    def test_search_title_author(self):
+        """one query, however many editions match"""
+        start = time.monotonic()
+        with self.assertNumQueries(1):
+            results = book_search.search_title_author("Benchmark", 0)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(len(results), 30)
+        self.assertEqual(len({result.parent_work_id for result in results}), 30)
+        self.assertTrue(all(result.edition_rank == 6 for result in results))
+        self.assertLess(elapsed, SEARCH_TIMEOUT)
+
+
 class SearchVectorTest(TestCase):
     """check search_vector is computed correctly"""
 
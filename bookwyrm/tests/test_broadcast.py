@@ -0,0 +1,143 @@
+"""delivering activities to remote inboxes"""
+
+import asyncio
+from collections import namedtuple
+from unittest.mock import AsyncMock, patch
+
+from django.test import SimpleTestCase
+
+from bookwyrm import broadcast
+from bookwyrm.signatures import create_key_pair
+
+KeyPair = namedtuple("KeyPair", ("private_key", "public_key"))
+Sender = namedtuple("Sender", ("remote_id", "key_pair"))
+
+
+class FakeResponse:
+    """just enough of an aiohttp response"""
+
+    def __init__(self, status):
+        self.status = status
+        self.ok = status < 400
+        self.reason = "reason"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        return False
+
+
+class FakeSession:
+    """responds to each inbox with a list of statuses, in order"""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.posts = []
+
+    def post(self, destination, data=None, headers=None):
+        """record the request and pick a response"""
+        self.posts.append((destination, headers))
+        return FakeResponse(self.statuses[destination].pop(0))
+
+
+@patch("bookwyrm.broadcast.asyncio.sleep", new_callable=AsyncMock)
+class Broadcast(SimpleTestCase):
+    """sending activities to other servers"""
+
+    @classmethod
+    def setUpClass(cls):
+        """a sender with a key"""
+        super().setUpClass()
+        cls.sender = Sender(
+            "https://example.com/user/mouse", KeyPair(*create_key_pair())
+        )
+
+    def deliver(self, statuses):
+        """send an activity, returning the requests that were made"""
+        session = FakeSession(statuses)
+        with patch.object(broadcast.broadcaster, "get_session", return_value=session):
+            asyncio.run(broadcast.deliver(list(statuses), self.sender, "{}"))
+        return session.posts
+
+    def test_deliver(self, sleep):
+        """everyone gets the activity once"""
+        posts = self.deliver(
+            {
+                "https://one.example/inbox": [202],
+                "https://two.example/inbox": [200],
+            }
+        )
+        self.assertEqual(
+            [destination for (destination, _) in posts],
+            ["https://one.example/inbox", "https://two.example/inbox"],
+        )
+        headers = posts[0][1]
+        self.assertEqual(headers["Digest"], posts[1][1]["Digest"])
+        self.assertIn(
+            'keyId="https://example.com/user/mouse/#main-key"', headers["Signature"]
+        )
+        self.assertFalse(sleep.called)
+
+    def test_deliver_legacy_key(self, sleep):
+        """a rejected signature is tried once more with the legacy key id"""
+        posts = self.deliver({"https://one.example/inbox": [401, 401]})
+        self.assertEqual(len(posts), 2)
+        self.assertIn(
+            'keyId="https://example.com/user/mouse#main-key"', posts[1][1]["Signature"]
+        )
+        self.assertEqual(sleep.call_count, 1)
+
+    def test_deliver_retry(self, sleep):
+        """servers that are struggling get a few more tries, with a backoff"""
+        posts = self.deliver(
+            {
+                "https://one.example/inbox": [503, 429, 200],
+                "https://two.example/inbox": [404],
+            }
+        )
+        self.assertEqual(len(posts), 4)
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [1, 2])
+
+    def test_deliver_give_up(self, sleep):
+        """eventually"""
+        posts = self.deliver({"https://one.example/inbox": [503] * 10})
+        self.assertEqual(len(posts), broadcast.BROADCAST_MAX_RETRIES + 1)
+
+    def test_deliver_retry_queue_size(self, _):
+        """only so many failed deliveries are held on to"""
+        with patch("bookwyrm.broadcast.BROADCAST_RETRY_QUEUE_SIZE", 1):
+            posts = self.deliver(
+                {
+                    "https://one.example/inbox": [503, 200],
+                    "https://two.example/inbox": [503, 200],
+                }
+            )
+        self.assertEqual(len(posts), 3)
+
+    def test_signatures_reused(self, _):
+        """the same inbox path on the same host has the same signature"""
+        activity = broadcast.SignedActivity(self.sender, "{}")
+        with (
+            patch("bookwyrm.broadcast.http_date", return_value="now"),
+            patch(
+                "bookwyrm.broadcast.make_signature", return_value="signed"
+            ) as signature_mock,
+        ):
+            activity.get_headers("https://one.example/inbox")
+            activity.get_headers("https://one.example/inbox?page=1")
+            activity.get_headers("https://one.example/inbox", use_legacy_key=True)
+            activity.get_headers("https://two.example/inbox")
+        self.assertEqual(signature_mock.call_count, 3)
+
+    def test_broadcaster_session(self, _):
+        """one session for everything the worker sends"""
+        broadcaster = broadcast.Broadcaster()
+
+        async def get_session():
+            return broadcaster.get_session()
+
+        session = broadcaster.run(get_session())
+        self.assertIs(broadcaster.run(get_session()), session)
+        self.assertEqual(session.connector.limit_per_host, 4)
+        broadcaster.close()
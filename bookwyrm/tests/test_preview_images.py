@@ -145,6 +145,29 @@ class PreviewImages(TestCase):
         self.assertEqual(self.edition.preview_image.width, settings.PREVIEW_IMG_WIDTH)
         self.assertEqual(self.edition.preview_image.height, settings.PREVIEW_IMG_HEIGHT)
 
+    def test_edition_preview_unchanged(self, *args, **kwargs):
+        """don't redraw a preview that would look the same"""
+        generate_edition_preview_image_task(self.edition.id)
+        self.edition.refresh_from_db()
+        self.assertIsNotNone(self.edition.preview_image_fingerprint)
+
+        with patch("bookwyrm.preview_images.generate_preview_image") as generate_mock:
+            generate_edition_preview_image_task(self.edition.id)
+        self.assertFalse(generate_mock.called)
+
+    def test_edition_preview_changed(self, *args, **kwargs):
+        """a new title means a new preview"""
+        generate_edition_preview_image_task(self.edition.id)
+        self.edition.refresh_from_db()
+        fingerprint = self.edition.preview_image_fingerprint
+
+        self.edition.title = "Another Title"
+        self.edition.save(broadcast=False)
+        generate_edition_preview_image_task(self.edition.id)
+
+        self.edition.refresh_from_db()
+        self.assertNotEqual(self.edition.preview_image_fingerprint, fingerprint)
+
     def test_user_preview(self, *args, **kwargs):
         """generate user preview"""
         generate_user_preview_image_task(self.local_user.id)
@@ -17,7 +17,12 @@ from django.utils.http import http_date
 from bookwyrm import models
 from bookwyrm.activitypub import Follow, parse
 from bookwyrm.settings import DOMAIN, NETLOC
-from bookwyrm.signatures import create_key_pair, make_signature, make_digest
+from bookwyrm.signatures import (
+    create_key_pair,
+    import_key,
+    make_signature,
+    make_digest,
+)
 
 
 def get_follow_activity(follower, followee):
@@ -104,6 +109,13 @@ class Signature(TestCase):
             response = self.send_test_request(sender=self.mouse)
         self.assertEqual(response.status_code, 200)
 
+    def test_import_key(self):
+        """parsed keys are cached, but only for the same key"""
+        key = import_key(self.mouse.key_pair.private_key)
+        self.assertIs(import_key(self.mouse.key_pair.private_key), key)
+        self.assertIsNot(import_key(self.cat.key_pair.private_key), key)
+        self.assertEqual(import_key(self.mouse.key_pair.public_key), key.public_key())
+
     def test_wrong_signature(self):
         """Messages must be signed by the right actor.
         (cat cannot sign messages on behalf of mouse)"""
@@ -0,0 +1,127 @@
+"""testing the follow and block sets"""
+
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from bookwyrm import models
+from bookwyrm.social_graph import social_graph
+
+
+@patch("bookwyrm.activitystreams.add_user_statuses_task.delay")
+@patch("bookwyrm.activitystreams.remove_user_statuses_task.delay")
+@patch("bookwyrm.lists_stream.add_user_lists_task.delay")
+@patch("bookwyrm.lists_stream.remove_user_lists_task.delay")
+@patch("bookwyrm.suggested_users.rerank_user_task.delay")
+@patch("bookwyrm.suggested_users.remove_suggestion_task.delay")
+@patch("bookwyrm.suggested_users.remove_user_task.delay")
+@patch("bookwyrm.models.activitypub_mixin.broadcast_task.apply_async")
+class SocialGraph(TestCase):
+    """who follows and blocks whom"""
+
+    @classmethod
+    def setUpTestData(cls):
+        """we need some users"""
+        with (
+            patch("bookwyrm.suggested_users.rerank_suggestions_task.delay"),
+            patch("bookwyrm.activitystreams.populate_stream_task.delay"),
+            patch("bookwyrm.lists_stream.populate_lists_task.delay"),
+        ):
+            cls.local_user = models.User.objects.create_user(
+                "mouse", "mouse@mouse.mouse", "password", local=True, localname="mouse"
+            )
+            cls.another_user = models.User.objects.create_user(
+                "nutria",
+                "nutria@nutria.nutria",
+                "password",
+                local=True,
+                localname="nutria",
+            )
+        with patch("bookwyrm.models.user.set_remote_server.delay"):
+            cls.remote_user = models.User.objects.create_user(
+                "rat",
+                "rat@rat.com",
+                "ratword",
+                local=False,
+                remote_id="https://example.com/users/rat",
+                inbox="https://example.com/users/rat/inbox",
+                outbox="https://example.com/users/rat/outbox",
+            )
+        cls.work = models.Work.objects.create(title="test work")
+
+    def test_get_local_users(self, *_):
+        """loaded from the database, then kept up to date"""
+        self.assertEqual(
+            social_graph.get_local_users(), {self.local_user.id, self.another_user.id}
+        )
+
+        self.another_user.is_active = False
+        self.another_user.save(broadcast=False, update_fields=["is_active"])
+        self.assertEqual(social_graph.get_local_users(), {self.local_user.id})
+
+    def test_get_followers(self, *_):
+        """only local followers are stored"""
+        self.assertEqual(social_graph.get_followers(self.remote_user.id), set())
+
+        models.UserFollows.objects.create(
+            user_subject=self.local_user, user_object=self.remote_user
+        )
+        models.UserFollows.objects.create(
+            user_subject=self.remote_user, user_object=self.local_user
+        )
+        self.assertEqual(
+            social_graph.get_followers(self.remote_user.id), {self.local_user.id}
+        )
+        self.assertEqual(social_graph.get_followers(self.local_user.id), set())
+
+        models.UserFollows.objects.get(
+            user_subject=self.local_user, user_object=self.remote_user
+        ).delete()
+        self.assertEqual(social_graph.get_followers(self.remote_user.id), set())
+
+    def test_get_followers_m2m(self, *_):
+        """follows added through the relation don't send save signals"""
+        self.assertEqual(social_graph.get_followers(self.another_user.id), set())
+        self.local_user.following.add(self.another_user)
+        self.assertEqual(
+            social_graph.get_followers(self.another_user.id), {self.local_user.id}
+        )
+        self.local_user.following.clear()
+        self.assertEqual(social_graph.get_followers(self.another_user.id), set())
+
+    def test_get_blocks(self, *_):
+        """blocks go both ways"""
+        self.assertEqual(social_graph.get_blocks(self.local_user.id), set())
+        self.assertEqual(social_graph.get_blocks(self.remote_user.id), set())
+
+        block = models.UserBlocks.objects.create(
+            user_subject=self.local_user, user_object=self.remote_user
+        )
+        self.assertEqual(
+            social_graph.get_blocks(self.local_user.id), {self.remote_user.id}
+        )
+        self.assertEqual(
+            social_graph.get_blocks(self.remote_user.id), {self.local_user.id}
+        )
+
+        block.delete()
+        self.assertEqual(social_graph.get_blocks(self.local_user.id), set())
+        self.assertEqual(social_graph.get_blocks(self.remote_user.id), set())
+
+    def test_get_work_blocks(self, *_):
+        """users blocking works"""
+        other_work = models.Work.objects.create(title="other work")
+        self.assertEqual(social_graph.get_work_blocks([self.work.id]), set())
+
+        self.local_user.blocked_books.add(self.work)
+        self.another_user.blocked_books.add(other_work)
+        self.assertEqual(
+            social_graph.get_work_blocks([self.work.id]), {self.local_user.id}
+        )
+        self.assertEqual(
+            social_graph.get_work_blocks([self.work.id, other_work.id]),
+            {self.local_user.id, self.another_user.id},
+        )
+
+        self.local_user.blocked_books.remove(self.work)
+        self.assertEqual(social_graph.get_work_blocks([self.work.id]), set())
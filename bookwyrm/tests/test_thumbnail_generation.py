@@ -0,0 +1,83 @@
+"""test generating cover thumbnails"""
+
+from io import StringIO
+import pathlib
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+import pytest
+
+from bookwyrm import models
+from bookwyrm.settings import ENABLE_THUMBNAIL_GENERATION
+from bookwyrm.thumbnail_generation import (
+    generate_thumbnails,
+    get_thumbnail_files,
+)
+
+
+@pytest.mark.skipif(
+    not ENABLE_THUMBNAIL_GENERATION,
+    reason="Thumbnail generation disabled in settings",
+)
+class ThumbnailGeneration(TestCase):
+    """making every size of a cover at once"""
+
+    def setUp(self):
+        """a book with a cover"""
+        image_path = pathlib.Path(__file__).parent.joinpath(
+            "../static/images/default_avi.jpg"
+        )
+        self.book = models.Edition.objects.create(title="hello")
+        with (
+            patch("bookwyrm.thumbnail_generation.generate_thumbnails_task.delay"),
+            open(image_path, "rb") as image_file,
+        ):
+            self.book.cover.save("test.jpg", image_file)
+        for file in get_thumbnail_files(self.book):
+            if file.storage.exists(file.name):
+                file.storage.delete(file.name)
+
+    def test_generate_thumbnails(self):
+        """all the sizes and formats are made"""
+        self.assertEqual(generate_thumbnails(self.book), 12)
+
+        for file in get_thumbnail_files(self.book):
+            self.assertTrue(file.storage.exists(file.name))
+            self.assertTrue(file.cachefile_backend.exists(file))
+
+    def test_generate_thumbnails_existing(self):
+        """thumbnails that are already there are left alone"""
+        generate_thumbnails(self.book)
+
+        self.assertEqual(generate_thumbnails(self.book), 0)
+        self.assertEqual(generate_thumbnails(self.book, force=True), 12)
+
+    def test_generate_thumbnails_no_cover(self):
+        """nothing to make thumbnails of"""
+        book = models.Edition.objects.create(title="coverless")
+        self.assertEqual(generate_thumbnails(book), 0)
+
+    def test_new_cover_queues_task(self):
+        """saving a cover queues up its thumbnails"""
+        image_path = pathlib.Path(__file__).parent.joinpath(
+            "../static/images/no_cover.jpg"
+        )
+        with (
+            patch(
+                "bookwyrm.thumbnail_generation.generate_thumbnails_task.delay"
+            ) as mock,
+            self.captureOnCommitCallbacks(execute=True),
+            open(image_path, "rb") as image_file,
+        ):
+            self.book.cover.save("new.jpg", image_file)
+        mock.assert_called_once_with(self.book.id)
+
+    def test_generate_thumbnails_command(self):
+        """make thumbnails for every book"""
+        output = StringIO()
+        call_command("generate_thumbnails", workers=1, stdout=output)
+
+        self.assertIn("1 covers, 12 thumbnails made, 0 failed", output.getvalue())
+        for file in get_thumbnail_files(self.book):
+            self.assertTrue(file.storage.exists(file.name))
@@ -4,9 +4,10 @@ import json
 import pathlib
 from unittest.mock import patch
 
+import fakeredis
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponseNotAllowed, HttpResponseNotFound
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.test.client import RequestFactory
 
 from bookwyrm import models, views
@@ -129,6 +130,105 @@ class Inbox(TestCase):
                 )
         self.assertEqual(result.status_code, 200)
 
+    @patch("bookwyrm.settings.INBOX_DEFERRED_VERIFICATION", True)
+    @patch("bookwyrm.views.inbox.process_inbox_queue_task.apply_async")
+    def test_inbox_deferred(self, task_mock):
+        """only the basics are checked before the activity is queued"""
+        redis_mock = fakeredis.FakeRedis()
+        with (
+            patch("bookwyrm.views.inbox.r", redis_mock),
+            patch("bookwyrm.views.inbox.has_valid_signature") as mock_valid,
+        ):
+            result = self.client.post(
+                "/inbox", json.dumps(self.create_json), content_type="application/json"
+            )
+            self.assertEqual(result.status_code, 202)
+            result = self.client.post(
+                "/user/mouse/inbox",
+                json.dumps(self.create_json),
+                content_type="application/json",
+            )
+            self.assertEqual(result.status_code, 202)
+
+            result = self.client.post(
+                "/inbox",
+                '{"type": "Fish", "object": "exists"}',
+                content_type="application/json",
+            )
+            self.assertIsInstance(result, HttpResponseNotFound)
+        self.assertFalse(mock_valid.called)
+        self.assertEqual(redis_mock.xlen(views.inbox.INBOX_QUEUE), 2)
+        # one worker is enough to drain the queue
+        self.assertEqual(task_mock.call_count, 1)
+
+    def test_process_inbox_queue_task(self):
+        """queued activities are checked, and keys are looked up once per actor"""
+        redis_mock = fakeredis.FakeRedis()
+        follow = {
+            "id": "https://example.com/users/rat/follows/1",
+            "type": "Follow",
+            "actor": self.remote_user.remote_id,
+            "object": "https://example.com/user/mouse",
+        }
+        with (
+            patch("bookwyrm.views.inbox.r", redis_mock),
+            patch("bookwyrm.views.inbox.process_inbox_queue_task.apply_async"),
+        ):
+            for username in [None, "mouse", "nobody"]:
+                request = self.factory.post(
+                    "/inbox", json.dumps(follow), content_type="application/json"
+                )
+                views.inbox.queue_activity(request, username)
+
+            with (
+                patch("bookwyrm.views.inbox.get_actor_key") as key_mock,
+                patch("bookwyrm.views.inbox.has_valid_signature") as mock_valid,
+                patch(
+                    "bookwyrm.views.inbox.sometimes_async_activity_task"
+                ) as handle_mock,
+            ):
+                key_mock.return_value = {"public_key": "key"}
+                mock_valid.side_effect = [True, False]
+                views.inbox.process_inbox_queue_task()
+
+        self.assertEqual(key_mock.call_count, 1)
+        # the inbox of a user who doesn't exist
+        self.assertEqual(mock_valid.call_count, 2)
+        self.assertEqual(mock_valid.call_args.kwargs["actor_key"]["public_key"], "key")
+        # a bad signature
+        self.assertEqual(handle_mock.call_count, 1)
+        self.assertEqual(handle_mock.call_args.args[0], follow)
+        self.assertEqual(redis_mock.xlen(views.inbox.INBOX_QUEUE), 0)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_get_actor_key(self):
+        """keys are cached, and so are actors that can't be found"""
+        self.remote_user.key_pair = models.KeyPair(
+            public_key="key", remote_id=f"{self.remote_user.remote_id}#main-key"
+        )
+        with patch("bookwyrm.activitypub.resolve_remote_id") as resolve_mock:
+            resolve_mock.return_value = self.remote_user
+            actor_key = views.inbox.get_actor_key(self.remote_user.remote_id)
+            self.assertEqual(
+                views.inbox.get_actor_key(self.remote_user.remote_id), actor_key
+            )
+            self.assertEqual(resolve_mock.call_count, 1)
+            self.assertEqual(actor_key["public_key"], "key")
+
+            resolve_mock.return_value = None
+            self.assertIsNone(views.inbox.get_actor_key("https://example.com/gone"))
+            self.assertIsNone(views.inbox.get_actor_key("https://example.com/gone"))
+            self.assertEqual(resolve_mock.call_count, 2)
+
+            # a refresh always goes back to the source
+            self.assertIsNone(
+                views.inbox.get_actor_key(self.remote_user.remote_id, refresh=True)
+            )
+            self.assertEqual(resolve_mock.call_count, 3)
+            self.assertIsNone(views.inbox.get_actor_key(self.remote_user.remote_id))
+
     def test_is_blocked_user_agent(self):
         """check for blocked servers"""
         request = self.factory.post(
@@ -8,12 +8,12 @@ from django.template.response import TemplateResponse
 from django.test import TestCase
 from django.test.client import RequestFactory
 
-from bookwyrm import forms, models, views
+from bookwyrm import activitystreams, forms, models, views
 from bookwyrm.activitypub import ActivitypubResponse
 from bookwyrm.tests.validate_html import validate_html
 
 
-@patch("bookwyrm.activitystreams.ActivityStream.get_activity_stream")
+@patch("bookwyrm.activitystreams.ActivityStream.get_activity_page")
 @patch("bookwyrm.activitystreams.add_status_task.delay")
 @patch("bookwyrm.suggested_users.rerank_suggestions_task.delay")
 @patch("bookwyrm.activitystreams.populate_stream_task.delay")
@@ -65,6 +65,25 @@ class FeedViews(TestCase):
         validate_html(result.render())
         self.assertEqual(result.status_code, 200)
 
+    @patch("bookwyrm.suggested_users.SuggestedUsers.get_suggestions")
+    def test_feed_older_page(self, *_):
+        """a page further down the feed links to the next one"""
+        view = views.Feed.as_view()
+        request = self.factory.get("", {"before": "1643328000.0_5"})
+        request.user = self.local_user
+        page = activitystreams.StreamPage(
+            object_list=[], cursor="1643328000.0_5", next_cursor="1643320000.0_3"
+        )
+        with patch(
+            "bookwyrm.activitystreams.ActivityStream.get_activity_page",
+            return_value=page,
+        ) as page_mock:
+            result = view(request, "home")
+        self.assertEqual(page_mock.call_args.kwargs["before"], "1643328000.0_5")
+        html = result.render()
+        validate_html(html)
+        self.assertIn(b"?before=1643320000.0_3", html.content)
+
     @patch("bookwyrm.suggested_users.SuggestedUsers.get_suggestions")
     def test_save_feed_settings(self, *_):
         """update display preferences"""
@@ -10,6 +10,8 @@ import responses
 
 from bookwyrm import models, views
 from bookwyrm.settings import USER_AGENT, BASE_URL
+from bookwyrm.templatetags import interaction, rating_tags, shelf_tags
+from bookwyrm.utils import cache
 
 
 @patch("bookwyrm.activitystreams.add_status_task.delay")
@@ -323,3 +325,46 @@ class ViewsHelpers(TestCase):
         )
         result = views.helpers.redirect_to_referer(request)
         self.assertEqual(result.url, f"{BASE_URL}/and/a/path?sort=hello")
+
+    def test_prefetch_interactions(self, *_):
+        """the templates don't need to query for each status"""
+        with patch("bookwyrm.models.activitypub_mixin.broadcast_task.apply_async"):
+            status = models.Review.objects.create(
+                user=self.remote_user, book=self.book, rating=4
+            )
+            boosted = models.Comment.objects.create(
+                user=self.remote_user, book=self.book, content="hi"
+            )
+            boost = models.Boost.objects.create(
+                user=self.remote_user, boosted_status=boosted
+            )
+            models.Favorite.objects.create(user=self.local_user, status=status)
+            models.ShelfBook.objects.create(
+                user=self.local_user, shelf=self.shelf, book=self.book
+            )
+            models.Review.objects.create(user=self.local_user, book=self.book, rating=2)
+
+        with cache.request_cache():
+            views.helpers.prefetch_interactions(
+                self.local_user, [status, boost], users=[self.remote_user]
+            )
+            with self.assertNumQueries(0):
+                self.assertTrue(interaction.get_user_liked(self.local_user, status))
+                self.assertFalse(interaction.get_user_liked(self.local_user, boosted))
+                self.assertFalse(interaction.get_user_boosted(self.local_user, boosted))
+                self.assertTrue(shelf_tags.get_is_book_on_shelf(self.book, self.shelf))
+                self.assertFalse(
+                    shelf_tags.latest_read_through(self.book, self.local_user)
+                )
+                self.assertEqual(
+                    rating_tags.get_user_rating(self.book, self.local_user), 2
+                )
+                self.assertEqual(rating_tags.get_rating(self.book, self.local_user), 3)
+
+    def test_prefetch_interactions_no_request_cache(self, *_):
+        """nothing to remember the values in"""
+        with patch("bookwyrm.models.activitypub_mixin.broadcast_task.apply_async"):
+            status = models.Review.objects.create(user=self.remote_user, book=self.book)
+
+        with self.assertNumQueries(0):
+            views.helpers.prefetch_interactions(self.local_user, [status])
@@ -89,7 +89,9 @@ class Views(TestCase):
         )
         mock_result = SearchResult(title="Mock Book", connector=connector, key="hello")
 
-        request = self.factory.get("", {"q": "Test Book", "remote": True})
+        request = self.factory.get(
+            "", {"q": "Test Book", "remote": True, "stream": "false"}
+        )
         request.user = self.local_user
         with patch("bookwyrm.views.search.is_api_request") as is_api:
             is_api.return_value = False
@@ -108,6 +110,60 @@ class Views(TestCase):
         connector_results = response.context_data["remote_results"]
         self.assertEqual(connector_results[0]["results"][0].title, "Mock Book")
 
+    def test_search_books_stream(self):
+        """the page loads remote results after it's been sent"""
+        view = views.Search.as_view()
+        request = self.factory.get("", {"q": "Test Book", "remote": True})
+        request.user = self.local_user
+        with patch("bookwyrm.views.search.is_api_request") as is_api:
+            is_api.return_value = False
+            with patch("bookwyrm.connectors.connector_manager.search") as remote_search:
+                response = view(request)
+
+        self.assertFalse(remote_search.called)
+        html = response.render()
+        validate_html(html)
+        self.assertTrue(response.context_data["remote_stream"])
+        self.assertIn(b"data-search-stream", html.content)
+
+    def test_remote_book_search(self):
+        """local results, then each connector's as they arrive"""
+        models.Connector.objects.create(
+            identifier="example.com",
+            connector_file="openlibrary",
+            base_url="https://example.com",
+            books_url="https://example.com/books",
+            covers_url="https://example.com/covers",
+            search_url="https://example.com/search?q=",
+        )
+        request = self.factory.get("", {"q": "Test Book"})
+        request.user = self.local_user
+
+        def iter_search_results(query, connectors, min_confidence):
+            """pretend to search"""
+            for connector in connectors:
+                yield {
+                    "connector": connector,
+                    "results": [
+                        SearchResult(title="Mock Book", connector=connector, key="hi")
+                    ],
+                }
+
+        with patch(
+            "bookwyrm.connectors.connector_manager.iter_search_results",
+            side_effect=iter_search_results,
+        ):
+            response = views.remote_book_search(request)
+            lines = b"".join(response.streaming_content).decode("utf-8").splitlines()
+
+        self.assertEqual(len(lines), 2)
+        local, remote = [json.loads(line) for line in lines]
+        self.assertIsNone(local["connector"])
+        self.assertEqual(local["results"][0]["title"], "Test Book")
+        self.assertEqual(remote["connector"]["identifier"], "example.com")
+        self.assertEqual(remote["results"][0]["title"], "Mock Book")
+        self.assertIn("Mock Book", remote["html"])
+
     def test_search_books_extra_whitespace(self):
         """just the search page"""
         view = views.Search.as_view()
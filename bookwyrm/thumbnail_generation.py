@@ -1,15 +1,29 @@
 """thumbnail generation strategy for django-imagekit"""
 
+from django.core.files.base import ContentFile
+from imagekit.cachefiles.backends import CacheFileState
+from imagekit.utils import process_image
+from PIL import Image
+
+from bookwyrm import models, settings
+from bookwyrm.tasks import app, IMAGES
+
+THUMBNAIL_SIZES = ["xsmall", "small", "medium", "large", "xlarge", "xxlarge"]
+THUMBNAIL_FORMATS = ["webp", "jpg"]
+# the biggest thumbnail fits in a square this size, so the cover doesn't need to
+# be decoded at more than that
+LARGEST_THUMBNAIL = 500
+
 
 class Strategy:
     """
-    A strategy that generates the image on source saved (Optimistic),
-    but also on demand, for old images (JustInTime).
+    A strategy that leaves generating images from a new source to
+    generate_thumbnails_task, but generates them on demand for old images
+    that don't have them yet (JustInTime).
     """
 
     def on_source_saved(self, file):
         """What happens on source saved"""
-        file.generate()
 
     def on_existence_required(self, file):
         """What happens on existence required"""
@@ -18,3 +32,55 @@ class Strategy:
     def on_content_required(self, file):
         """What happens on content required"""
         file.generate()
+
+
+def get_thumbnail_files(book):
+    """the cache file for each size and format of a book's cover"""
+    return [
+        getattr(book, f"cover_bw_book_{size}_{image_format}")
+        for size in THUMBNAIL_SIZES
+        for image_format in THUMBNAIL_FORMATS
+    ]
+
+
+def generate_thumbnails(book, force=False):
+    """make every thumbnail of a book's cover that doesn't exist yet, from one
+    decoded copy of the cover rather than reading it again for each one"""
+    if not book.cover:
+        return 0
+
+    files = get_thumbnail_files(book)
+    if not force:
+        files = [file for file in files if not file.cachefile_backend.exists(file)]
+    if not files:
+        return 0
+
+    with book.cover.open() as cover:
+        with Image.open(cover) as image:
+            # jpegs can be decoded at a fraction of their size
+            image.draft(None, (LARGEST_THUMBNAIL, LARGEST_THUMBNAIL))
+            image.load()
+
+    for file in files:
+        spec = file.generator
+        content = process_image(
+            image.copy(),
+            processors=spec.processors,
+            format=spec.format,
+            autoconvert=spec.autoconvert,
+            options=spec.options,
+        )
+        if force and file.storage.exists(file.name):
+            file.storage.delete(file.name)
+        file.storage.save(file.name, ContentFile(content.read()))
+        file.cachefile_backend.set_state(file, CacheFileState.EXISTS)
+    return len(files)
+
+
+@app.task(queue=IMAGES)
+def generate_thumbnails_task(book_id):
+    """make the thumbnails for a book's new cover"""
+    if not settings.ENABLE_THUMBNAIL_GENERATION:
+        return
+
+    generate_thumbnails(models.Book.objects.get(id=book_id))
@@ -527,6 +527,7 @@ urlpatterns = [
     # search
     re_path(r"^search.json/?$", views.Search.as_view(), name="search"),
     re_path(r"^search/?$", views.Search.as_view(), name="search"),
+    re_path(r"^search/remote/?$", views.remote_book_search, name="search-remote"),
     # imports
     re_path(r"^import/?$", views.Import.as_view(), name="import"),
     re_path(r"^user-import/?$", views.UserImport.as_view(), name="user-import"),
@@ -1,9 +1,27 @@
 """Custom handler for caching"""
 
-from typing import Any, Callable, Tuple, Union
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional, Tuple, Union
 
 from django.core.cache import cache
 
+# values that have already been looked up (or loaded ahead of time) while
+# handling the current request
+request_memo: ContextVar[Optional[dict[str, Any]]] = ContextVar(
+    "request_memo", default=None
+)
+
+
+@contextmanager
+def request_cache() -> Iterator[None]:
+    """keep hold of the values that are looked up for the length of a request"""
+    token = request_memo.set({})
+    try:
+        yield
+    finally:
+        request_memo.reset(token)
+
 
 def get_or_set(
     cache_key: str,
@@ -12,8 +30,55 @@ def get_or_set(
     timeout: Union[float, None] = None,
 ) -> Any:
     """Django's built-in get_or_set isn't cutting it"""
+    memo = request_memo.get()
+    if memo is not None and cache_key in memo:
+        return memo[cache_key]
+
     value = cache.get(cache_key)
     if value is None:
         value = function(*args)
         cache.set(cache_key, value, timeout=timeout)
+    if memo is not None:
+        memo[cache_key] = value
     return value
+
+
+def get_or_set_many(
+    items: dict[str, Any],
+    function: Callable[[dict[str, Any]], dict[str, Any]],
+    timeout: Union[float, None] = None,
+) -> None:
+    """get_or_set for a lot of keys at once, with one trip to the cache and one
+    call to load whatever's missing from it. The function gets the items that
+    weren't cached, by cache key, and returns their values. This only makes
+    sense within a request, when the values are remembered for get_or_set"""
+    memo = request_memo.get()
+    if memo is None:
+        return
+    items = {key: item for (key, item) in items.items() if key not in memo}
+    if not items:
+        return
+
+    values = cache.get_many(items.keys())
+    if missing := {k: item for (k, item) in items.items() if values.get(k) is None}:
+        loaded = function(missing)
+        cache.set_many(loaded, timeout=timeout)
+        values.update(loaded)
+    memo.update(values)
+
+
+def get_or_memoize(cache_key: str, function: Callable[..., Any], *args: Any) -> Any:
+    """a value that isn't cached, but may have been loaded already during this
+    request"""
+    memo = request_memo.get()
+    if memo is None:
+        return function(*args)
+    if cache_key not in memo:
+        memo[cache_key] = function(*args)
+    return memo[cache_key]
+
+
+def memoize_many(values: dict[str, Any]) -> None:
+    """values that have been loaded ahead of time for get_or_memoize"""
+    if (memo := request_memo.get()) is not None:
+        memo.update(values)
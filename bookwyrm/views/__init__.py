@@ -195,7 +195,7 @@ from .rss_feed import (
     RssQuotesOnlyFeed,
     RssCommentsOnlyFeed,
 )
-from .search import Search
+from .search import Search, remote_book_search
 from .setup import InstanceConfig, CreateAdmin
 from .status import CreateStatus, EditStatus, DeleteStatus, update_progress
 from .status import edit_readthrough
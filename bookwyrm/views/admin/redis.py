@@ -7,6 +7,7 @@ from django.views import View
 import redis
 
 from bookwyrm import models, settings
+from bookwyrm.connectors import search_cache
 
 r = redis.from_url(settings.REDIS_ACTIVITY_URL)
 
@@ -57,6 +58,7 @@ def view_data():
     data = {"errors": [], "prefix": settings.CACHE_KEY_PREFIX}
     try:
         data["info"] = r.info()
+        data["search_cache_stats"] = search_cache.get_stats()
     except Exception as err:
         data["errors"].append(err)
     return data
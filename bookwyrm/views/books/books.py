@@ -2,7 +2,7 @@
 
 from django.contrib.auth.decorators import login_required, permission_required
 from django.core.paginator import Paginator
-from django.db.models import Avg, Q, Count
+from django.db.models import Q, Count
 from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.template.response import TemplateResponse
@@ -107,7 +107,7 @@ class Book(View):
                 if not user_statuses
                 else None
             ),
-            "rating": reviews.aggregate(Avg("rating"))["rating__avg"],
+            "rating": models.WorkRating.get_average(book.parent_work_id),
             "lists": lists,
             "update_error": kwargs.get("update_error", False),
             "suggestion_query": request.GET.get("suggestion_query", ""),
@@ -1,6 +1,7 @@
 """non-interactive pages"""
 
 from datetime import date
+from functools import partial
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db.models import Prefetch, Q, prefetch_related_objects
@@ -18,6 +19,7 @@ from bookwyrm.activitypub import ActivitypubResponse
 from bookwyrm.settings import PAGE_LENGTH, STREAMS
 from bookwyrm.suggested_users import suggested_users
 from .helpers import filter_stream_by_status_type, get_user_from_username
+from .helpers import prefetch_interactions
 from .helpers import is_api_request, is_bookwyrm_request, maybe_redirect_local_path
 from .annual_summary import get_annual_summary_year
 
@@ -41,14 +43,14 @@ class Feed(View):
         tab = [s for s in STREAMS if s["key"] == tab]
         tab = tab[0] if tab else STREAMS[0]
 
-        activities = activitystreams.streams[tab["key"]].get_activity_stream(
-            request.user
+        page = activitystreams.streams[tab["key"]].get_activity_page(
+            request.user,
+            before=request.GET.get("before"),
+            status_filter=partial(
+                filter_stream_by_status_type,
+                allowed_types=request.user.feed_status_types,
+            ),
         )
-        filtered_activities = filter_stream_by_status_type(
-            activities,
-            allowed_types=request.user.feed_status_types,
-        )
-        paginated = Paginator(filtered_activities, PAGE_LENGTH)
 
         suggestions = suggested_users.get_suggestions(request.user)
 
@@ -65,12 +67,12 @@ class Feed(View):
             else []
         )
 
-        page = paginated.get_page(request.GET.get("page"))
         # prefetch on the objects, not the queryset, so the cache lands directly on status.book.
         prefetch_related_objects(
             [status.book for status in page if getattr(status, "book", None)],
             Prefetch("authors", queryset=models.Author.objects.order_by("id")),
         )
+        prefetch_interactions(request.user, page, users=suggestions)
 
         data = {
             **feed_page_data(request.user),
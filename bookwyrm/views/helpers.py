@@ -12,7 +12,7 @@ from urllib.parse import urlsplit, urlunsplit
 import mistune
 
 from requests import HTTPError
-from django.db.models import Q, QuerySet
+from django.db.models import F, Q, QuerySet
 from django.conf import settings as django_settings
 from django.shortcuts import redirect, _get_queryset
 from django.http import Http404, HttpRequest, HttpResponse
@@ -22,7 +22,7 @@ from bookwyrm import activitypub, models, settings
 from bookwyrm.connectors import ConnectorException, get_data
 from bookwyrm.models.base_model import BookWyrmModel
 from bookwyrm.status import create_generated_note
-from bookwyrm.utils import regex, sanitizer
+from bookwyrm.utils import cache, regex, sanitizer
 from bookwyrm.utils.validate import validate_url_domain
 
 
@@ -280,3 +280,163 @@ def convert_to_markdown(content: str) -> str:
     content = mistune.html(content).rstrip()
     # sanitize resulting html
     return sanitizer.clean(content)
+
+
+def prefetch_interactions(viewer, statuses, users=()):
+    """look up how the viewer has interacted with everything on a page (what
+    they've liked, boosted, shelved, and rated, and who they follow) all at
+    once, rather than the templates doing it for each status"""
+    # there's nowhere to keep the values outside of a request
+    if not viewer.is_authenticated or cache.request_memo.get() is None:
+        return
+
+    statuses = list(statuses)
+    # a boost shows the status that was boosted
+    boosted_ids = [s.boosted_status_id for s in statuses if isinstance(s, models.Boost)]
+    statuses = [s for s in statuses if not isinstance(s, models.Boost)]
+    if boosted_ids:
+        statuses += (
+            models.Status.objects.select_subclasses()
+            .select_related("comment__book", "review__book", "quotation__book")
+            .filter(id__in=boosted_ids)
+        )
+    books = [s.book for s in statuses if getattr(s, "book", None)]
+
+    def load_favorites(missing):
+        favorites = set(
+            models.Favorite.objects.filter(
+                user=viewer, status__in=missing.values()
+            ).values_list("status_id", flat=True)
+        )
+        return {key: status.id in favorites for (key, status) in missing.items()}
+
+    def load_boosts(missing):
+        boosts = set(
+            models.Boost.objects.filter(
+                user=viewer, boosted_status__in=missing.values()
+            ).values_list("boosted_status_id", flat=True)
+        )
+        return {key: status.id in boosts for (key, status) in missing.items()}
+
+    def load_relationships(missing):
+        user_ids = [user.id for user in missing.values()]
+        blocked = set(
+            viewer.blocks.filter(id__in=user_ids).values_list("id", flat=True)
+        )
+        following = set(
+            viewer.following.filter(id__in=user_ids).values_list("id", flat=True)
+        )
+        requested = set(
+            models.UserFollowRequest.objects.filter(
+                user_subject=viewer, user_object__in=user_ids
+            ).values_list("user_object_id", flat=True)
+        )
+        return {
+            key: {
+                "is_following": user.id in following and user.id not in blocked,
+                "is_follow_pending": user.id in requested
+                and user.id not in blocked | following,
+                "is_blocked": user.id in blocked,
+            }
+            for (key, user) in missing.items()
+        }
+
+    def load_active_shelves(missing):
+        shelf_books = {}
+        for shelf_book in models.ShelfBook.objects.filter(
+            shelf__user=viewer,
+            book__parent_work__in=[book.parent_work_id for book in missing.values()],
+        ).annotate(work_id=F("book__parent_work")):
+            shelf_books.setdefault(shelf_book.work_id, shelf_book)
+        return {
+            key: shelf_books.get(book.parent_work_id) or False
+            for (key, book) in missing.items()
+        }
+
+    def load_shelved(missing):
+        shelved = set(
+            models.ShelfBook.objects.filter(
+                shelf__in=[shelf for (_, shelf) in missing.values()],
+                book__in=[book for (book, _) in missing.values()],
+            ).values_list("book_id", "shelf_id")
+        )
+        return {
+            key: (book.id, shelf.id) in shelved
+            for (key, (book, shelf)) in missing.items()
+        }
+
+    def load_read_throughs(missing):
+        read_throughs = {}
+        for read_through in models.ReadThrough.objects.filter(
+            user=viewer, book__in=missing.values(), is_active=True
+        ).order_by("-start_date"):
+            read_throughs.setdefault(read_through.book_id, read_through)
+        return {
+            key: read_throughs.get(book.id) or False for (key, book) in missing.items()
+        }
+
+    cache.get_or_set_many(
+        {f"fav-{viewer.id}-{status.id}": status for status in statuses},
+        load_favorites,
+        timeout=259200,
+    )
+    cache.get_or_set_many(
+        {f"boost-{viewer.id}-{status.id}": status for status in statuses},
+        load_boosts,
+        timeout=259200,
+    )
+    cache.get_or_set_many(
+        {f"cached-relationship-{viewer.id}-{user.id}": user for user in users},
+        load_relationships,
+        timeout=60 * 60,
+    )
+    cache.get_or_set_many(
+        {
+            f"active_shelf-{viewer.id}-{book.id}": book
+            for book in books
+            if book.parent_work_id
+        },
+        load_active_shelves,
+        timeout=60 * 60,
+    )
+    shelves = list(viewer.shelf_set.all())
+    cache.get_or_set_many(
+        {
+            f"book-on-shelf-{book.id}-{shelf.id}": (book, shelf)
+            for book in books
+            for shelf in shelves
+        },
+        load_shelved,
+        timeout=60 * 60,
+    )
+    cache.get_or_set_many(
+        {f"latest_read_through-{viewer.id}-{book.id}": book for book in books},
+        load_read_throughs,
+        timeout=60 * 60,
+    )
+
+    ratings = {
+        summary.work_id: summary.average
+        for summary in models.WorkRating.objects.filter(
+            work__in=[book.parent_work_id for book in books]
+        )
+    }
+    cache.memoize_many(
+        {
+            f"book-rating-{book.parent_work_id}": ratings.get(book.parent_work_id, 0)
+            for book in books
+            if book.parent_work_id
+        }
+    )
+
+    user_ratings = {}
+    for review in models.Review.objects.filter(
+        user=viewer, book__in=books, rating__isnull=False, deleted=False
+    ).order_by("-published_date"):
+        user_ratings.setdefault(review.book_id, review.rating)
+    cache.memoize_many(
+        {
+            f"user-rating-{viewer.id}-{book.id}": user_ratings.get(book.id, 0)
+            for book in books
+        }
+    )
@@ -50,6 +50,7 @@ class ImportStatus(View):
             "item_count": item_count,
             "complete_count": item_count - pending_item_count,
             "percent": job.percent_complete,
+            "items_per_second": job.items_per_second,
             # hours since last import item update
             "inactive_time": (job.updated_date - timezone.now()).seconds / 60 / 60,
             "legacy": not job.mappings,
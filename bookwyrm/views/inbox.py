@@ -3,24 +3,42 @@
 import json
 import re
 import logging
+from typing import Any, Optional
+from uuid import uuid4
 
+import redis
 import requests
 
+from django.core.cache import cache
 from django.http import HttpResponse, HttpResponseForbidden, Http404
 from django.core.exceptions import BadRequest, PermissionDenied
 from django.shortcuts import get_object_or_404
+from django.utils.datastructures import CaseInsensitiveMapping
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
-from bookwyrm import activitypub, models
+from bookwyrm import activitypub, models, settings
 from bookwyrm.decorators import require_federation
+from bookwyrm.redis_store import r
 from bookwyrm.tasks import app, INBOX
 from bookwyrm.signatures import Signature
 from bookwyrm.utils import regex
 
 logger = logging.getLogger(__name__)
 
+# how long to trust a remote actor's key without checking it again
+ACTOR_KEY_TIMEOUT = 60 * 60 * 24
+# how long to wait before trying again to load an actor we couldn't find
+UNKNOWN_ACTOR_TIMEOUT = 60 * 5
+
+# activities waiting to be verified, when that happens outside the request
+INBOX_QUEUE = "inbox-queue"
+INBOX_QUEUE_GROUP = "inbox-workers"
+INBOX_QUEUE_SCHEDULED = "inbox-queue-scheduled"
+# how long a worker can hold on to queued activities before another takes them
+INBOX_QUEUE_CLAIM_TIMEOUT = 60 * 1000
+
 
 class UserIsGoneError(Exception):
     """error class for when a user is banned or deleted"""
@@ -33,6 +51,12 @@ class Inbox(View):
 
     def post(self, request, username=None):
         """only works as POST request"""
+        if settings.INBOX_DEFERRED_VERIFICATION:
+            # anything that needs the database or a remote server happens later
+            raise_is_unknown_activity(load_activity_json(request))
+            queue_activity(request, username)
+            return HttpResponse(status=202)
+
         # first check if this server is on our shitlist
         raise_is_blocked_user_agent(request)
 
@@ -40,11 +64,8 @@ class Inbox(View):
         if username:
             get_object_or_404(models.User, localname=username, is_active=True)
 
-        # is it valid json? does it at least vaguely resemble an activity?
-        try:
-            activity_json = json.loads(request.body)
-        except json.decoder.JSONDecodeError:
-            raise BadRequest()
+        # is it valid json?
+        activity_json = load_activity_json(request)
 
         try:
             # let's be extra sure we didn't block this domain
@@ -53,12 +74,8 @@ class Inbox(View):
             # banned or deleted users are not allowed to send us Activities
             return HttpResponseForbidden()
 
-        if (
-            "object" not in activity_json
-            or "type" not in activity_json
-            or activity_json["type"] not in activitypub.activity_objects
-        ):
-            raise Http404()
+        # does it at least vaguely resemble an activity?
+        raise_is_unknown_activity(activity_json)
 
         # verify the signature
         if not has_valid_signature(request, activity_json):
@@ -73,6 +90,25 @@ class Inbox(View):
         return HttpResponse()
 
 
+def load_activity_json(request):
+    """is it valid json?"""
+    try:
+        return json.loads(request.body)
+    except json.decoder.JSONDecodeError:
+        raise BadRequest()
+
+
+def raise_is_unknown_activity(activity_json):
+    """does it at least vaguely resemble an activity?"""
+    if (
+        not isinstance(activity_json, dict)
+        or "object" not in activity_json
+        or "type" not in activity_json
+        or activity_json["type"] not in activitypub.activity_objects
+    ):
+        raise Http404()
+
+
 def raise_is_blocked_user_agent(request):
     """check if a request is from a blocked server based on user agent"""
     # check user agent
@@ -132,32 +168,164 @@ def activity_task(activity_json):
     activity.action()
 
 
-def has_valid_signature(request, activity):
+class QueuedRequest:
+    """what's kept of an inbox request while it waits in the queue: enough to
+    check the signature"""
+
+    def __init__(self, path, headers, body):
+        self.path = path
+        self.headers = CaseInsensitiveMapping(headers)
+        self.body = body
+
+
+def queue_activity(request, username=None):
+    """accept an activity now and check it later"""
+    r.xadd(
+        INBOX_QUEUE,
+        {
+            "path": request.path,
+            "username": username or "",
+            "headers": json.dumps(dict(request.headers)),
+            "body": request.body,
+        },
+        maxlen=settings.INBOX_QUEUE_MAX_LENGTH,
+        approximate=True,
+    )
+    # a worker that's already draining the queue will get to this, but if
+    # there isn't one, start one
+    if r.set(INBOX_QUEUE_SCHEDULED, 1, nx=True, ex=60):
+        process_inbox_queue_task.apply_async()
+
+
+@app.task(queue=INBOX)
+def process_inbox_queue_task():
+    """verify and handle queued activities, a batch at a time, until there
+    aren't any left. Several of these can run at once, each taking its own"""
+    r.delete(INBOX_QUEUE_SCHEDULED)
+    try:
+        r.xgroup_create(INBOX_QUEUE, INBOX_QUEUE_GROUP, id="0", mkstream=True)
+    except redis.exceptions.ResponseError:
+        pass  # it already exists
+    consumer = str(uuid4())
+
+    while True:
+        # first pick up anything that another worker took and didn't finish
+        entries = r.xautoclaim(
+            INBOX_QUEUE,
+            INBOX_QUEUE_GROUP,
+            consumer,
+            min_idle_time=INBOX_QUEUE_CLAIM_TIMEOUT,
+            count=settings.INBOX_QUEUE_BATCH_SIZE,
+        )[1]
+        if not entries:
+            streams = r.xreadgroup(
+                INBOX_QUEUE_GROUP,
+                consumer,
+                {INBOX_QUEUE: ">"},
+                count=settings.INBOX_QUEUE_BATCH_SIZE,
+            )
+            entries = streams[0][1] if streams else []
+        if not entries:
+            return
+
+        handle_queued_activities([fields for (_, fields) in entries if fields])
+
+        entry_ids = [entry_id for (entry_id, _) in entries]
+        r.xack(INBOX_QUEUE, INBOX_QUEUE_GROUP, *entry_ids)
+        r.xdel(INBOX_QUEUE, *entry_ids)
+
+
+def handle_queued_activities(entries):
+    """the checks that the inbox skipped, then on to the usual handling.
+    An actor often sends a lot at once, so keys are only looked up once per
+    actor per batch"""
+    actor_keys = {}
+    for fields in entries:
+        try:
+            request = QueuedRequest(
+                fields[b"path"].decode("utf-8"),
+                json.loads(fields[b"headers"]),
+                fields[b"body"],
+            )
+            activity_json = json.loads(request.body)
+            username = fields[b"username"].decode("utf-8")
+            if (
+                username
+                and not models.User.objects.filter(
+                    localname=username, is_active=True
+                ).exists()
+            ):
+                continue
+
+            raise_is_blocked_user_agent(request)
+            raise_is_blocked_activity(activity_json)
+
+            actor = activity_json.get("actor")
+            if actor not in actor_keys:
+                actor_keys[actor] = get_actor_key(actor)
+            if not actor_keys[actor] or not has_valid_signature(
+                request, activity_json, actor_key=actor_keys[actor]
+            ):
+                continue
+
+            sometimes_async_activity_task(activity_json)
+        except (PermissionDenied, UserIsGoneError):
+            continue
+        except Exception:
+            # one bad activity shouldn't hold up the rest of the queue
+            logger.exception("Unable to handle queued activity")
+
+
+def has_valid_signature(request, activity, actor_key=None):
     """verify incoming signature"""
     try:
         signature = Signature.parse(request)
-        remote_user = activitypub.resolve_remote_id(
-            activity.get("actor"), model=models.User, save=False
-        )  # don't save the actor unless we actually need to import them
-        if not remote_user:
+        actor = activity.get("actor")
+        actor_key = actor_key or get_actor_key(actor)
+        if not actor_key:
             return False
 
-        if signature.key_id != remote_user.key_pair.remote_id:
-            if (
-                signature.key_id != f"{remote_user.remote_id}#main-key"
-            ):  # legacy Bookwyrm
-                raise ValueError("Wrong actor created signature.")
+        if signature.key_id not in [
+            actor_key["key_id"],
+            f"{actor_key['remote_id']}#main-key",  # legacy Bookwyrm
+        ]:
+            raise ValueError("Wrong actor created signature.")
 
         try:
-            signature.verify(remote_user.key_pair.public_key, request)
+            signature.verify(actor_key["public_key"], request)
         except ValueError:
-            old_key = remote_user.key_pair.public_key
-            remote_user = activitypub.resolve_remote_id(
-                remote_user.remote_id, model=models.User, refresh=True
-            )
-            if remote_user.key_pair.public_key == old_key:
+            old_key = actor_key["public_key"]
+            actor_key = get_actor_key(actor, refresh=True)
+            if not actor_key or actor_key["public_key"] == old_key:
                 raise  # Key unchanged.
-            signature.verify(remote_user.key_pair.public_key, request)
+            signature.verify(actor_key["public_key"], request)
     except (ValueError, requests.exceptions.HTTPError):
         return False
     return True
+
+
+def get_actor_key(actor: str, refresh: bool = False) -> Optional[dict[str, Any]]:
+    """the public key of the actor sending an activity. Keys are cached, so that
+    an activity from an actor we've already seen doesn't need a database query,
+    and one from an actor we couldn't load doesn't try (and fail) again"""
+    cache_key = f"actor-key-{actor}"
+    if not refresh and (actor_key := cache.get(cache_key)) is not None:
+        # an empty dict means the actor couldn't be found
+        return actor_key or None
+
+    # don't save the actor unless we actually need to import them
+    remote_user = activitypub.resolve_remote_id(
+        actor, model=models.User, refresh=refresh, save=refresh
+    )
+
+    if not remote_user:
+        cache.set(cache_key, {}, UNKNOWN_ACTOR_TIMEOUT)
+        return None
+
+    actor_key = {
+        "remote_id": remote_user.remote_id,
+        "key_id": remote_user.key_pair.remote_id,
+        "public_key": remote_user.key_pair.public_key,
+    }
+    cache.set(cache_key, actor_key, ACTOR_KEY_TIMEOUT)
+    return actor_key
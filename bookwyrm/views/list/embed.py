@@ -1,8 +1,8 @@
 """book list views"""
 
 from django.core.paginator import Paginator
-from django.db.models import Avg, DecimalField
-from django.db.models.functions import Coalesce
+from django.db.models import DecimalField, F
+from django.db.models.functions import Coalesce, NullIf
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.template.response import TemplateResponse
@@ -48,8 +48,10 @@ class EmbedList(View):
         )
         if sort_by == "rating":
             items = items.annotate(
-                average_rating=Avg(
-                    Coalesce("edition__review__rating", 0.0),
+                average_rating=Coalesce(
+                    F("edition__parent_work__rating_summary__total")
+                    / NullIf("edition__parent_work__rating_summary__count", 0),
+                    0.0,
                     output_field=DecimalField(),
                 )
             )
@@ -6,8 +6,8 @@ from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Avg, DecimalField, Q, Max
-from django.db.models.functions import Coalesce
+from django.db.models import DecimalField, F, Q, Max
+from django.db.models.functions import Coalesce, NullIf
 from django.http import HttpResponseBadRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.template.response import TemplateResponse
@@ -168,8 +168,10 @@ def sort_list(request, items):
 
     if sort_by == "rating":
         items = items.annotate(
-            average_rating=Avg(
-                Coalesce("edition__review__rating", 0.0),
+            average_rating=Coalesce(
+                F("edition__parent_work__rating_summary__total")
+                / NullIf("edition__parent_work__rating_summary__count", 0),
+                0.0,
                 output_field=DecimalField(),
             )
         )
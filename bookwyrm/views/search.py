@@ -1,13 +1,16 @@
 """search views"""
 
+import json
 import re
 
+from django.contrib.auth.decorators import login_required
 from django.contrib.postgres.search import TrigramSimilarity, SearchRank, SearchQuery
 from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator
 from django.db.models import F
 from django.db.models.functions import Greatest
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.template.response import TemplateResponse
 from django.views import View
 from django.views.decorators.vary import vary_on_headers
@@ -76,14 +79,7 @@ def book_search(request):
     search_remote = request.GET.get("remote", False) and request.user.is_authenticated
 
     # try a local-only search
-    local_results = search(query, min_confidence=min_confidence)
-
-    cleaned_results = local_results
-    if request.user.is_authenticated:
-        blocked = request.user.blocked_books.values_list("id", flat=True)
-        cleaned_results = list(
-            filter(lambda b: b.parent_work.id not in blocked, local_results)
-        )
+    local_results, cleaned_results = local_book_search(request, query, min_confidence)
 
     blocked_books_excluded = (
         True if len(cleaned_results) < len(local_results) else False
@@ -103,13 +99,80 @@ def book_search(request):
     }
     # if a logged in user requested remote results or got no local results, try remote
     if request.user.is_authenticated and (not local_results or search_remote):
-        data["remote_results"] = connector_manager.search(
-            query, min_confidence=min_confidence
-        )
+        if request.GET.get("stream") == "false":
+            data["remote_results"] = connector_manager.search(
+                query, min_confidence=min_confidence
+            )
+        else:
+            # the page loads the results from each connector as they come in
+            data["remote_stream"] = True
+            data["min_confidence"] = min_confidence
         data["remote"] = True
     return TemplateResponse(request, "search/book.html", data)
 
 
+@login_required
+def remote_book_search(request):
+    """stream search results as lines of json: local results first, then
+    each connector's results as soon as it responds"""
+    query = isbn_check_and_format(request.GET.get("q", "").strip())
+    min_confidence = float(request.GET.get("min_confidence", 0.1))
+
+    def stream_results():
+        _, local_results = local_book_search(request, query, min_confidence)
+        yield (
+            json.dumps(
+                {
+                    "connector": None,
+                    "results": [format_search_result(r) for r in local_results[:10]],
+                }
+            )
+            + "\n"
+        )
+
+        if not query:
+            return
+        connectors = connector_manager.get_search_connectors(query)
+        for result_set in connector_manager.iter_search_results(
+            query, connectors, min_confidence
+        ):
+            if not result_set["results"]:
+                continue
+            connector = result_set["connector"]
+            html = render_to_string(
+                "search/remote_results.html", {"result_set": result_set}, request
+            )
+            yield (
+                json.dumps(
+                    {
+                        "connector": {
+                            "identifier": connector.identifier,
+                            "name": connector.name,
+                            "base_url": connector.base_url,
+                        },
+                        "results": [r.json() for r in result_set["results"]],
+                        "html": html,
+                    }
+                )
+                + "\n"
+            )
+
+    return StreamingHttpResponse(stream_results(), content_type="application/x-ndjson")
+
+
+def local_book_search(request, query, min_confidence):
+    """local results, and those results without the user's blocked books"""
+    local_results = search(query, min_confidence=min_confidence)
+
+    cleaned_results = local_results
+    if request.user.is_authenticated:
+        blocked = request.user.blocked_books.values_list("id", flat=True)
+        cleaned_results = list(
+            filter(lambda b: b.parent_work.id not in blocked, local_results)
+        )
+    return local_results, cleaned_results
+
+
 def author_search(request):
     """search for an author"""
     query = request.GET.get("q").strip()